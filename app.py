@@ -1,60 +1,214 @@
 """
 Serveur Flask principal pour GeoQuizz
 """
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
+from flask import (Flask, render_template, request, jsonify, send_file, redirect, url_for,
+                   make_response)
 from flask_socketio import SocketIO, emit, join_room, leave_room
 import os
-import socket
-import qrcode
-from io import BytesIO
+import hmac
+from pathlib import Path
 from photo_manager import PhotoManager
-from game_manager import GameManager
+from derivatives import DerivativeStore, WIDTHS, available_formats
+import metrics
+import serializer
+from profiling import RequestProfiler
+from task_monitor import TaskMonitor, STALL_THRESHOLD
+from compression import StaticAssets, compress_response, available_encodings, COMPRESS_MIN_SIZE
+from share import LocalIPResolver, QRCodeCache, join_url, LOCAL_IP_TTL, QR_CACHE_SIZE
+from cluster import cluster_settings, socketio_options, owner_of
+from game_manager import (
+    GameManager, server_time_ms, DEFAULT_MAX_PLAYERS, MAX_ROOM_PLAYERS,
+    RESULTS_MODES, DEFAULT_RESULTS_TOP_N, FINISHED_TTL, IDLE_TTL, REAPER_INTERVAL,
+    ROOM_DELTA_WINDOW, async_room_channel, normalize_coordinates
+)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'geoquizz-secret-key-2024'
 
-# Initialiser SocketIO
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Déploiement multi-processus (voir cluster.py) : 1 worker par défaut
+cluster = cluster_settings()
+
+# Initialiser SocketIO : file de messages partagée entre workers si configurée,
+# paquets encodés par serializer (orjson/msgspec si installés) et comptés par événement.
+# serve.py choisit eventlet/gevent ; python app.py reste en threading (développement)
+socketio = SocketIO(app, cors_allowed_origins="*",
+                    async_mode=os.environ.get('GEOQUIZZ_ASYNC_MODE', 'threading'),
+                    json=metrics.SocketIOJSON, **socketio_options(cluster))
+
+# Suivi des tâches de fond : retard signalé au-delà de GEOQUIZZ_STALL_THRESHOLD_MS
+task_monitor = TaskMonitor(stall_threshold=float(
+    os.environ.get('GEOQUIZZ_STALL_THRESHOLD_MS', STALL_THRESHOLD * 1000)) / 1000)
+
+# Endpoints /api/admin désactivés si aucun jeton n'est configuré
+admin_token = os.environ.get('GEOQUIZZ_ADMIN_TOKEN', '')
 
 # Gestionnaires globaux
 photo_manager = None
-game_manager = GameManager(socketio=socketio)
+photo_config_mtime = None  # Date de config.json au dernier chargement (multi-processus)
+game_manager = GameManager(
+    socketio=socketio,
+    max_room_players=int(os.environ.get('GEOQUIZZ_MAX_ROOM_PLAYERS', MAX_ROOM_PLAYERS)),
+    worker_index=cluster['worker_index'],
+    workers=cluster['workers'],
+    finished_ttl=int(os.environ.get('GEOQUIZZ_FINISHED_TTL', FINISHED_TTL)),
+    idle_ttl=int(os.environ.get('GEOQUIZZ_IDLE_TTL', IDLE_TTL)),
+    delta_window=float(os.environ.get('GEOQUIZZ_DELTA_WINDOW', ROOM_DELTA_WINDOW)),
+    task_monitor=task_monitor
+)
+
+# IP locale et QR codes de partage mis en cache (voir share.py)
+local_ip_resolver = LocalIPResolver(ttl=int(os.environ.get('GEOQUIZZ_LOCAL_IP_TTL', LOCAL_IP_TTL)))
+qrcode_cache = QRCodeCache(maxsize=int(os.environ.get('GEOQUIZZ_QR_CACHE_SIZE', QR_CACHE_SIZE)))
+qrcode_prerender = os.environ.get('GEOQUIZZ_QR_PRERENDER', '0') == '1'
+
+# Tirage des manches : 'random' (uniforme) ou 'balanced' (stratifié par difficulté)
+round_selection = os.environ.get('GEOQUIZZ_ROUND_SELECTION', 'random')
+
+# Index des photos analysées (GPS, aperçus) : un nouveau scan ne relit que les fichiers modifiés
+photo_index_path = os.path.join(game_manager.data_folder, 'photo_index.json')
+photo_derivatives = DerivativeStore(os.path.join(game_manager.data_folder, 'derivatives'))
+
+# Sessions et salles en mémoire, lues au scrape de /metrics
+metrics.ACTIVE_GAMES.set_callback(game_manager.count_active)
+
+# Profilage des requêtes à la demande (GEOQUIZZ_PROFILE, voir profiling.py)
+request_profiler = RequestProfiler(os.path.join(game_manager.data_folder, 'profiles'),
+                                   mode=os.environ.get('GEOQUIZZ_PROFILE', 'off'),
+                                   profiler=os.environ.get('GEOQUIZZ_PROFILER', 'cprofile'))
+request_profiler.init_app(app)
+
+# Retirer périodiquement les sessions et salles terminées ou abandonnées
+game_manager.start_reaper(int(os.environ.get('GEOQUIZZ_REAPER_INTERVAL', REAPER_INTERVAL)))
+
+# Retard de la boucle d'événements (geoquizz_event_loop_lag_seconds)
+socketio.start_background_task(task_monitor.run, 'heartbeat', task_monitor.heartbeat,
+                               socketio.sleep)
+
+# Compression des réponses (GEOQUIZZ_COMPRESS=0 si le reverse proxy s'en charge)
+compress_enabled = os.environ.get('GEOQUIZZ_COMPRESS', '1') == '1'
+compress_min_size = int(os.environ.get('GEOQUIZZ_COMPRESS_MIN_SIZE', COMPRESS_MIN_SIZE))
+
+# Fichiers statiques à empreinte, servis avec cache immutable (voir compression.py).
+# gzip est prêt au démarrage ; brotli (niveau maximal, plus lent) suit en tâche de fond
+static_assets = StaticAssets(app.static_folder)
+static_assets.build(encodings=('gzip',) if compress_enabled else ())
+app.url_defaults(static_assets.url_defaults)
+app.view_functions['static'] = static_assets.send
+if compress_enabled and 'br' in available_encodings():
+    socketio.start_background_task(task_monitor.run, 'precompress_static',
+                                   static_assets.precompress, None, lambda: socketio.sleep(0))
+
+
+@app.after_request
+def compress_dynamic_response(response):
+    """Compresse les réponses JSON/HTML au-delà de GEOQUIZZ_COMPRESS_MIN_SIZE"""
+    if compress_enabled:
+        return compress_response(response, compress_min_size)
+    return response
+
+
+def load_photo_manager(folder):
+    """
+    Scanne un dossier de photos et lance le calcul des aperçus manquants
+
+    Args:
+        folder: Dossier racine des photos
+
+    Returns:
+        PhotoManager scanné
+    """
+    manager = PhotoManager(folder, index_path=photo_index_path)
+    manager.scan_photos()
+    if manager.pending_placeholders:
+        socketio.start_background_task(task_monitor.run, 'photo_placeholders',
+                                       manager.fill_placeholders, lambda: socketio.sleep(0))
+    return manager
+
+
+def draw_photos(photo_manager, num_rounds):
+    """
+    Tire les photos d'une partie selon GEOQUIZZ_ROUND_SELECTION
+
+    Args:
+        photo_manager: PhotoManager courant
+        num_rounds: Nombre de manches
+
+    Returns:
+        Liste de photos
+    """
+    difficulties = game_manager.photo_stats.difficulties() if round_selection == 'balanced' else None
+    return photo_manager.get_random_photos(num_rounds, difficulties)
+
+
+def get_photo_manager():
+    """
+    Retourne le gestionnaire de photos courant
+
+    En multi-processus, la configuration a pu être changée par un autre
+    worker : config.json n'est relu que si sa date de modification a changé,
+    et le dossier est alors rechargé.
+
+    Returns:
+        PhotoManager ou None si non configuré
+    """
+    global photo_manager, photo_config_mtime
+
+    if cluster['workers'] > 1:
+        try:
+            mtime = os.stat(game_manager.config_file).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime != photo_config_mtime:
+            config = game_manager.load_config()
+            # Fichier en cours d'écriture : relu à la requête suivante
+            if config is not None:
+                photo_config_mtime = mtime
+                folder = config.get('photo_folder')
+                if folder and (photo_manager is None or photo_manager.root_folder != Path(folder)):
+                    photo_manager = load_photo_manager(folder)
+
+    return photo_manager
 
 
 def get_local_ip():
     """
-    Obtenir l'adresse IP locale du serveur (non-localhost)
+    Obtenir l'adresse IP locale du serveur (non-localhost), mise en cache
 
     Returns:
         str: Adresse IP locale (ex: 192.168.1.66) ou localhost si non trouvée
     """
-    try:
-        # Méthode 1: Connexion UDP pour trouver l'IP locale
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        # On se connecte à un serveur externe (pas besoin que la connexion aboutisse)
-        s.connect(("8.8.8.8", 80))
-        local_ip = s.getsockname()[0]
-        s.close()
-        return local_ip
-    except Exception:
-        try:
-            # Méthode 2: Via le hostname
-            hostname = socket.gethostname()
-            local_ip = socket.gethostbyname(hostname)
-            # Ne pas retourner 127.0.0.1
-            if local_ip != '127.0.0.1':
-                return local_ip
-        except Exception:
-            pass
+    return local_ip_resolver.get()
 
-    # Fallback à localhost si aucune méthode ne fonctionne
-    return 'localhost'
+
+def request_port():
+    """
+    Port utilisé par le client pour joindre le serveur
+
+    Returns:
+        str: Port de l'en-tête Host (5000 par défaut)
+    """
+    return request.host.split(':')[1] if ':' in request.host else '5000'
+
+
+def prerender_qrcode(room_id, port):
+    """
+    Génère le QR code d'une salle à l'avance (tâche de fond)
+
+    Args:
+        room_id: ID de la salle
+        port: Port à encoder dans l'URL
+    """
+    qrcode_cache.get(room_id, get_local_ip(), port)
 
 
 @app.route('/')
 def index():
     """Page principale de l'application"""
-    return render_template('index.html')
+    # Revalidée à chaque visite (ETag) : elle référence les fichiers statiques à empreinte
+    response = make_response(render_template('index.html'))
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 @app.route('/api/config', methods=['GET', 'POST'])
@@ -77,8 +231,8 @@ def config():
 
         # Scanner les photos
         global photo_manager
-        photo_manager = PhotoManager(photo_folder)
-        num_photos = photo_manager.scan_photos()
+        photo_manager = load_photo_manager(photo_folder)
+        num_photos = len(photo_manager.photos_with_gps)
 
         if num_photos == 0:
             return jsonify({'error': 'Aucune photo avec coordonnées GPS trouvée'}), 400
@@ -95,6 +249,7 @@ def config():
         return jsonify({
             'success': True,
             'num_photos': num_photos,
+            'num_duplicates': photo_manager.num_duplicates,
             'config': config
         })
 
@@ -102,6 +257,7 @@ def config():
 @app.route('/api/game/start', methods=['POST'])
 def start_game():
     """Démarrer une nouvelle partie"""
+    photo_manager = get_photo_manager()
     if photo_manager is None:
         return jsonify({'error': 'Configuration non initialisée'}), 400
 
@@ -110,7 +266,7 @@ def start_game():
     num_rounds = data.get('num_rounds', 5)
 
     # Récupérer des photos aléatoires
-    photos = photo_manager.get_random_photos(num_rounds)
+    photos = draw_photos(photo_manager, num_rounds)
 
     if not photos:
         return jsonify({'error': 'Aucune photo disponible'}), 400
@@ -146,6 +302,11 @@ def submit_guess(session_id):
     if guess_lat is None or guess_lon is None:
         return jsonify({'error': 'Coordonnées manquantes'}), 400
 
+    coordinates = normalize_coordinates(guess_lat, guess_lon)
+    if coordinates is None:
+        return jsonify({'error': 'Coordonnées invalides'}), 400
+    guess_lat, guess_lon = coordinates
+
     result = game_manager.submit_guess(session_id, guess_lat, guess_lon)
 
     if result is None:
@@ -154,6 +315,32 @@ def submit_guess(session_id):
     return jsonify(result)
 
 
+@app.route('/api/game/<game_id>/replay', methods=['GET'])
+def get_game_replay(game_id):
+    """
+    Réponses enregistrées d'une partie terminée (solo ou salle)
+
+    Diffusé au fil de la lecture, une ligne JSON par événement (partie,
+    joueur, réponse) ; ?format=binary renvoie le fichier brut (voir replays.py).
+    """
+    if game_manager.is_game_in_progress(game_id):
+        return jsonify({'error': 'Partie en cours'}), 403
+
+    replays = game_manager.replays
+    if not replays.exists(game_id):
+        return jsonify({'error': 'Replay introuvable'}), 404
+
+    if request.args.get('format') == 'binary':
+        return send_file(os.path.abspath(replays.path(game_id)),
+                         mimetype='application/octet-stream')
+
+    def generate():
+        for event in replays.read(game_id):
+            yield serializer.encode(event) + b'\n'
+
+    return app.response_class(generate(), mimetype='application/x-ndjson')
+
+
 @app.route('/api/game/<session_id>/summary', methods=['GET'])
 def get_game_summary(session_id):
     """Récupérer le résumé d'une partie"""
@@ -175,12 +362,85 @@ def get_leaderboard():
 
 @app.route('/api/photo/<path:photo_path>')
 def serve_photo(photo_path):
-    """Servir une photo depuis le système de fichiers"""
+    """
+    Servir une photo depuis le système de fichiers
+
+    Avec ?w=<largeur>&format=<format>, sert la déclinaison correspondante
+    (produite à la première demande) plutôt que l'original.
+    """
     # Sécurité : vérifier que le fichier existe et est dans le dossier autorisé
     if not os.path.exists(photo_path):
         return jsonify({'error': 'Photo introuvable'}), 404
 
-    return send_file(photo_path, mimetype='image/jpeg')
+    width = request.args.get('w', type=int)
+    if width is not None:
+        # Déclinaisons (coûteuses, gardées sur disque) réservées aux photos du dossier configuré
+        manager = get_photo_manager()
+        if manager is None or not manager.contains(photo_path):
+            return jsonify({'error': 'Photo introuvable'}), 404
+        fmt = request.args.get('format', 'jpeg')
+        if width not in WIDTHS or fmt not in available_formats():
+            return jsonify({'error': 'Déclinaison inconnue'}), 400
+        path, mimetype = photo_derivatives.get(photo_path, width, fmt)
+        response = send_file(path, mimetype=mimetype)
+    else:
+        response = send_file(photo_path, mimetype='image/jpeg')
+    metrics.PHOTO_BYTES_SERVED.inc(response.content_length or 0)
+    return response
+
+
+@app.route('/api/photo/<photo_id>/stats', methods=['GET'])
+def get_photo_stats(photo_id):
+    """
+    Statistiques de difficulté d'une photo (distances, score, temps de
+    réponse, carte de chaleur geohash), tenues à jour à chaque réponse
+    """
+    stats = game_manager.photo_stats.get(photo_id)
+    if stats is None:
+        return jsonify({'error': 'Aucune réponse pour cette photo'}), 404
+    return jsonify(stats.to_public_dict(photo_id))
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métriques internes au format texte Prometheus"""
+    return app.response_class(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+def admin_denied():
+    """
+    Vérifie le jeton d'administration (en-tête X-Admin-Token)
+
+    Returns:
+        Réponse d'erreur, ou None si l'accès est autorisé
+    """
+    if not admin_token:
+        return jsonify({'error': 'Administration désactivée'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return jsonify({'error': 'Jeton d\'administration invalide'}), 403
+    return None
+
+
+@app.route('/api/admin/tasks', methods=['GET'])
+def get_background_tasks():
+    """Tâches de fond en cours et derniers retards de timers ou de la boucle"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    return jsonify(task_monitor.snapshot())
+
+
+@app.route('/api/admin/tasks/stacks', methods=['GET'])
+def sample_task_stacks():
+    """Échantillonne les piles des threads et green threads (tâches de fond comprises)"""
+    denied = admin_denied()
+    if denied:
+        return denied
+
+    samples = min(max(request.args.get('samples', 20, type=int), 1), 200)
+    interval_ms = min(max(request.args.get('interval_ms', 10, type=float), 1), 1000)
+    stacks = task_monitor.sample_stacks(samples, interval_ms / 1000, sleep=socketio.sleep)
+    return jsonify({'samples': samples, 'interval_ms': interval_ms, 'stacks': stacks})
 
 
 @app.route('/api/stats', methods=['GET'])
@@ -204,6 +464,7 @@ def get_stats():
 @app.route('/api/multiplayer/room/create', methods=['POST'])
 def create_multiplayer_room():
     """Créer une salle multijoueur"""
+    photo_manager = get_photo_manager()
     if photo_manager is None:
         return jsonify({'error': 'Configuration non initialisée'}), 400
 
@@ -213,7 +474,7 @@ def create_multiplayer_room():
     num_rounds = data.get('num_rounds', 5)
 
     # Récupérer des photos aléatoires
-    photos = photo_manager.get_random_photos(num_rounds)
+    photos = draw_photos(photo_manager, num_rounds)
 
     if not photos:
         return jsonify({'error': 'Aucune photo disponible'}), 400
@@ -298,6 +559,11 @@ def submit_multiplayer_guess(room_id):
     if not player_name or guess_lat is None or guess_lon is None:
         return jsonify({'error': 'Données manquantes'}), 400
 
+    coordinates = normalize_coordinates(guess_lat, guess_lon)
+    if coordinates is None:
+        return jsonify({'error': 'Coordonnées invalides'}), 400
+    guess_lat, guess_lon = coordinates
+
     result = game_manager.submit_multiplayer_guess(room_id, player_name, guess_lat, guess_lon)
 
     if result is None:
@@ -318,44 +584,26 @@ def get_multiplayer_leaderboard(room_id):
 def get_room_qrcode(room_id):
     """Générer un QR code pour rejoindre une salle multijoueur"""
     # Vérifier que la salle existe
-    room_info = game_manager.get_synchronized_room_state(room_id)
+    room_info = game_manager.get_synchronized_room_summary(room_id)
 
     if room_info is None:
         return jsonify({'error': 'Salle introuvable'}), 404
 
-    # Obtenir l'adresse IP locale du serveur
-    local_ip = get_local_ip()
-    port = request.host.split(':')[1] if ':' in request.host else '5000'
-
-    # Générer l'URL de la salle avec l'IP locale
-    join_url = f"http://{local_ip}:{port}/join/{room_id}"
-
-    # Créer le QR code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(join_url)
-    qr.make(fit=True)
+    # QR code généré une fois par (salle, IP locale, port)
+    png, etag = qrcode_cache.get(room_id, get_local_ip(), request_port())
 
-    # Générer l'image
-    img = qr.make_image(fill_color="black", back_color="white")
-
-    # Convertir en bytes pour la réponse HTTP
-    img_io = BytesIO()
-    img.save(img_io, 'PNG')
-    img_io.seek(0)
-
-    return send_file(img_io, mimetype='image/png')
+    response = app.response_class(png, mimetype='image/png')
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # Revalider : l'IP locale peut changer
+    return response.make_conditional(request)
 
 
 @app.route('/join/<room_id>')
 def join_room_page(room_id):
     """Page pour rejoindre une salle directement via URL"""
     # Vérifier que la salle existe
-    room_info = game_manager.get_synchronized_room_state(room_id)
+    room_info = game_manager.get_synchronized_room_summary(room_id)
 
     if room_info is None:
         # Rediriger vers la page d'accueil avec message d'erreur
@@ -368,7 +616,7 @@ def join_room_page(room_id):
 @app.route('/api/multiplayer/room/<room_id>/exists', methods=['GET'])
 def check_room_exists(room_id):
     """Vérifier si une salle existe"""
-    room_info = game_manager.get_synchronized_room_state(room_id)
+    room_info = game_manager.get_synchronized_room_summary(room_id)
 
     if room_info is None:
         return jsonify({'exists': False}), 404
@@ -377,7 +625,7 @@ def check_room_exists(room_id):
         'exists': True,
         'room_name': room_info['name'],
         'num_rounds': room_info['num_rounds'],
-        'player_count': len(room_info['players']),
+        'player_count': room_info['player_count'],
         'max_players': room_info['max_players'],
         'phase': room_info['phase']
     })
@@ -387,20 +635,17 @@ def check_room_exists(room_id):
 def get_room_share_url(room_id):
     """Obtenir l'URL de partage pour rejoindre une salle (avec IP locale)"""
     # Vérifier que la salle existe
-    room_info = game_manager.get_synchronized_room_state(room_id)
+    room_info = game_manager.get_synchronized_room_summary(room_id)
 
     if room_info is None:
         return jsonify({'error': 'Salle introuvable'}), 404
 
-    # Obtenir l'adresse IP locale du serveur
+    # Obtenir l'adresse IP locale du serveur (en cache)
     local_ip = get_local_ip()
-    port = request.host.split(':')[1] if ':' in request.host else '5000'
-
-    # Générer l'URL de partage
-    join_url = f"http://{local_ip}:{port}/join/{room_id}"
+    port = request_port()
 
     return jsonify({
-        'url': join_url,
+        'url': join_url(local_ip, port, room_id),
         'ip': local_ip,
         'port': port,
         'room_id': room_id
@@ -412,6 +657,7 @@ def get_room_share_url(room_id):
 @app.route('/api/sync/room/create', methods=['POST'])
 def create_synchronized_room():
     """Créer une salle multijoueur synchronisée"""
+    photo_manager = get_photo_manager()
     if photo_manager is None:
         return jsonify({'error': 'Configuration non initialisée'}), 400
 
@@ -419,15 +665,32 @@ def create_synchronized_room():
     room_name = data.get('room_name', 'Salle')
     host_name = data.get('host_name', 'Hôte')
     num_rounds = data.get('num_rounds', 5)
+    max_players = data.get('max_players', DEFAULT_MAX_PLAYERS)
+    results_mode = data.get('results_mode', 'auto')
+    results_top_n = data.get('results_top_n', DEFAULT_RESULTS_TOP_N)
+
+    if not isinstance(max_players, int) or max_players < 2:
+        return jsonify({'error': 'Nombre de joueurs invalide'}), 400
+
+    if results_mode not in RESULTS_MODES or not isinstance(results_top_n, int) or results_top_n < 1:
+        return jsonify({'error': 'Mode de résultats invalide'}), 400
 
     # Récupérer des photos aléatoires
-    photos = photo_manager.get_random_photos(num_rounds)
+    photos = draw_photos(photo_manager, num_rounds)
 
     if not photos:
         return jsonify({'error': 'Aucune photo disponible'}), 400
 
-    # Créer la salle
-    room_id = game_manager.create_synchronized_room(room_name, host_name, photos, num_rounds)
+    # Créer la salle (capacité bornée par GEOQUIZZ_MAX_ROOM_PLAYERS)
+    room_id = game_manager.create_synchronized_room(
+        room_name, host_name, photos, num_rounds, max_players=max_players,
+        results_mode=results_mode, results_top_n=results_top_n
+    )
+
+    # Le QR code du lobby est demandé juste après la création
+    if qrcode_prerender:
+        socketio.start_background_task(task_monitor.run, 'prerender_qrcode',
+                                       prerender_qrcode, room_id, request_port())
 
     return jsonify({
         'success': True,
@@ -457,7 +720,12 @@ socket_sessions = {}
 def handle_connect():
     """Gestion de la connexion WebSocket"""
     print(f'Client connecté: {request.sid}')
-    emit('connected', {'message': 'Connexion établie'})
+    metrics.SOCKETS_CONNECTED.inc()
+    emit('connected', {
+        'message': 'Connexion établie',
+        'worker': cluster['worker_index'],
+        'workers': cluster['workers']
+    })
 
 
 @socketio.on('disconnect')
@@ -465,6 +733,7 @@ def handle_disconnect():
     """Gestion de la déconnexion WebSocket"""
     sid = request.sid
     print(f'Client déconnecté: {sid}')
+    metrics.SOCKETS_CONNECTED.dec()
 
     # Récupérer les infos de session
     if sid in socket_sessions:
@@ -478,6 +747,15 @@ def handle_disconnect():
         del socket_sessions[sid]
 
 
+@socketio.on('time_sync')
+def handle_time_sync(data=None):
+    """Répondre à un ping d'horloge (le client estime son décalage)"""
+    return {
+        'client_time': (data or {}).get('client_time'),
+        'server_time': server_time_ms()
+    }
+
+
 @socketio.on('join_sync_room')
 def handle_join_sync_room(data):
     """Rejoindre une salle synchronisée"""
@@ -488,8 +766,13 @@ def handle_join_sync_room(data):
         emit('error', {'message': 'room_id et player_name requis'})
         return
 
+    # La salle vit dans un autre worker : le client doit se reconnecter avec ?room=
+    if owner_of(room_id, cluster['workers']) != cluster['worker_index']:
+        emit('error', {'message': 'Salle gérée par un autre processus', 'code': 'wrong_worker'})
+        return
+
     # Rejoindre la salle dans le game manager
-    result = game_manager.join_synchronized_room(room_id, player_name)
+    result = game_manager.join_synchronized_room(room_id, player_name, sid=request.sid)
 
     if result is None:
         emit('error', {'message': 'Salle introuvable'})
@@ -516,9 +799,22 @@ def handle_join_sync_room(data):
         'reconnected': result.get('reconnected', False)
     })
 
-    # Broadcaster à tous les joueurs de la salle
-    room_state = game_manager.get_synchronized_room_state(room_id)
-    emit('room_updated', room_state, room=room_id)
+    # Instantané complet pour le nouvel arrivant ; les autres ont reçu un delta
+    emit('room_updated', game_manager.get_synchronized_room_packet(room_id))
+
+
+@socketio.on('request_room_state')
+def handle_request_room_state(data=None):
+    """Renvoyer un instantané complet (client ayant détecté un trou de version)"""
+    sid = request.sid
+
+    if sid not in socket_sessions:
+        emit('error', {'message': 'Session introuvable'})
+        return
+
+    room_state = game_manager.get_synchronized_room_packet(socket_sessions[sid]['room_id'])
+    if room_state is not None:
+        emit('room_updated', room_state)
 
 
 @socketio.on('leave_sync_room')
@@ -536,20 +832,50 @@ def handle_leave_sync_room(data):
     # Quitter la room SocketIO
     leave_room(room_id)
 
-    # Gérer la déconnexion
+    # Gérer la déconnexion (le delta est diffusé par le game manager)
     game_manager.handle_player_disconnect(room_id, player_name)
 
     # Supprimer la session
     del socket_sessions[sid]
 
-    # Broadcaster à tous
-    room_state = game_manager.get_synchronized_room_state(room_id)
-    emit('room_updated', room_state, room=room_id)
-
     # Confirmer au joueur
     emit('left_room', {'room_id': room_id})
 
 
+@socketio.on('watch_async_room')
+def handle_watch_async_room(data):
+    """S'abonner à la progression d'une salle asynchrone (remplace le polling)"""
+    room_id = (data or {}).get('room_id')
+
+    if not room_id:
+        emit('error', {'message': 'room_id requis'})
+        return
+
+    # La salle vit dans un autre worker : le client doit se reconnecter avec ?room=
+    if owner_of(room_id, cluster['workers']) != cluster['worker_index']:
+        emit('error', {'message': 'Salle gérée par un autre processus', 'code': 'wrong_worker'})
+        return
+
+    # Abonnement avant l'instantané : aucun delta ne peut être manqué
+    join_room(async_room_channel(room_id))
+
+    snapshot = game_manager.get_multiplayer_room_snapshot(room_id)
+    if snapshot is None:
+        leave_room(async_room_channel(room_id))
+        emit('error', {'message': 'Salle introuvable'})
+        return
+
+    emit('async_room_state', snapshot)
+
+
+@socketio.on('unwatch_async_room')
+def handle_unwatch_async_room(data):
+    """Se désabonner d'une salle asynchrone"""
+    room_id = (data or {}).get('room_id')
+    if room_id:
+        leave_room(async_room_channel(room_id))
+
+
 @socketio.on('player_ready')
 def handle_player_ready(data):
     """Marquer un joueur comme prêt"""
@@ -563,13 +889,9 @@ def handle_player_ready(data):
     player_name = socket_sessions[sid]['player_name']
     ready = data.get('ready', True)
 
-    # Mettre à jour le statut
+    # Mettre à jour le statut (le delta est diffusé par le game manager)
     game_manager.set_player_ready(room_id, player_name, ready)
 
-    # Broadcaster l'état de la salle
-    room_state = game_manager.get_synchronized_room_state(room_id)
-    emit('room_updated', room_state, room=room_id)
-
 
 @socketio.on('start_game')
 def handle_start_game():
@@ -611,6 +933,12 @@ def handle_submit_sync_guess(data):
         emit('error', {'message': 'Coordonnées manquantes'})
         return
 
+    coordinates = normalize_coordinates(guess_lat, guess_lon)
+    if coordinates is None:
+        emit('error', {'message': 'Coordonnées invalides'})
+        return
+    guess_lat, guess_lon = coordinates
+
     # Soumettre la réponse
     result = game_manager.submit_synchronized_guess(room_id, player_name, guess_lat, guess_lon)
 
@@ -647,12 +975,20 @@ if __name__ == '__main__':
     # Créer le dossier data s'il n'existe pas
     os.makedirs('data', exist_ok=True)
 
+    host = os.environ.get('GEOQUIZZ_HOST', '0.0.0.0')
+    port = int(os.environ.get('GEOQUIZZ_PORT', 5000))
+
     # Lancer le serveur
     print("=" * 50)
     print("GeoQuizz - Serveur démarré")
     print("=" * 50)
-    print("Accédez à l'application : http://localhost:5000")
+    if cluster['workers'] > 1:
+        print(f"Worker {cluster['worker_index'] + 1}/{cluster['workers']} sur le port {port}")
+    else:
+        print(f"Accédez à l'application : http://localhost:{port}")
     print("Mode multijoueur temps réel activé")
     print("=" * 50)
 
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+    # Pas de mode debug (rechargement automatique) pour les workers lancés par cluster.py
+    socketio.run(app, debug=cluster['workers'] == 1, host=host, port=port,
+                 allow_unsafe_werkzeug=cluster['workers'] > 1)
@@ -0,0 +1,133 @@
+"""
+Benchmark du démarrage à froid du serveur
+
+Mesure deux choses, chacune sur plusieurs lancements :
+- le profil d'import (python -X importtime -c "import app") : temps cumulé de
+  app et des modules lourds (flask_socketio, geopy, PIL, qrcode...) ;
+- le délai entre le lancement de serve.py et la première réponse 200 de
+  /api/stats (ce que voit une sonde de santé après un redémarrage).
+
+--root permet de mesurer une autre copie du dépôt (ex : une version
+antérieure extraite avec git worktree) pour comparer.
+
+Usage:
+    python benchmarks/bench_cold_start.py --runs 5 --mode threading
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Modules dont le temps d'import cumulé est rapporté (None = non importé)
+TRACKED_MODULES = ['app', 'flask', 'flask_socketio', 'game_manager', 'photo_manager',
+                   'share', 'geopy', 'geopy.distance', 'PIL', 'PIL.Image', 'qrcode']
+
+
+def import_profile(root):
+    """
+    Profil d'import de app (un processus neuf)
+
+    Args:
+        root: Dossier du dépôt à mesurer
+
+    Returns:
+        Dict {module: temps cumulé en millisecondes ou None}
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=tempfile.mkdtemp(), capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=os.path.abspath(root)))
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        cumulative[name.strip()] = int(cumulative_us) / 1000
+
+    return {name: cumulative.get(name) for name in TRACKED_MODULES}
+
+
+def free_port():
+    """Port TCP libre sur la boucle locale"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def time_to_healthy(root, mode, timeout=30.0):
+    """
+    Lance serve.py et attend la première réponse 200 de /api/stats
+
+    Args:
+        root: Dossier du dépôt à mesurer
+        mode: Mode asynchrone (threading, eventlet, gevent)
+        timeout: Abandon après ce délai (secondes)
+
+    Returns:
+        Délai en millisecondes, ou None si le serveur ne répond pas
+    """
+    port = free_port()
+    env = dict(os.environ, GEOQUIZZ_ASYNC_MODE=mode, GEOQUIZZ_HOST='127.0.0.1',
+               GEOQUIZZ_PORT=str(port))
+    url = f'http://127.0.0.1:{port}/api/stats'
+
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(root, 'serve.py')],
+                               cwd=tempfile.mkdtemp(), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.01)
+        return None
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--root', default=ROOT, help='Copie du dépôt à mesurer')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--mode', default='threading',
+                        choices=['threading', 'eventlet', 'gevent'])
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.root) for _ in range(args.runs)]
+    imports = {}
+    for name in TRACKED_MODULES:
+        values = [profile[name] for profile in profiles if profile[name] is not None]
+        imports[name] = round(statistics.median(values), 1) if values else None
+
+    startups = [time_to_healthy(args.root, args.mode) for _ in range(args.runs)]
+    healthy = [value for value in startups if value is not None]
+
+    report = {
+        'benchmark': 'cold_start',
+        'root': os.path.abspath(args.root),
+        'mode': args.mode,
+        'runs': args.runs,
+        'import_cumulative_ms': imports,
+        'healthy_p50_ms': round(statistics.median(healthy), 1) if healthy else None,
+        'healthy_min_ms': round(min(healthy), 1) if healthy else None,
+        'failures': len(startups) - len(healthy)
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""
+Benchmark des chemins chauds du catalogue de photos et du scoring
+
+Pour chaque taille d'arborescence (générée par photo_tree.py, réutilisée si
+déjà présente) : débit de PhotoManager.scan_photos, latence de
+get_random_photos, mémoire du catalogue, puis débit du calcul de distance
+(geodesic_km) et de _calculate_score. Le rapport JSON inclut le commit et la
+version de Python ; --compare affiche l'écart avec un rapport précédent.
+
+Usage:
+    python benchmarks/bench_photo_manager.py --sizes 1000 10000 --output bench.json
+    python benchmarks/bench_photo_manager.py --sizes 1000 --compare bench.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from photo_manager import PhotoManager  # noqa: E402
+from game_manager import GameManager, geodesic_km  # noqa: E402
+from photo_tree import generate, LAT_RANGE, LON_RANGE  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Métriques comparées par --compare (True = plus grand est meilleur)
+COMPARED = {
+    'scan_files_per_s': True,
+    'random_photos_p50_us': False,
+    'catalog_bytes_per_photo': False,
+    'distance_calls_per_s': True,
+    'score_calls_per_s': True
+}
+
+
+def git_commit():
+    """Commit courant du dépôt (None hors d'un dépôt git)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values, fraction):
+    """Percentile approché (plus proche rang) d'une liste non vide"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def bench_scan(root, runs):
+    """
+    Scanne l'arborescence plusieurs fois (meilleur passage retenu)
+
+    Returns:
+        Tuple (PhotoManager scanné, dict de résultats)
+    """
+    durations = []
+    for _ in range(runs):
+        manager = PhotoManager(root)
+        start = time.perf_counter()
+        found = manager.scan_photos()
+        durations.append(time.perf_counter() - start)
+
+    with open(os.path.join(root, '.photo_tree.json'), encoding='utf-8') as f:
+        files = json.load(f)['params']['files']
+
+    best = min(durations)
+    return manager, {
+        'scan_seconds': round(best, 3),
+        'scan_files_per_s': round(files / best),
+        'photos_with_gps': found
+    }
+
+
+def bench_random_photos(manager, counts, samples):
+    """
+    Latence de get_random_photos pour plusieurs tailles de partie
+
+    Returns:
+        Dict de latences en microsecondes
+    """
+    result = {}
+    for count in counts:
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            manager.get_random_photos(count)
+            timings.append((time.perf_counter() - start) * 1e6)
+        result[f'random_photos_{count}_p50_us'] = round(statistics.median(timings), 2)
+        result[f'random_photos_{count}_p95_us'] = round(percentile(timings, 0.95), 2)
+    # Valeur de référence pour --compare : partie de 5 manches
+    result['random_photos_p50_us'] = result.get('random_photos_5_p50_us')
+    return result
+
+
+def bench_catalog_memory(root):
+    """
+    Mémoire allouée par un scan (catalogue photos_with_gps)
+
+    Returns:
+        Dict avec octets totaux et par photo
+    """
+    gc.collect()
+    tracemalloc.start()
+    manager = PhotoManager(root)
+    manager.scan_photos()
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    count = len(manager.photos_with_gps) or 1
+    return {
+        'catalog_bytes': allocated,
+        'catalog_bytes_per_photo': round(allocated / count)
+    }
+
+
+def bench_scoring(calls):
+    """
+    Débit du calcul de distance et du score
+
+    Returns:
+        Dict d'appels par seconde
+    """
+    rng = random.Random(0)
+    pairs = [((rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)),
+              (rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE))) for _ in range(calls)]
+    distances = [geodesic_km(a, b) for a, b in pairs]  # Import de geopy hors mesure
+
+    manager = GameManager(data_folder=tempfile.mkdtemp())
+
+    def run_distances():
+        for a, b in pairs:
+            geodesic_km(a, b)
+
+    def run_scores():
+        for distance in distances:
+            manager._calculate_score(distance)
+
+    distance_seconds = min(timeit.repeat(run_distances, number=1, repeat=3))
+    score_seconds = min(timeit.repeat(run_scores, number=1, repeat=5))
+    return {
+        'distance_calls_per_s': round(calls / distance_seconds),
+        'score_calls_per_s': round(calls / score_seconds)
+    }
+
+
+def compare(report, baseline, tolerance):
+    """
+    Affiche l'écart de chaque métrique avec un rapport précédent
+
+    Args:
+        report: Rapport courant
+        baseline: Rapport de référence (même format)
+        tolerance: Écart relatif toléré avant de signaler une régression
+
+    Returns:
+        Nombre de régressions
+    """
+    regressions = 0
+    previous = {entry['files']: entry for entry in baseline.get('results', [])}
+    print(f"Comparaison avec {baseline.get('commit')} :", file=sys.stderr)
+    for entry in report['results']:
+        old = previous.get(entry['files'])
+        if not old:
+            continue
+        for name, higher_is_better in COMPARED.items():
+            if not old.get(name) or entry.get(name) is None:
+                continue
+            ratio = entry[name] / old[name]
+            if higher_is_better:
+                regression = ratio < 1 - tolerance
+            else:
+                regression = ratio > 1 + tolerance
+            regressions += regression
+            print(f"  {entry['files']:>7} fichiers  {name:<26} {old[name]:>12} -> "
+                  f"{entry[name]:>12}  x{ratio:.2f} {'(régression)' if regression else ''}",
+                  file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--gps-ratio', type=float, default=0.8)
+    parser.add_argument('--tree-dir', default=os.path.join(tempfile.gettempdir(),
+                                                            'geoquizz-photo-trees'),
+                        help='Dossier des arborescences générées (réutilisées)')
+    parser.add_argument('--scan-runs', type=int, default=3)
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--scoring-calls', type=int, default=20000)
+    parser.add_argument('--output', help='Écrire le rapport JSON dans ce fichier')
+    parser.add_argument('--compare', help='Rapport JSON précédent à comparer')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Écart relatif toléré par --compare (0.15 = 15 %%)')
+    args = parser.parse_args()
+
+    report = {
+        'benchmark': 'photo_manager',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'gps_ratio': args.gps_ratio,
+        'results': []
+    }
+
+    scoring = bench_scoring(args.scoring_calls)
+
+    for size in args.sizes:
+        root = os.path.join(args.tree_dir, f'{size}-{args.gps_ratio}')
+        manifest = generate(root, size, gps_ratio=args.gps_ratio)
+
+        manager, result = bench_scan(root, args.scan_runs)
+        result = {'files': size, 'generation_seconds': manifest['generation_seconds'],
+                  **result}
+        result.update(bench_random_photos(manager, (5, 10, 50), args.samples))
+        result.update(bench_catalog_memory(root))
+        result.update(scoring)
+        report['results'].append(result)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            # Code de sortie non nul en cas de régression (utilisable en CI)
+            return 1 if compare(report, json.load(f), args.tolerance) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
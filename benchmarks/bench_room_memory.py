@@ -0,0 +1,154 @@
+"""
+Benchmark de la mémoire et de l'accès aux attributs des salles synchronisées
+
+Crée N salles de P joueurs avec GameManager (modèles à slots), puis les mêmes
+salles sous forme de dicts imbriqués (ancien format) et compare la mémoire
+allouée (tracemalloc) et le coût d'une lecture de score.
+
+Usage:
+    python benchmarks/bench_room_memory.py --rooms 1000 5000 --players 6
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from dataclasses import replace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from game_manager import GameManager, PLAYER_COLORS  # noqa: E402
+
+
+class SilentSocketIO:
+    """Remplace SocketIO : aucune émission, aucune tâche de fond"""
+
+    def emit(self, *args, **kwargs):
+        pass
+
+    def start_background_task(self, target, *args, **kwargs):
+        return None
+
+    def sleep(self, seconds):
+        pass
+
+
+def copy_room(room):
+    """
+    Copie une salle (nouveaux objets, chaînes partagées)
+
+    Args:
+        room: SyncRoom
+
+    Returns:
+        SyncRoom équivalente
+    """
+    players = {name: replace(player, scores=list(player.scores))
+               for name, player in room.players.items()}
+    return replace(room, players=players)
+
+
+def legacy_room(room):
+    """
+    Reconstruit une salle au format dict imbriqué d'avant les modèles
+
+    Args:
+        room: SyncRoom
+
+    Returns:
+        Dict équivalent (avec la palette copiée dans chaque salle)
+    """
+    players = {}
+    for name, player in room.players.items():
+        players[name] = {
+            'color': player.color,
+            'ready': player.ready,
+            'connected': player.connected,
+            'guess': None,
+            'submitted': player.submitted,
+            'scores': list(player.scores),
+            'total_score': player.total_score,
+            'is_host': player.is_host,
+            'sid': player.sid
+        }
+
+    return {
+        'id': room.id, 'name': room.name, 'host': room.host,
+        'created_at': room.created_at, 'num_rounds': room.num_rounds,
+        'current_round': room.current_round, 'phase': room.phase,
+        'photos': room.photos, 'timer_duration': room.timer_duration,
+        'round_start_time': None, 'round_deadline': None, 'players': players,
+        'max_players': room.max_players, 'player_colors': list(PLAYER_COLORS),
+        'results_mode': room.results_mode, 'results_top_n': room.results_top_n,
+        'disconnect_pause_duration': room.disconnect_pause_duration,
+        'pause_end_time': None, 'paused_player': None, 'pending_submissions': 0,
+        'timer_token': 0, 'version': room.version
+    }
+
+
+def measure(build):
+    """
+    Mémoire allouée par une construction
+
+    Returns:
+        Tuple (objet construit, octets alloués)
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return built, after - before
+
+
+def run(num_rooms, num_players):
+    manager = GameManager(data_folder=tempfile.mkdtemp(), socketio=SilentSocketIO())
+    photos = [{'path': 'bench.jpg', 'latitude': 46.6, 'longitude': 1.9}] * 5
+
+    for i in range(num_rooms):
+        room_id = manager.create_synchronized_room(f'Salle {i}', 'joueur-0', photos, 5,
+                                                   max_players=num_players)
+        for j in range(1, num_players):
+            manager.join_synchronized_room(room_id, f'joueur-{j}', sid=f'sid-{i}-{j}')
+    rooms = list(manager.synchronized_rooms.values())
+
+    # Les deux formats sont reconstruits en partageant les mêmes chaînes :
+    # seuls les conteneurs (objets, dicts, listes) sont comptés
+    models, model_bytes = measure(lambda: [copy_room(room) for room in rooms])
+    legacy, legacy_bytes = measure(lambda: [legacy_room(room) for room in rooms])
+
+    room, old = models[0], legacy[0]
+    model_read = min(timeit.repeat(lambda: room.players['joueur-0'].total_score,
+                                   number=200000, repeat=5)) / 200000
+    legacy_read = min(timeit.repeat(lambda: old['players']['joueur-0']['total_score'],
+                                    number=200000, repeat=5)) / 200000
+
+    return {
+        'rooms': num_rooms,
+        'players_per_room': num_players,
+        'model_bytes_per_room': round(model_bytes / num_rooms),
+        'legacy_dict_bytes_per_room': round(legacy_bytes / num_rooms),
+        'model_read_ns': round(model_read * 1e9, 1),
+        'legacy_dict_read_ns': round(legacy_read * 1e9, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rooms', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--players', type=int, default=6)
+    args = parser.parse_args()
+
+    report = {'benchmark': 'room_memory', 'results': [
+        run(num_rooms, args.players) for num_rooms in args.rooms
+    ]}
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
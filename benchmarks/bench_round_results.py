@@ -0,0 +1,123 @@
+"""
+Benchmark de l'émission des résultats de manche pour les grandes salles
+
+Remplit une salle synchronisée de N joueurs, leur fait soumettre une réponse
+puis mesure advance_to_results : calcul des scores, tri et encodage JSON des
+paquets émis (comme le fait python-socketio avant l'envoi).
+
+Usage:
+    python benchmarks/bench_round_results.py --players 200 500 --target-ms 25
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from game_manager import GameManager  # noqa: E402
+
+
+class RecordingSocketIO:
+    """Remplace SocketIO : encode chaque paquet et compte les octets émis"""
+
+    def __init__(self):
+        self.bytes_sent = 0
+        self.broadcast_bytes = 0
+        self.packets = 0
+
+    def emit(self, event, data=None, room=None, to=None, **kwargs):
+        size = len(json.dumps([event, data], separators=(',', ':')))
+        self.bytes_sent += size
+        self.packets += 1
+        if room is not None:
+            self.broadcast_bytes += size
+
+    def start_background_task(self, target, *args, **kwargs):
+        # Les timers ne sont pas utiles ici
+        return None
+
+    def sleep(self, seconds):
+        pass
+
+
+def run_round(num_players, seed, results_mode):
+    """
+    Joue une manche complète et mesure la publication des résultats
+
+    Returns:
+        Tuple (durée en secondes, octets diffusés à la salle, octets émis au total)
+    """
+    rng = random.Random(seed)
+    socketio = RecordingSocketIO()
+    manager = GameManager(data_folder=tempfile.mkdtemp(), socketio=socketio,
+                          max_room_players=num_players)
+
+    photos = [{'path': 'bench.jpg', 'latitude': 46.6, 'longitude': 1.9}]
+    room_id = manager.create_synchronized_room('Bench', 'joueur-0', photos, 1,
+                                               max_players=num_players,
+                                               results_mode=results_mode)
+    manager.join_synchronized_room(room_id, 'joueur-0', sid='sid-0')
+    for i in range(1, num_players):
+        manager.join_synchronized_room(room_id, f'joueur-{i}', sid=f'sid-{i}')
+
+    manager.start_round(room_id)
+    room = manager.synchronized_rooms[room_id]
+
+    # Tout le monde sauf un joueur répond, pour que la manche reste ouverte
+    names = list(room.players)
+    for name in names[:-1]:
+        manager.submit_synchronized_guess(room_id, name,
+                                          rng.uniform(42.0, 51.0),
+                                          rng.uniform(-4.5, 8.0))
+
+    socketio.bytes_sent = 0
+    socketio.broadcast_bytes = 0
+    start = time.perf_counter()
+    manager.advance_to_results(room_id)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, socketio.broadcast_bytes, socketio.bytes_sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, nargs='+', default=[6, 50, 200, 500])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--results-mode', choices=['auto', 'full', 'top'], default='auto')
+    parser.add_argument('--target-ms', type=float, default=25.0,
+                        help='Latence maximale acceptée pour advance_to_results')
+    args = parser.parse_args()
+
+    report = {'benchmark': 'round_results', 'target_ms': args.target_ms,
+              'results_mode': args.results_mode, 'results': []}
+    ok = True
+
+    for num_players in args.players:
+        timings = []
+        broadcast_bytes = total_bytes = 0
+        for i in range(args.repeat):
+            elapsed, broadcast_bytes, total_bytes = run_round(num_players, i, args.results_mode)
+            timings.append(elapsed * 1000)
+
+        worst = max(timings)
+        ok = ok and worst <= args.target_ms
+        report['results'].append({
+            'players': num_players,
+            'median_ms': round(statistics.median(timings), 3),
+            'max_ms': round(worst, 3),
+            'broadcast_bytes': broadcast_bytes,
+            'total_bytes': total_bytes,
+            'within_target': worst <= args.target_ms
+        })
+
+    print(json.dumps(report, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Benchmark des encodeurs JSON sur des paquets et fichiers réalistes
+
+Capture les paquets round_results et room_updated émis par une vraie salle
+synchronisée, puis compare l'encodage par défaut de python-socketio (json
+de la bibliothèque standard) aux encodeurs disponibles de serializer.py.
+Compare aussi l'écriture de sessions.json indentée et compacte.
+
+Usage:
+    python benchmarks/bench_serializer.py --players 50 500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import serializer  # noqa: E402
+from game_manager import GameManager  # noqa: E402
+
+
+class CapturingSocketIO:
+    """Remplace SocketIO : conserve le dernier paquet de chaque événement"""
+
+    def __init__(self):
+        self.payloads = {}
+
+    def emit(self, event, data=None, room=None, to=None, **kwargs):
+        self.payloads[event] = data
+
+    def start_background_task(self, target, *args, **kwargs):
+        return None
+
+    def sleep(self, seconds):
+        pass
+
+
+def capture_payloads(num_players, results_mode):
+    """
+    Joue une manche et retourne les paquets à encoder
+
+    Returns:
+        Tuple (dict {événement: paquet}, GameManager)
+    """
+    rng = random.Random(num_players)
+    socketio = CapturingSocketIO()
+    manager = GameManager(data_folder=tempfile.mkdtemp(), socketio=socketio,
+                          max_room_players=num_players)
+
+    photos = [{'path': 'photos/été/bench.jpg', 'latitude': 46.6, 'longitude': 1.9}]
+    room_id = manager.create_synchronized_room('Salle des fêtes', 'Hôte', photos, 1,
+                                               max_players=num_players,
+                                               results_mode=results_mode)
+    for i in range(1, num_players):
+        manager.join_synchronized_room(room_id, f'Joueur n°{i}', sid=f'sid-{i}')
+
+    room_state = manager.get_synchronized_room_state(room_id)
+
+    manager.start_round(room_id)
+    for name in list(manager.synchronized_rooms[room_id].players):
+        manager.submit_synchronized_guess(room_id, name, rng.uniform(42.0, 51.0),
+                                          rng.uniform(-4.5, 8.0))
+
+    # Sessions solo pour le fichier sessions.json
+    for i in range(num_players):
+        session_id = manager.create_game(f'Joueur n°{i}', photos * 5, 5)
+        for _ in range(3):
+            manager.submit_guess(session_id, rng.uniform(42.0, 51.0), rng.uniform(-4.5, 8.0))
+
+    return {'room_updated': room_state,
+            'round_results': socketio.payloads['round_results']}, manager
+
+
+def time_call(func, number):
+    """Durée moyenne d'un appel en microsecondes"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, nargs='+', default=[50, 500])
+    parser.add_argument('--results-mode', choices=['auto', 'full', 'top'], default='full')
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+
+    encoders = {'socketio_default': lambda obj: json.dumps(obj, separators=(',', ':'))}
+    for name in serializer.BACKENDS:
+        try:
+            _, encode, _, _ = serializer.load_backend(name)
+        except ImportError:
+            continue
+        encoders[name] = encode
+
+    report = {'benchmark': 'serializer', 'active_backend': serializer.BACKEND,
+              'results_mode': args.results_mode, 'packets': [], 'files': []}
+
+    for num_players in args.players:
+        payloads, manager = capture_payloads(num_players, args.results_mode)
+
+        for event, payload in payloads.items():
+            # python-socketio encode [événement, données]
+            packet = [event, payload]
+            entry = {'event': event, 'players': num_players}
+            for name, encode in encoders.items():
+                entry[f'{name}_us'] = round(time_call(lambda: encode(packet), args.number), 1)
+                entry[f'{name}_bytes'] = len(encode(packet))
+            report['packets'].append(entry)
+
+        sessions = {sid: s.to_dict() for sid, s in manager.active_sessions.items()}
+        indented = lambda: json.dumps(sessions, indent=2, ensure_ascii=False)  # noqa: E731
+        report['files'].append({
+            'file': 'sessions.json',
+            'sessions': len(sessions),
+            'indented_us': round(time_call(indented, args.number // 10 or 1), 1),
+            'indented_bytes': len(indented().encode('utf-8')),
+            'compact_us': round(time_call(lambda: serializer.dumps(sessions),
+                                          args.number // 10 or 1), 1),
+            'compact_bytes': len(serializer.dumps(sessions).encode('utf-8'))
+        })
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
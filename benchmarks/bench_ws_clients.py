@@ -0,0 +1,177 @@
+"""
+Benchmark des connexions WebSocket simultanées par processus
+
+Démarre serve.py dans chaque mode asynchrone demandé, ouvre N clients
+Socket.IO (transport WebSocket) puis les fait tous pinger en même temps via
+l'événement time_sync. Mesure les connexions réussies, la latence de
+connexion, la latence des pings sous charge et la mémoire du serveur.
+
+Nécessite python-socketio[asyncio_client] (aiohttp) côté benchmark.
+
+Usage:
+    python benchmarks/bench_ws_clients.py --modes threading eventlet --clients 100 500 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import socketio
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def percentile(values, fraction):
+    """Percentile approché (plus proche rang) d'une liste non vide"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def wait_for_port(port, timeout=20.0):
+    """Attend que le serveur accepte les connexions"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def server_rss_mb(pid):
+    """Mémoire résidente du serveur (Linux uniquement)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def start_server(mode, port):
+    """
+    Lance serve.py dans un dossier de travail temporaire
+
+    Returns:
+        Processus serveur
+    """
+    env = dict(os.environ)
+    env.update({
+        'GEOQUIZZ_ASYNC_MODE': mode,
+        'GEOQUIZZ_HOST': '127.0.0.1',
+        'GEOQUIZZ_PORT': str(port)
+    })
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'serve.py')],
+                               cwd=tempfile.mkdtemp(), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_port(port):
+        process.kill()
+        raise RuntimeError(f'Le serveur {mode} ne démarre pas')
+    return process
+
+
+async def run_clients(url, num_clients, pings, connect_concurrency, timeout, server_pid):
+    """
+    Connecte num_clients clients puis mesure des salves de pings simultanés
+
+    Returns:
+        Dict de résultats (latences en millisecondes)
+    """
+    clients = []
+    connect_ms = []
+    failures = 0
+    gate = asyncio.Semaphore(connect_concurrency)
+
+    async def connect_one():
+        nonlocal failures
+        client = socketio.AsyncClient(reconnection=False)
+        async with gate:
+            start = time.perf_counter()
+            try:
+                await client.connect(url, transports=['websocket'], wait_timeout=timeout)
+            except Exception:
+                failures += 1
+                return
+            connect_ms.append((time.perf_counter() - start) * 1000)
+        clients.append(client)
+
+    await asyncio.gather(*(connect_one() for _ in range(num_clients)))
+
+    ping_ms = []
+    ping_failures = 0
+
+    async def ping(client):
+        nonlocal ping_failures
+        start = time.perf_counter()
+        try:
+            await client.call('time_sync', {'client_time': int(time.time() * 1000)},
+                              timeout=timeout)
+        except Exception:
+            ping_failures += 1
+            return
+        ping_ms.append((time.perf_counter() - start) * 1000)
+
+    for _ in range(pings):
+        await asyncio.gather(*(ping(client) for client in clients))
+
+    result = {
+        'clients': num_clients,
+        'connected': len(clients),
+        'connect_failures': failures,
+        'connect_p50_ms': round(statistics.median(connect_ms), 1) if connect_ms else None,
+        'connect_p95_ms': round(percentile(connect_ms, 0.95), 1) if connect_ms else None,
+        'ping_failures': ping_failures,
+        'ping_p50_ms': round(statistics.median(ping_ms), 1) if ping_ms else None,
+        'ping_p95_ms': round(percentile(ping_ms, 0.95), 1) if ping_ms else None,
+        'ping_p99_ms': round(percentile(ping_ms, 0.99), 1) if ping_ms else None,
+        'server_rss_mb': server_rss_mb(server_pid)
+    }
+
+    await asyncio.gather(*(client.disconnect() for client in clients),
+                         return_exceptions=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modes', nargs='+', default=['threading', 'eventlet'],
+                        choices=['threading', 'eventlet', 'gevent'])
+    parser.add_argument('--clients', type=int, nargs='+', default=[100, 500, 1000])
+    parser.add_argument('--pings', type=int, default=5,
+                        help='Salves de pings simultanés par palier')
+    parser.add_argument('--connect-concurrency', type=int, default=50)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=5790)
+    args = parser.parse_args()
+
+    report = {'benchmark': 'ws_clients', 'pings': args.pings, 'results': []}
+
+    for offset, mode in enumerate(args.modes):
+        port = args.port + offset
+        process = start_server(mode, port)
+        try:
+            for num_clients in args.clients:
+                result = asyncio.run(run_clients(f'http://127.0.0.1:{port}', num_clients,
+                                                 args.pings, args.connect_concurrency,
+                                                 args.timeout, process.pid))
+                result['mode'] = mode
+                report['results'].append(result)
+        finally:
+            process.terminate()
+            process.wait()
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,354 @@
+"""
+Test de charge HTTP : parties solo jouées en boucle serrée
+
+Chaque client virtuel (un thread, connexion HTTP keep-alive) enchaîne des
+parties solo complètes : /api/game/start, puis pour chaque manche
+/api/game/<id>/photo et /api/game/<id>/guess, puis /summary. Les paliers de
+--concurrency mesurent, par endpoint, latences p50/p95/p99 et erreurs, et
+le débit global (requêtes/s, parties/s). Le rapport JSON inclut le commit et
+la version de Python ; --compare affiche l'écart avec un rapport précédent
+(débit et p95 par endpoint) pour suivre les versions.
+
+--profile-sample envoie l'en-tête X-GeoQuizz-Profile sur une part des
+requêtes (serveur lancé avec GEOQUIZZ_PROFILE=header, voir profiling.py) ;
+les profils cProfile de data/profiles/ sont ensuite agrégés par endpoint.
+Les requêtes profilées sont exclues des latences.
+
+Usage:
+    python benchmarks/load_solo_http.py --concurrency 1 8 32 --duration 20
+    python benchmarks/load_solo_http.py --concurrency 8 --profile-sample 0.05
+    python benchmarks/load_solo_http.py --url http://127.0.0.1:5000 --compare solo.json
+"""
+import argparse
+import glob
+import http.client
+import json
+import os
+import platform
+import pstats
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from photo_tree import generate, LAT_RANGE, LON_RANGE  # noqa: E402
+from bench_ws_clients import percentile, wait_for_port  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+PROFILE_HEADER = 'X-GeoQuizz-Profile'  # Voir profiling.py
+
+ENDPOINTS = ('start', 'photo', 'guess', 'summary')
+
+
+def git_commit():
+    """Commit courant du dépôt (None hors d'un dépôt git)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class SoloClient:
+    """Client virtuel : parties solo en boucle sur une connexion keep-alive"""
+
+    def __init__(self, url, rounds, think, profile_sample, rng, results):
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.rounds = rounds
+        self.think = think
+        self.profile_sample = profile_sample
+        self.rng = rng
+        self.results = results  # {endpoint: [latences ms]}, 'errors', 'profiled', 'games'
+        self.connection = None
+
+    def request(self, endpoint, method, path, payload=None):
+        """
+        Envoie une requête et enregistre sa latence
+
+        Returns:
+            Réponse JSON décodée, ou None en cas d'erreur
+        """
+        headers = {'Content-Type': 'application/json'}
+        profiled = self.profile_sample and self.rng.random() < self.profile_sample
+        if profiled:
+            headers[PROFILE_HEADER] = '1'
+        body = json.dumps(payload) if payload is not None else None
+
+        start = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection = None
+            self.results['errors'][endpoint] += 1
+            return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if response.status != 200:
+            self.results['errors'][endpoint] += 1
+            return None
+        if profiled:
+            self.results['profiled'] += 1
+        else:
+            self.results['latencies'][endpoint].append(elapsed_ms)
+        return json.loads(data)
+
+    def play(self):
+        """Joue une partie complète (False si une requête a échoué)"""
+        started = self.request('start', 'POST', '/api/game/start',
+                               {'player_name': 'charge', 'num_rounds': self.rounds})
+        if not started:
+            return False
+        session_id = started['session_id']
+
+        for _ in range(self.rounds):
+            if self.request('photo', 'GET', f'/api/game/{session_id}/photo') is None:
+                return False
+            if self.think:
+                time.sleep(self.rng.uniform(0, 2 * self.think))
+            guess = {'latitude': self.rng.uniform(*LAT_RANGE),
+                     'longitude': self.rng.uniform(*LON_RANGE)}
+            if self.request('guess', 'POST', f'/api/game/{session_id}/guess', guess) is None:
+                return False
+
+        if self.request('summary', 'GET', f'/api/game/{session_id}/summary') is None:
+            return False
+        self.results['games'] += 1
+        return True
+
+    def run(self, deadline):
+        while time.perf_counter() < deadline:
+            self.play()
+        if self.connection is not None:
+            self.connection.close()
+
+
+def run_step(url, concurrency, duration, rounds, think, profile_sample, seed):
+    """
+    Fait tourner concurrency clients pendant duration secondes
+
+    Returns:
+        Dict de résultats du palier
+    """
+    rng = random.Random(seed)
+    all_results = []
+    threads = []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    for _ in range(concurrency):
+        results = {'latencies': {name: [] for name in ENDPOINTS},
+                   'errors': {name: 0 for name in ENDPOINTS},
+                   'profiled': 0, 'games': 0}
+        client = SoloClient(url, rounds, think, profile_sample,
+                            random.Random(rng.random()), results)
+        thread = threading.Thread(target=client.run, args=(deadline,), daemon=True)
+        thread.start()
+        all_results.append(results)
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    total_requests = 0
+    for name in ENDPOINTS:
+        values = [v for results in all_results for v in results['latencies'][name]]
+        errors = sum(results['errors'][name] for results in all_results)
+        total_requests += len(values) + errors
+        endpoints[name] = {
+            'count': len(values),
+            'errors': errors,
+            'mean_ms': round(statistics.fmean(values), 2) if values else None,
+            'p50_ms': round(statistics.median(values), 2) if values else None,
+            'p95_ms': round(percentile(values, 0.95), 2) if values else None,
+            'p99_ms': round(percentile(values, 0.99), 2) if values else None
+        }
+
+    profiled = sum(results['profiled'] for results in all_results)
+    total_requests += profiled
+    games = sum(results['games'] for results in all_results)
+    return {
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 1),
+        'requests_per_s': round(total_requests / elapsed, 1),
+        'games_per_s': round(games / elapsed, 2),
+        'profiled_requests': profiled,
+        'endpoints': endpoints
+    }
+
+
+def aggregate_profiles(folder, top):
+    """
+    Agrège les profils cProfile par endpoint
+
+    Args:
+        folder: Dossier data/profiles du serveur
+        top: Nombre de fonctions rapportées par endpoint (temps propre décroissant)
+
+    Returns:
+        Dict {endpoint Flask: {'profiles', 'top': [...]}}
+    """
+    by_endpoint = {}
+    for path in sorted(glob.glob(os.path.join(folder, '*.prof'))):
+        # <endpoint>-<horodatage>-<pid>-<n>.prof
+        endpoint = os.path.basename(path).rsplit('-', 3)[0]
+        by_endpoint.setdefault(endpoint, []).append(path)
+
+    report = {}
+    for endpoint, paths in sorted(by_endpoint.items()):
+        stats = pstats.Stats(paths[0])
+        for path in paths[1:]:
+            stats.add(path)
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+        report[endpoint] = {
+            'profiles': len(paths),
+            'top': [{
+                'function': f'{os.path.basename(filename)}:{line}({name})',
+                'calls_per_request': round(calls / len(paths), 1),
+                'self_ms_per_request': round(tottime * 1000 / len(paths), 3),
+                'cumulative_ms_per_request': round(cumtime * 1000 / len(paths), 3)
+            } for (filename, line, name), (_, calls, tottime, cumtime, _) in functions[:top]]
+        }
+    return report
+
+
+def http_json(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.load(response)
+
+
+def start_server(mode, port, workdir, profile):
+    """
+    Lance serve.py dans workdir (data/ et data/profiles/ y sont créés)
+
+    Returns:
+        Processus serveur
+    """
+    env = dict(os.environ, GEOQUIZZ_ASYNC_MODE=mode, GEOQUIZZ_HOST='127.0.0.1',
+               GEOQUIZZ_PORT=str(port), GEOQUIZZ_PROFILE='header' if profile else 'off')
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'serve.py')],
+                               cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_port(port):
+        process.kill()
+        raise RuntimeError(f'Le serveur {mode} ne démarre pas')
+    return process
+
+
+def compare(report, baseline, tolerance):
+    """
+    Affiche l'écart du débit et des p95 avec un rapport précédent
+
+    Returns:
+        Nombre de régressions
+    """
+    regressions = 0
+    previous = {step['concurrency']: step for step in baseline.get('steps', [])}
+    print(f"Comparaison avec {baseline.get('commit')} :", file=sys.stderr)
+    for step in report['steps']:
+        old = previous.get(step['concurrency'])
+        if not old:
+            continue
+        pairs = [('requests_per_s', old['requests_per_s'], step['requests_per_s'], True)]
+        for name in ENDPOINTS:
+            pairs.append((f'{name}_p95_ms', old['endpoints'][name]['p95_ms'],
+                          step['endpoints'][name]['p95_ms'], False))
+        for name, before, after, higher_is_better in pairs:
+            if not before or after is None:
+                continue
+            ratio = after / before
+            regression = ratio < 1 - tolerance if higher_is_better else ratio > 1 + tolerance
+            regressions += regression
+            print(f"  x{step['concurrency']:<4} {name:<16} {before:>10} -> {after:>10}  "
+                  f"x{ratio:.2f} {'(régression)' if regression else ''}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='Serveur déjà lancé et configuré (sinon serve.py est démarré)')
+    parser.add_argument('--mode', default='eventlet', choices=['threading', 'eventlet', 'gevent'])
+    parser.add_argument('--port', type=int, default=5860)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                        help='Paliers de clients simultanés')
+    parser.add_argument('--duration', type=float, default=20, help='Durée d\'un palier (secondes)')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--think-ms', type=float, default=0,
+                        help='Temps de réflexion moyen avant chaque réponse (0 = boucle serrée)')
+    parser.add_argument('--profile-sample', type=float, default=0,
+                        help='Part des requêtes profilées (0.05 = 5 %%)')
+    parser.add_argument('--profile-dir', help='data/profiles du serveur (avec --url)')
+    parser.add_argument('--profile-top', type=int, default=15)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Écrire le rapport JSON dans ce fichier')
+    parser.add_argument('--compare', help='Rapport JSON précédent à comparer')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Écart relatif toléré par --compare (0.15 = 15 %%)')
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    profile_dir = args.profile_dir
+    if url is None:
+        workdir = tempfile.mkdtemp()
+        photo_folder = os.path.join(tempfile.gettempdir(), 'geoquizz-photo-trees', 'load-50')
+        generate(photo_folder, 50, gps_ratio=1.0)
+        process = start_server(args.mode, args.port, workdir, args.profile_sample > 0)
+        url = f'http://127.0.0.1:{args.port}'
+        profile_dir = os.path.join(workdir, 'data', 'profiles')
+        http_json(f'{url}/api/config', {'photo_folder': photo_folder, 'num_rounds': args.rounds})
+
+    report = {
+        'benchmark': 'load_solo_http',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'url': url,
+        'mode': args.mode if process else None,
+        'rounds': args.rounds,
+        'think_ms': args.think_ms,
+        'steps': []
+    }
+    try:
+        for concurrency in args.concurrency:
+            step = run_step(url, concurrency, args.duration, args.rounds,
+                            args.think_ms / 1000, args.profile_sample, args.seed)
+            report['steps'].append(step)
+            print(f"{concurrency} clients : {step['requests_per_s']} requêtes/s", file=sys.stderr)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    if args.profile_sample and profile_dir:
+        report['profiles'] = aggregate_profiles(profile_dir, args.profile_top)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            # Code de sortie non nul en cas de régression (utilisable en CI)
+            return 1 if compare(report, json.load(f), args.tolerance) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,460 @@
+"""
+Test de charge : parties synchronisées complètes jouées par des clients Socket.IO
+
+Crée N salles de M joueurs simulés (python-socketio AsyncClient) qui jouent
+une partie complète avec des temps de réflexion réalistes : join_sync_room,
+player_ready, start_game (hôte), submit_sync_guess à chaque manche puis
+next_round (hôte). Par palier de salles, mesure :
+- la latence émission serveur -> réception client de countdown_started et
+  round_started (horodatage server_time, client et serveur sur la même machine) ;
+- la latence action -> événement (soumission -> guess_submitted, dernière
+  soumission -> round_results, next_round -> countdown_started) ;
+- le retard des timers serveur (round_started après l'échéance annoncée par
+  countdown_started) et les ticks d'affichage manqués qu'il provoque ;
+- CPU et mémoire de chaque processus serveur, et CPU du générateur lui-même.
+
+Les paliers s'arrêtent au premier dont le p95 de round_started dépasse le
+budget : le rapport donne le nombre de salles tenu dans le budget.
+
+Nécessite python-socketio[asyncio_client] (aiohttp) côté générateur.
+
+Usage:
+    python benchmarks/load_sync_games.py --rooms 5 10 20 40 --players 6
+    python benchmarks/load_sync_games.py --url http://127.0.0.1:5000 --server-pid 1234
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import socketio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from photo_tree import generate, LAT_RANGE, LON_RANGE  # noqa: E402
+from bench_ws_clients import percentile, wait_for_port  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Intervalle de rafraîchissement du décompte côté client (static/js/app.js)
+CLIENT_TICK_MS = 250
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def now_ms():
+    return time.time() * 1000
+
+
+def process_tree(pid):
+    """
+    PID d'un processus et de ses descendants (routeur + workers de cluster.py)
+
+    Returns:
+        Liste de PID (Linux uniquement, sinon [pid])
+    """
+    pids = [pid]
+    for current in pids:
+        try:
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def process_usage(pid):
+    """
+    Temps CPU cumulé et mémoire résidente d'un processus
+
+    Returns:
+        Tuple (secondes CPU, RSS en Mo) ou None
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime + stime
+        with open(f'/proc/{pid}/status') as f:
+            rss = next(int(line.split()[1]) / 1024 for line in f if line.startswith('VmRSS:'))
+        return cpu, rss
+    except (OSError, StopIteration, IndexError, ValueError):
+        return None
+
+
+class ProcessSampler:
+    """Échantillonne CPU et RSS des processus serveur pendant un palier"""
+
+    def __init__(self, root_pid, interval=0.5):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.start_cpu = {}
+        self.peak_rss = {}
+        self.last = {}
+        self.started = None
+
+    async def run(self, stop):
+        self.started = time.perf_counter()
+        while True:
+            for pid in process_tree(self.root_pid) if self.root_pid else []:
+                usage = process_usage(pid)
+                if usage is None:
+                    continue
+                self.start_cpu.setdefault(pid, usage[0])
+                self.peak_rss[pid] = max(self.peak_rss.get(pid, 0), usage[1])
+                self.last[pid] = usage
+            if stop.is_set():
+                return
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return [{
+            'pid': pid,
+            'cpu_percent': round((self.last[pid][0] - self.start_cpu[pid]) / elapsed * 100, 1),
+            'rss_peak_mb': round(self.peak_rss[pid], 1),
+            'rss_end_mb': round(self.last[pid][1], 1)
+        } for pid in self.last]
+
+
+class Stats:
+    """Latences et compteurs d'un palier"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.counters = {}
+
+    def add(self, name, value_ms):
+        self.latencies.setdefault(name, []).append(value_ms)
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        result = {}
+        for name, values in sorted(self.latencies.items()):
+            result[name] = {
+                'count': len(values),
+                'p50_ms': round(statistics.median(values), 1),
+                'p95_ms': round(percentile(values, 0.95), 1),
+                'p99_ms': round(percentile(values, 0.99), 1),
+                'max_ms': round(max(values), 1)
+            }
+        return result
+
+
+class SimulatedRoom:
+    """État partagé par les joueurs simulés d'une salle"""
+
+    def __init__(self, room_id, num_players):
+        self.room_id = room_id
+        self.num_players = num_players
+        self.ready_sent = 0
+        self.submitted = 0  # Réponses envoyées pendant la manche en cours
+        self.last_submit_ms = None
+        self.expected_round_start = None  # Échéance annoncée par countdown_started (ms)
+        self.next_round_sent_ms = None
+        self.finished = asyncio.Event()
+
+
+class SimulatedPlayer:
+    """Joueur simulé : un client Socket.IO qui joue une partie complète"""
+
+    def __init__(self, url, room, name, is_host, stats, rng, think):
+        self.url = url
+        self.room = room
+        self.name = name
+        self.is_host = is_host
+        self.stats = stats
+        self.rng = rng
+        self.think = think
+        self.submit_sent_ms = None
+        self.client = socketio.AsyncClient(reconnection=False)
+        self.tasks = set()
+
+        on = self.client.on
+        on('joined_room', self.on_joined)
+        on('countdown_started', self.on_countdown_started)
+        on('round_started', self.on_round_started)
+        on('guess_submitted', self.on_guess_submitted)
+        on('round_results', self.on_round_results)
+        on('game_finished', self.on_game_finished)
+        on('error', self.on_error)
+
+    def later(self, delay, coroutine_function, *args):
+        """Planifie une action après un temps de réflexion"""
+        async def run():
+            await asyncio.sleep(delay)
+            try:
+                await coroutine_function(*args)
+            except Exception:
+                self.stats.count('client_errors')
+        task = asyncio.ensure_future(run())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def think_time(self, bounds):
+        return self.rng.uniform(*bounds) * self.think['scale']
+
+    async def play(self, timeout):
+        await self.client.connect(f'{self.url}?room={self.room.room_id}',
+                                  transports=['websocket'], wait_timeout=10)
+        await self.client.emit('join_sync_room', {'room_id': self.room.room_id,
+                                                  'player_name': self.name})
+        try:
+            await asyncio.wait_for(self.room.finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.stats.count('games_timed_out')
+        finally:
+            for task in list(self.tasks):
+                task.cancel()
+            await self.client.disconnect()
+
+    async def send_ready(self):
+        await self.client.emit('player_ready', {'ready': True})
+        self.room.ready_sent += 1
+        if self.is_host:
+            self.later(0, self.start_when_ready)
+
+    async def start_when_ready(self):
+        # L'hôte lance quand tous les joueurs ont envoyé player_ready
+        while self.room.ready_sent < self.room.num_players:
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(0.3)
+        await self.client.emit('start_game')
+
+    async def send_guess(self):
+        self.submit_sent_ms = now_ms()
+        # Compté à l'envoi : round_results est diffusé avant l'accusé guess_submitted
+        self.room.submitted += 1
+        self.room.last_submit_ms = self.submit_sent_ms
+        await self.client.emit('submit_sync_guess', {
+            'latitude': self.rng.uniform(*LAT_RANGE),
+            'longitude': self.rng.uniform(*LON_RANGE)
+        })
+
+    async def send_next_round(self):
+        self.room.next_round_sent_ms = now_ms()
+        await self.client.emit('next_round')
+
+    # ----- Événements reçus -----
+
+    async def on_joined(self, data):
+        self.later(self.think_time(self.think['ready']), self.send_ready)
+
+    async def on_countdown_started(self, data):
+        received = now_ms()
+        self.stats.add('countdown_started_delivery', received - data['server_time'])
+        if self.is_host:
+            self.room.expected_round_start = data['deadline']
+            if self.room.next_round_sent_ms is not None:
+                self.stats.add('next_round_to_countdown', received - self.room.next_round_sent_ms)
+                self.room.next_round_sent_ms = None
+
+    async def on_round_started(self, data):
+        received = now_ms()
+        self.stats.add('round_started_delivery', received - data['server_time'])
+        if self.is_host:
+            if self.room.expected_round_start is not None:
+                lateness = max(0.0, data['server_time'] - self.room.expected_round_start)
+                self.stats.add('round_start_timer_lateness', lateness)
+                self.stats.count('missed_client_ticks', int(lateness // CLIENT_TICK_MS))
+
+        # Réponse avant la fin du timer
+        timer_ms = data['deadline'] - data['server_time']
+        delay = min(self.think_time(self.think['guess']), max(0.0, timer_ms / 1000 - 1))
+        self.later(delay, self.send_guess)
+
+    async def on_guess_submitted(self, data):
+        received = now_ms()
+        if self.submit_sent_ms is not None:
+            self.stats.add('guess_ack', received - self.submit_sent_ms)
+
+    async def on_round_results(self, data):
+        if not self.is_host:
+            return
+        received = now_ms()
+        if self.room.submitted >= self.room.num_players and self.room.last_submit_ms:
+            # Fin anticipée : tous les joueurs ont répondu
+            self.stats.add('last_guess_to_results', received - self.room.last_submit_ms)
+        self.stats.count('rounds_played')
+        self.room.submitted = 0
+        self.later(self.think_time(self.think['results']), self.send_next_round)
+
+    async def on_game_finished(self, data):
+        # Premier joueur notifié : les autres se déconnectent dès que finished est posé
+        if not self.room.finished.is_set():
+            self.stats.count('games_finished')
+        self.room.finished.set()
+
+    async def on_error(self, data):
+        message = (data or {}).get('message', '')
+        self.stats.count('server_errors')
+        if self.is_host and 'démarrer' in message:
+            # Tous les player_ready n'étaient pas encore traités : réessayer
+            self.later(0.5, self.client.emit, 'start_game')
+
+
+def http_json(url, payload=None):
+    """Requête HTTP JSON (POST si payload)"""
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)
+
+
+def start_server(mode, port):
+    """
+    Lance serve.py dans un dossier temporaire
+
+    Returns:
+        Processus serveur
+    """
+    env = dict(os.environ, GEOQUIZZ_ASYNC_MODE=mode, GEOQUIZZ_HOST='127.0.0.1',
+               GEOQUIZZ_PORT=str(port))
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'serve.py')],
+                               cwd=tempfile.mkdtemp(), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_port(port):
+        process.kill()
+        raise RuntimeError(f'Le serveur {mode} ne démarre pas')
+    return process
+
+
+async def run_step(url, num_rooms, num_players, rounds, think, timeout, server_pid, seed):
+    """
+    Joue num_rooms parties simultanées
+
+    Returns:
+        Dict de résultats du palier
+    """
+    stats = Stats()
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+
+    rooms = []
+    for i in range(num_rooms):
+        created = await loop.run_in_executor(None, http_json, f'{url}/api/sync/room/create', {
+            'room_name': f'Charge {i}', 'host_name': 'joueur-0', 'num_rounds': rounds,
+            'max_players': max(num_players, 2)
+        })
+        rooms.append(SimulatedRoom(created['room_id'], num_players))
+
+    players = [
+        SimulatedPlayer(url, room, f'joueur-{j}', j == 0, stats,
+                        random.Random(rng.random()), think)
+        for room in rooms for j in range(num_players)
+    ]
+
+    stop = asyncio.Event()
+    sampler = ProcessSampler(server_pid)
+    sampler_task = asyncio.ensure_future(sampler.run(stop))
+    client_cpu_start = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+
+    # Connexions étalées pour ne pas mesurer une rafale de handshakes
+    async def play(player, delay):
+        await asyncio.sleep(delay)
+        try:
+            await player.play(timeout)
+        except Exception:
+            stats.count('connect_failures')
+            player.room.finished.set()
+
+    spread = min(5.0, 0.01 * len(players))
+    await asyncio.gather(*(play(player, rng.uniform(0, spread)) for player in players))
+
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler_task
+    client_cpu_end = resource.getrusage(resource.RUSAGE_SELF)
+    client_cpu = ((client_cpu_end.ru_utime + client_cpu_end.ru_stime)
+                  - (client_cpu_start.ru_utime + client_cpu_start.ru_stime))
+
+    return {
+        'rooms': num_rooms,
+        'players_per_room': num_players,
+        'clients': len(players),
+        'duration_s': round(elapsed, 1),
+        'latencies': stats.summary(),
+        'counters': stats.counters,
+        'server_processes': sampler.report(),
+        'load_generator_cpu_percent': round(client_cpu / elapsed * 100, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='Serveur déjà lancé (sinon serve.py est démarré)')
+    parser.add_argument('--server-pid', type=int,
+                        help='PID du serveur déjà lancé (descendants inclus) pour CPU/mémoire')
+    parser.add_argument('--mode', default='eventlet', choices=['threading', 'eventlet', 'gevent'])
+    parser.add_argument('--port', type=int, default=5850)
+    parser.add_argument('--rooms', type=int, nargs='+', default=[5, 10, 20, 40],
+                        help='Paliers de salles simultanées')
+    parser.add_argument('--players', type=int, default=6)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--budget-ms', type=float, default=250,
+                        help='Budget du p95 de livraison de round_started')
+    parser.add_argument('--think-scale', type=float, default=1.0,
+                        help='Multiplie les temps de réflexion (0.2 = parties accélérées)')
+    parser.add_argument('--timeout', type=float, default=600, help='Durée max d\'une partie')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # Temps de réflexion (secondes) : prêt, réponse, lecture des résultats (hôte)
+    think = {'ready': (0.5, 3.0), 'guess': (3.0, 15.0), 'results': (2.0, 6.0),
+             'scale': args.think_scale}
+
+    process = None
+    url = args.url
+    server_pid = args.server_pid
+    if url is None:
+        photo_folder = os.path.join(tempfile.gettempdir(), 'geoquizz-photo-trees', 'load-50')
+        generate(photo_folder, 50, gps_ratio=1.0)
+        process = start_server(args.mode, args.port)
+        url = f'http://127.0.0.1:{args.port}'
+        server_pid = process.pid
+        http_json(f'{url}/api/config', {'photo_folder': photo_folder, 'num_rounds': args.rounds})
+
+    report = {'benchmark': 'load_sync_games', 'url': url,
+              'mode': args.mode if process else None, 'budget_ms': args.budget_ms,
+              'think_scale': args.think_scale, 'steps': [], 'max_rooms_within_budget': 0}
+    try:
+        for num_rooms in args.rooms:
+            step = asyncio.run(run_step(url, num_rooms, args.players, args.rounds, think,
+                                        args.timeout, server_pid, args.seed))
+            report['steps'].append(step)
+            print(f"{num_rooms} salles : round_started p95 "
+                  f"{step['latencies'].get('round_started_delivery', {}).get('p95_ms')} ms",
+                  file=sys.stderr)
+
+            delivery = step['latencies'].get('round_started_delivery')
+            within = (delivery is not None and delivery['p95_ms'] <= args.budget_ms
+                      and not step['counters'].get('games_timed_out'))
+            if not within:
+                break
+            report['max_rooms_within_budget'] = num_rooms
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Générateur d'arborescences de photos synthétiques pour les benchmarks
+
+Crée N petites images réparties en sous-dossiers : des JPEG avec
+coordonnées GPS EXIF (tirées en France métropolitaine), des JPEG sans GPS
+et des PNG/TIFF/BMP (formats scannés mais sans EXIF lisible), plus quelques
+fichiers non-image. Un manifeste (.photo_tree.json) permet de réutiliser
+une arborescence déjà générée avec les mêmes paramètres.
+
+Usage:
+    python benchmarks/photo_tree.py /tmp/photos-10k --files 10000 --gps-ratio 0.8
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from PIL import Image
+
+MANIFEST = '.photo_tree.json'
+
+# Emprise de la France métropolitaine (latitude, longitude)
+LAT_RANGE = (42.3, 51.1)
+LON_RANGE = (-4.8, 8.2)
+
+# Formats scannés par PhotoManager mais sans EXIF GPS lisible (voir other_ratio)
+OTHER_FORMATS = (('png', 'PNG'), ('tiff', 'TIFF'), ('bmp', 'BMP'))
+
+FILES_PER_FOLDER = 200
+
+
+def to_dms(value):
+    """
+    Convertit des degrés décimaux en (degrés, minutes, secondes) EXIF
+
+    Args:
+        value: Coordonnée en degrés décimaux (valeur absolue)
+
+    Returns:
+        Tuple de trois nombres
+    """
+    degrees = int(value)
+    minutes_float = (value - degrees) * 60
+    minutes = int(minutes_float)
+    seconds = round((minutes_float - minutes) * 60, 4)
+    return (degrees, minutes, seconds)
+
+
+def gps_exif(lat, lon):
+    """
+    Bloc EXIF contenant uniquement les coordonnées GPS
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+
+    Returns:
+        Bytes EXIF à passer à Image.save(exif=...)
+    """
+    exif = Image.Exif()
+    exif[0x8825] = {  # GPSInfo
+        1: 'N' if lat >= 0 else 'S',
+        2: to_dms(abs(lat)),
+        3: 'E' if lon >= 0 else 'W',
+        4: to_dms(abs(lon))
+    }
+    return exif.tobytes()
+
+
+def generate(root, files, gps_ratio=0.8, other_ratio=0.25, junk_ratio=0.02,
+             image_size=(32, 24), seed=0):
+    """
+    Génère (ou réutilise) une arborescence de photos synthétiques
+
+    Args:
+        root: Dossier racine à créer
+        files: Nombre de fichiers image
+        gps_ratio: Part des images en JPEG avec GPS
+        other_ratio: Part des images sans GPS enregistrées en PNG/TIFF/BMP
+        junk_ratio: Fichiers non-image ajoutés (part de files)
+        image_size: Taille des images (pixels)
+        seed: Graine du tirage (arborescence reproductible)
+
+    Returns:
+        Manifeste (dict) : paramètres, nombre de photos avec GPS, durée
+    """
+    params = {
+        'files': files, 'gps_ratio': gps_ratio, 'other_ratio': other_ratio,
+        'junk_ratio': junk_ratio, 'image_size': list(image_size), 'seed': seed
+    }
+
+    manifest_path = os.path.join(root, MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('params') == params:
+            return manifest
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    with_gps = 0
+    formats = {}
+
+    for i in range(files):
+        folder = os.path.join(root, f'album_{i // FILES_PER_FOLDER:04d}')
+        if i % FILES_PER_FOLDER == 0:
+            os.makedirs(folder, exist_ok=True)
+
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        image = Image.new('RGB', tuple(image_size), color)
+
+        if rng.random() < gps_ratio:
+            lat = rng.uniform(*LAT_RANGE)
+            lon = rng.uniform(*LON_RANGE)
+            image.save(os.path.join(folder, f'photo_{i:06d}.jpg'), 'JPEG', quality=70,
+                       exif=gps_exif(lat, lon))
+            with_gps += 1
+            extension = 'jpg'
+        elif rng.random() < other_ratio:
+            extension, pil_format = rng.choice(OTHER_FORMATS)
+            image.save(os.path.join(folder, f'photo_{i:06d}.{extension}'), pil_format)
+        else:
+            extension = 'jpg'
+            image.save(os.path.join(folder, f'photo_{i:06d}.jpg'), 'JPEG', quality=70)
+        formats[extension] = formats.get(extension, 0) + 1
+
+    # Fichiers non-image répartis dans les dossiers existants
+    junk = int(files * junk_ratio)
+    num_folders = max(1, -(-files // FILES_PER_FOLDER))
+    for i in range(junk):
+        folder = os.path.join(root, f'album_{i % num_folders:04d}')
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f'notes_{i:05d}.txt'), 'w', encoding='utf-8') as f:
+            f.write('Pas une photo\n')
+
+    manifest = {
+        'params': params,
+        'photos_with_gps': with_gps,
+        'formats': formats,
+        'junk_files': junk,
+        'generation_seconds': round(time.perf_counter() - start, 2)
+    }
+    os.makedirs(root, exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('root')
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument('--gps-ratio', type=float, default=0.8)
+    parser.add_argument('--other-ratio', type=float, default=0.25)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    manifest = generate(args.root, args.files, gps_ratio=args.gps_ratio,
+                        other_ratio=args.other_ratio, seed=args.seed)
+    print(json.dumps(manifest, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Encodage BlurHash (https://blurha.sh) des aperçus de photos
+
+Une photo est résumée par quelques composantes de cosinus (4×3 par défaut),
+encodées en base 83 : une trentaine de caractères, décodés côté client
+(static/js/app.js) en une image floue affichée pendant le chargement.
+
+Le calcul se fait sur une vignette de PLACEHOLDER_SIZE pixels : seules les
+basses fréquences comptent, et la base est séparable (somme par ligne puis
+par colonne), soit ~1 ms par photo en Python pur.
+"""
+import math
+
+import derivatives
+
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+# Plus grand côté de la vignette analysée (pixels)
+PLACEHOLDER_SIZE = 32
+
+# Composantes (horizontales, verticales) pour une photo paysage
+COMPONENTS = (4, 3)
+
+_SRGB_TO_LINEAR = [((v / 255) / 12.92) if v / 255 <= 0.04045
+                   else ((v / 255 + 0.055) / 1.055) ** 2.4 for v in range(256)]
+
+
+def _encode83(value, length):
+    return ''.join(BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+
+def _linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def encode(pixels, width, height, x_components=4, y_components=3):
+    """
+    Encode des pixels RGB en BlurHash
+
+    Args:
+        pixels: Séquence de tuples (r, g, b) 0-255, ligne par ligne
+        width: Largeur en pixels
+        height: Hauteur en pixels
+        x_components: Composantes horizontales (1 à 9)
+        y_components: Composantes verticales (1 à 9)
+
+    Returns:
+        Chaîne BlurHash
+    """
+    if not (1 <= x_components <= 9 and 1 <= y_components <= 9):
+        raise ValueError('Composantes BlurHash entre 1 et 9')
+
+    linear = [(_SRGB_TO_LINEAR[r], _SRGB_TO_LINEAR[g], _SRGB_TO_LINEAR[b])
+              for r, g, b in pixels]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)]
+             for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)]
+             for j in range(y_components)]
+
+    # Somme horizontale par ligne pour chaque composante i, puis verticale pour j
+    rows = []
+    for y in range(height):
+        row = linear[y * width:(y + 1) * width]
+        sums = []
+        for i in range(x_components):
+            basis = cos_x[i]
+            r = g = b = 0.0
+            for weight, (pr, pg, pb) in zip(basis, row):
+                r += weight * pr
+                g += weight * pg
+                b += weight * pb
+            sums.append((r, g, b))
+        rows.append(sums)
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = (1 if i == 0 and j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                weight = cos_y[j][y]
+                sr, sg, sb = rows[y][i]
+                r += weight * sr
+                g += weight * sg
+                b += weight * sb
+            factors.append((r * normalisation, g * normalisation, b * normalisation))
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((x_components - 1) + (y_components - 1) * 9, 1)
+
+    if ac:
+        actual_max = max(abs(channel) for factor in ac for channel in factor)
+        quantised_max = int(max(0, min(82, math.floor(actual_max * 166 - 0.5))))
+        maximum = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        maximum = 1
+        result += _encode83(0, 1)
+
+    result += _encode83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8)
+                        + _linear_to_srgb(dc[2]), 4)
+
+    for factor in ac:
+        r, g, b = (int(max(0, min(18, math.floor(_sign_pow(channel / maximum, 0.5) * 9 + 9.5))))
+                   for channel in factor)
+        result += _encode83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def placeholder(image):
+    """
+    Aperçu BlurHash d'une image Pillow, dans le sens d'affichage (EXIF)
+
+    Args:
+        image: Image Pillow ouverte (non décodée : JPEG réduit au décodage)
+
+    Returns:
+        Dict {blurhash, width, height} (dimensions d'affichage de l'original)
+    """
+    from PIL import ImageOps
+
+    width, height = derivatives.display_size(image)
+
+    # JPEG : décodage directement à 1/2, 1/4 ou 1/8 (bien plus rapide)
+    image.draft('RGB', (PLACEHOLDER_SIZE * 2, PLACEHOLDER_SIZE * 2))
+    thumbnail = ImageOps.exif_transpose(image.convert('RGB'))
+    thumbnail.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+
+    x_components, y_components = COMPONENTS
+    if thumbnail.width < thumbnail.height:
+        x_components, y_components = y_components, x_components
+
+    return {
+        'blurhash': encode(list(thumbnail.getdata()), thumbnail.width, thumbnail.height,
+                           x_components, y_components),
+        'width': width,
+        'height': height
+    }
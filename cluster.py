@@ -0,0 +1,395 @@
+"""
+Déploiement multi-processus de GeoQuizz
+
+Chaque salle (et chaque session solo) appartient à un worker : son ID est
+généré de sorte que owner_of(id) désigne le processus qui l'a créée. Un
+routeur TCP placé devant les workers envoie chaque requête HTTP ou connexion
+Socket.IO portant un ID vers son worker propriétaire ; les autres requêtes
+sont réparties par adresse client. Les émissions Socket.IO transitent par une
+file de messages (Redis, ou un répertoire partagé pour les tests en local).
+
+Usage:
+    python cluster.py --workers 4 --port 5000
+    python cluster.py --workers 4 --message-queue redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import os
+import pickle
+import re
+import signal
+import subprocess
+import sys
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from urllib.parse import urlsplit, parse_qs
+
+import socketio
+
+# Segments d'URL portant un ID de salle ou de session
+ROUTE_PATTERNS = [
+    re.compile(r'^/api/game/([^/?]+)'),
+    re.compile(r'^/api/multiplayer/room/([^/?]+)'),
+    re.compile(r'^/api/sync/room/([^/?]+)'),
+    re.compile(r'^/join/([^/?]+)'),
+]
+
+# Segments qui ne sont pas des IDs (création de salle)
+RESERVED_SEGMENTS = {'create'}
+
+DEFAULT_QUEUE_FOLDER = os.path.join('data', 'socketio-queue')
+
+
+def cluster_settings():
+    """
+    Lit la configuration du worker courant depuis l'environnement
+
+    Returns:
+        Dict avec workers, worker_index et message_queue
+    """
+    return {
+        'workers': max(1, int(os.environ.get('GEOQUIZZ_WORKERS', 1))),
+        'worker_index': int(os.environ.get('GEOQUIZZ_WORKER_INDEX', 0)),
+        'message_queue': os.environ.get('GEOQUIZZ_MESSAGE_QUEUE') or None
+    }
+
+
+def owner_of(key, workers):
+    """
+    Worker propriétaire d'un ID de salle ou de session
+
+    Args:
+        key: ID de salle ou de session
+        workers: Nombre de workers
+
+    Returns:
+        Index du worker (0 à workers - 1)
+    """
+    if workers <= 1:
+        return 0
+    return zlib.crc32(key.encode('utf-8')) % workers
+
+
+def new_owned_id(worker_index=0, workers=1, length=None):
+    """
+    Génère un ID aléatoire appartenant au worker donné
+
+    Args:
+        worker_index: Index du worker courant
+        workers: Nombre de workers
+        length: Longueur de l'ID (None = UUID complet)
+
+    Returns:
+        ID dont owner_of() désigne worker_index
+    """
+    while True:
+        ident = str(uuid.uuid4())
+        if length:
+            ident = ident[:length]
+        if owner_of(ident, workers) == worker_index:
+            return ident
+
+
+def route_key(target):
+    """
+    Extrait la clé de routage d'une cible de requête HTTP
+
+    Args:
+        target: Chemin et query string (ex: /socket.io/?room=ab12cd34&EIO=4)
+
+    Returns:
+        ID de salle ou de session, ou None si la requête n'en porte pas
+    """
+    parts = urlsplit(target)
+
+    room = parse_qs(parts.query).get('room')
+    if room and room[0]:
+        return room[0]
+
+    for pattern in ROUTE_PATTERNS:
+        match = pattern.match(parts.path)
+        if match and match.group(1) not in RESERVED_SEGMENTS:
+            return match.group(1)
+
+    return None
+
+
+@contextmanager
+def file_lock(path, timeout=60.0, stale_after=30.0):
+    """
+    Verrou inter-processus portable (fichier créé en exclusif)
+
+    Le fichier de verrou contient un jeton propre à chaque prise : il n'est
+    supprimé à la sortie que s'il appartient encore à cet appel (un verrou
+    jugé abandonné a pu être repris par un autre processus).
+
+    Args:
+        path: Fichier protégé (le verrou est path + '.lock')
+        timeout: Attente maximale avant d'abandonner (supérieure à
+                 stale_after : un verrou abandonné est repris avant)
+        stale_after: Âge au-delà duquel un verrou abandonné est supprimé
+
+    Raises:
+        TimeoutError: Verrou toujours tenu par un autre processus après timeout
+    """
+    lock_path = path + '.lock'
+    token = f'{os.getpid()}-{uuid.uuid4().hex}'.encode()
+    deadline = time.time() + timeout
+
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > stale_after:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.time() > deadline:
+                raise TimeoutError(f'Verrou {lock_path} toujours tenu après {timeout} s')
+            time.sleep(0.01)
+        else:
+            try:
+                os.write(fd, token)
+            finally:
+                os.close(fd)
+            break
+
+    try:
+        yield
+    finally:
+        try:
+            with open(lock_path, 'rb') as f:
+                owned = f.read() == token
+            if owned:
+                os.remove(lock_path)
+        except OSError:
+            pass
+
+
+class FileQueueManager(socketio.PubSubManager):
+    """
+    File de messages Socket.IO dans un répertoire partagé
+
+    Remplaçant de Redis pour les tests et les déploiements sur une seule
+    machine : chaque message est un fichier, lu par tous les workers. Le
+    répertoire doit rester privé (les messages sont sérialisés avec pickle).
+    """
+    name = 'file'
+
+    def __init__(self, url='file://' + DEFAULT_QUEUE_FOLDER, channel='socketio',
+                 write_only=False, logger=None, poll_interval=0.02, retention=60.0):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.folder = os.path.join(urlsplit(url).netloc + urlsplit(url).path, channel)
+        self.poll_interval = poll_interval
+        self.retention = retention
+        os.makedirs(self.folder, mode=0o700, exist_ok=True)
+
+    def _publish(self, data):
+        name = f'{time.time_ns():020d}-{uuid.uuid4().hex}.msg'
+        tmp_path = os.path.join(self.folder, name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f)
+        os.replace(tmp_path, os.path.join(self.folder, name))
+
+    def _listen(self):
+        seen = set()
+        started = f'{time.time_ns():020d}'
+
+        while True:
+            now_ns = time.time_ns()
+            expired = f'{now_ns - int(self.retention * 1e9):020d}'
+
+            for name in sorted(os.listdir(self.folder)):
+                if not name.endswith('.msg'):
+                    continue
+
+                if name < expired:
+                    # Nettoyage des messages anciens, par n'importe quel worker
+                    try:
+                        os.remove(os.path.join(self.folder, name))
+                    except OSError:
+                        pass
+                    seen.discard(name)
+                    continue
+
+                if name < started or name in seen:
+                    continue
+
+                seen.add(name)
+                try:
+                    with open(os.path.join(self.folder, name), 'rb') as f:
+                        yield pickle.load(f)
+                except (OSError, EOFError, pickle.UnpicklingError):
+                    continue
+
+            self.server.sleep(self.poll_interval)
+
+
+def socketio_options(settings=None):
+    """
+    Options SocketIO pour la file de messages configurée
+
+    Args:
+        settings: Résultat de cluster_settings() (lu depuis l'environnement si None)
+
+    Returns:
+        Dict de paramètres à passer à SocketIO()
+    """
+    settings = settings or cluster_settings()
+    url = settings['message_queue']
+
+    if not url:
+        return {}
+    if url.startswith('file://'):
+        return {'client_manager': FileQueueManager(url)}
+    return {'message_queue': url}
+
+
+class AffinityRouter:
+    """
+    Routeur TCP : envoie chaque connexion au worker propriétaire de sa clé
+
+    Les requêtes HTTP ordinaires sont forcées en Connection: close pour être
+    routées une par une ; les upgrades WebSocket sont relayées telles quelles.
+    """
+
+    def __init__(self, worker_ports, worker_host='127.0.0.1'):
+        self.worker_ports = worker_ports
+        self.worker_host = worker_host
+
+    def pick_worker(self, target, client_host):
+        """
+        Choisit le worker d'une requête
+
+        Args:
+            target: Cible de la requête HTTP
+            client_host: Adresse du client (affinité des requêtes sans clé)
+
+        Returns:
+            Index du worker
+        """
+        key = route_key(target) or client_host or ''
+        return owner_of(key, len(self.worker_ports))
+
+    async def handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+
+        lines = head.split(b'\r\n')
+        try:
+            target = lines[0].split(b' ')[1].decode('latin-1')
+        except IndexError:
+            writer.close()
+            return
+
+        peer = writer.get_extra_info('peername')
+        index = self.pick_worker(target, peer[0] if peer else None)
+
+        upgrade = any(line.lower().startswith(b'upgrade:') for line in lines)
+        if not upgrade:
+            lines = [line for line in lines if not line.lower().startswith(b'connection:')]
+            lines.insert(1, b'Connection: close')
+            head = b'\r\n'.join(lines)
+
+        try:
+            up_reader, up_writer = await asyncio.open_connection(
+                self.worker_host, self.worker_ports[index])
+        except OSError:
+            writer.write(b'HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n'
+                         b'Connection: close\r\n\r\n')
+            await writer.drain()
+            writer.close()
+            return
+
+        up_writer.write(head)
+        await asyncio.gather(self._pipe(reader, up_writer), self._pipe(up_reader, writer))
+
+    async def _pipe(self, reader, writer):
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def spawn_workers(workers, base_port, message_queue, script='serve.py'):
+    """
+    Démarre les processus workers
+
+    Args:
+        workers: Nombre de workers
+        base_port: Port du premier worker (les suivants sont consécutifs)
+        message_queue: URL de la file de messages partagée
+        script: Point d'entrée lancé pour chaque worker
+
+    Returns:
+        Liste des processus
+    """
+    processes = []
+    for index in range(workers):
+        env = dict(os.environ)
+        env.update({
+            'GEOQUIZZ_WORKERS': str(workers),
+            'GEOQUIZZ_WORKER_INDEX': str(index),
+            'GEOQUIZZ_MESSAGE_QUEUE': message_queue,
+            'GEOQUIZZ_HOST': '127.0.0.1',
+            'GEOQUIZZ_PORT': str(base_port + index)
+        })
+        processes.append(subprocess.Popen([sys.executable, script], env=env))
+    return processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GeoQuizz multi-processus')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--worker-base-port', type=int, default=5101)
+    parser.add_argument('--message-queue', default='file://' + DEFAULT_QUEUE_FOLDER,
+                        help='redis://... ou file://dossier (défaut: %(default)s)')
+    args = parser.parse_args()
+
+    processes = spawn_workers(args.workers, args.worker_base_port, args.message_queue)
+    router = AffinityRouter([args.worker_base_port + i for i in range(args.workers)])
+
+    def shutdown(*_):
+        for process in processes:
+            process.terminate()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+
+    print("=" * 50)
+    print(f"GeoQuizz - {args.workers} workers derrière le port {args.port}")
+    print(f"File de messages : {args.message_queue}")
+    print("=" * 50)
+
+    try:
+        asyncio.run(router.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""
+Compression des réponses et empreintes des fichiers statiques
+
+- Fichiers de static/ : lus, hachés et compressés une fois au démarrage
+  (gzip tout de suite, brotli en tâche de fond, plus lent au niveau maximal).
+  url_for('static', filename='js/app.js') produit /static/js/app.<hash>.js,
+  servi avec Cache-Control immutable : le navigateur ne le redemande plus
+  jusqu'à la prochaine modification du fichier.
+- Réponses dynamiques (JSON, HTML, texte) au-delà de min_size : compressées
+  à la volée dans le meilleur encodage accepté par le client.
+
+brotli (ou brotlicffi) est optionnel : sans lui, seul gzip est proposé.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+from flask import current_app, request
+
+# Taille minimale d'une réponse dynamique compressée (octets)
+COMPRESS_MIN_SIZE = 1024
+
+# Niveaux : maximal pour les fichiers statiques (compressés une fois), rapide à la volée
+STATIC_LEVELS = {'br': 11, 'gzip': 9}
+DYNAMIC_LEVELS = {'br': 4, 'gzip': 6}
+
+# Types compressés à la volée (les images et polices sont déjà compressées)
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'text/plain', 'text/css',
+                      'application/javascript', 'text/javascript', 'image/svg+xml')
+
+HASH_LENGTH = 10
+HASHED_NAME = re.compile(r'^(?P<base>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % HASH_LENGTH)
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def _load_brotli():
+    """Module brotli ou brotlicffi (même API), ou None"""
+    for name in ('brotli', 'brotlicffi'):
+        try:
+            return __import__(name)
+        except ImportError:
+            continue
+    return None
+
+
+_brotli = _load_brotli()
+
+
+def available_encodings():
+    """Encodages proposés, du préféré au moins bon"""
+    return ('br', 'gzip') if _brotli else ('gzip',)
+
+
+def compress(data, encoding, level):
+    """
+    Args:
+        data: Octets à compresser
+        encoding: 'br' ou 'gzip'
+        level: Niveau (brotli : quality 0-11, gzip : 1-9)
+
+    Returns:
+        Octets compressés
+    """
+    if encoding == 'br':
+        return _brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def negotiate(accept_encoding, encodings=None):
+    """
+    Choisit l'encodage d'une réponse
+
+    Args:
+        accept_encoding: En-tête Accept-Encoding analysé (request.accept_encodings)
+        encodings: Encodages disponibles pour cette réponse (préférés d'abord)
+
+    Returns:
+        'br', 'gzip' ou None (réponse non compressée)
+    """
+    for encoding in encodings or available_encodings():
+        if accept_encoding[encoding] > 0:
+            return encoding
+    return None
+
+
+@dataclass
+class StaticAsset:
+    """Fichier statique, ses variantes compressées et son empreinte"""
+    filename: str
+    path: str
+    mtime: float
+    digest: str
+    mimetype: str
+    variants: dict = field(default_factory=dict)  # {encoding ou 'identity': octets}
+
+    @property
+    def hashed_filename(self):
+        base, ext = os.path.splitext(self.filename)
+        return f'{base}.{self.digest}{ext}'
+
+
+class StaticAssets:
+    """Sert static/ avec URLs à empreinte, cache immutable et variantes pré-compressées"""
+
+    def __init__(self, folder):
+        """
+        Args:
+            folder: Dossier des fichiers statiques (app.static_folder)
+        """
+        self.folder = folder
+        self.assets = {}  # {chemin relatif: StaticAsset}
+        self.hashed = {}  # {chemin avec empreinte: chemin relatif}
+        self._lock = threading.Lock()
+
+    def build(self, encodings=('gzip',)):
+        """
+        Lit et hache tous les fichiers, et compresse ceux qui s'y prêtent
+
+        Args:
+            encodings: Variantes construites tout de suite (les autres : precompress)
+        """
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, self.folder).replace(os.sep, '/')
+                self._load(filename, path, encodings)
+
+    def precompress(self, encodings=None, pause=None):
+        """
+        Construit les variantes manquantes (tâche de fond au démarrage)
+
+        Args:
+            encodings: Encodages à construire (tous ceux disponibles par défaut)
+            pause: Fonction appelée entre deux fichiers (ex : socketio.sleep(0)
+                   pour laisser tourner les autres green threads)
+        """
+        for asset in list(self.assets.values()):
+            if not self._compressible(asset.mimetype):
+                continue
+            for encoding in encodings or available_encodings():
+                if encoding not in asset.variants:
+                    compressed = compress(asset.variants['identity'], encoding,
+                                          STATIC_LEVELS[encoding])
+                    if len(compressed) < len(asset.variants['identity']):
+                        asset.variants[encoding] = compressed
+                if pause:
+                    pause()
+
+    def _load(self, filename, path, encodings):
+        with open(path, 'rb') as f:
+            data = f.read()
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        asset = StaticAsset(filename=filename, path=path, mtime=os.path.getmtime(path),
+                            digest=hashlib.sha256(data).hexdigest()[:HASH_LENGTH],
+                            mimetype=mimetype, variants={'identity': data})
+        if self._compressible(mimetype):
+            for encoding in encodings:
+                compressed = compress(data, encoding, STATIC_LEVELS[encoding])
+                if len(compressed) < len(data):
+                    asset.variants[encoding] = compressed
+
+        with self._lock:
+            previous = self.assets.get(filename)
+            if previous:
+                self.hashed.pop(previous.hashed_filename, None)
+            self.assets[filename] = asset
+            self.hashed[asset.hashed_filename] = filename
+        return asset
+
+    @staticmethod
+    def _compressible(mimetype):
+        return mimetype in COMPRESSIBLE_TYPES
+
+    def _get(self, filename):
+        """Fichier connu, relu s'il a changé en mode debug (édition de static/)"""
+        asset = self.assets.get(filename)
+        if asset and current_app.debug:
+            try:
+                if os.path.getmtime(asset.path) != asset.mtime:
+                    asset = self._load(filename, asset.path, available_encodings())
+            except OSError:
+                return None
+        return asset
+
+    def url_defaults(self, endpoint, values):
+        """Hook url_defaults : url_for('static') désigne le fichier avec empreinte"""
+        if endpoint != 'static' or 'filename' not in values:
+            return
+        asset = self._get(values['filename'])
+        if asset:
+            values['filename'] = asset.hashed_filename
+
+    def send(self, filename):
+        """
+        Vue remplaçant la route static de Flask
+
+        Args:
+            filename: Chemin demandé, avec ou sans empreinte
+
+        Returns:
+            Réponse (variante compressée si acceptée, 304 si inchangée)
+        """
+        immutable = False
+        if filename in self.hashed:
+            filename = self.hashed[filename]
+            immutable = True
+        else:
+            match = HASHED_NAME.match(filename)
+            if match and filename not in self.assets:
+                # Empreinte d'une version précédente (page en cache pendant un
+                # déploiement) : servir la version courante sans cache long
+                filename = match.group('base') + match.group('ext')
+
+        asset = self._get(filename)
+        if asset is None:
+            return current_app.response_class('Not Found', status=404, mimetype='text/plain')
+
+        encodings = [encoding for encoding in available_encodings() if encoding in asset.variants]
+        encoding = negotiate(request.accept_encodings, encodings)
+        response = current_app.response_class(asset.variants[encoding or 'identity'],
+                                              mimetype=asset.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if len(asset.variants) > 1:
+            response.vary.add('Accept-Encoding')
+        response.set_etag(f'{asset.digest}-{encoding or "identity"}')
+        if immutable:
+            response.headers['Cache-Control'] = IMMUTABLE
+        else:
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+
+def compress_response(response, min_size=COMPRESS_MIN_SIZE):
+    """
+    Hook after_request : compresse les réponses dynamiques assez grandes
+
+    Args:
+        response: Réponse Flask
+        min_size: Taille minimale compressée (octets)
+
+    Returns:
+        La réponse, compressée si le client l'accepte
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding, DYNAMIC_LEVELS[encoding]))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # Même contenu, autre représentation : ETag faible (If-None-Match compare faiblement)
+        response.set_etag(etag, weak=True)
+    return response
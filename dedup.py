@@ -0,0 +1,139 @@
+"""
+Détection des photos en double lors du scan
+
+Les dossiers partagés contiennent souvent la même prise plusieurs fois
+(original, copie retouchée, copie réduite). Deux photos sont regroupées :
+- si leur contenu est identique (SHA-1 du fichier, calculé seulement pour les
+  fichiers de même taille, seuls candidats possibles) ;
+- ou si leurs empreintes perceptuelles (dHash 64 bits) diffèrent d'au plus
+  DHASH_DISTANCE bits et que leurs coordonnées GPS sont à moins de
+  GPS_DISTANCE_M mètres.
+
+Une seule photo par groupe (la plus grande) reste dans le tirage des manches.
+"""
+import hashlib
+import math
+
+# Bits d'écart maximal entre deux dHash d'une même prise (sur 64)
+DHASH_DISTANCE = 10
+
+# Distance maximale entre les coordonnées GPS de deux copies (mètres)
+GPS_DISTANCE_M = 25
+
+# Maille de la grille de regroupement (degrés, ~110 m en latitude)
+GRID_STEP = 0.001
+
+EARTH_RADIUS_M = 6371000
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    SHA-1 du contenu d'un fichier
+
+    Args:
+        path: Chemin du fichier
+        chunk_size: Taille des blocs lus
+
+    Returns:
+        Empreinte hexadécimale
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dhash(image, size=8):
+    """
+    Empreinte perceptuelle (difference hash) d'une image Pillow
+
+    Compare chaque pixel à son voisin de droite sur une vignette en niveaux de
+    gris de (size+1)×size : insensible au redimensionnement, à la compression
+    et aux retouches légères. L'orientation EXIF est appliquée d'abord (une
+    copie exportée a souvent perdu la balise mais gardé la rotation).
+
+    Args:
+        image: Image Pillow ouverte
+        size: Côté de l'empreinte (size² bits)
+
+    Returns:
+        Empreinte hexadécimale (16 caractères pour size=8)
+    """
+    from PIL import Image, ImageOps
+
+    # JPEG pas encore décodé : décodage réduit (sans effet si l'image est déjà chargée)
+    image.draft('L', (size * 8, size * 8))
+    gray = ImageOps.exif_transpose(image.convert('L')).resize((size + 1, size), Image.BILINEAR)
+    pixels = list(gray.getdata())
+    value = 0
+    for y in range(size):
+        row = pixels[y * (size + 1):(y + 1) * (size + 1)]
+        for x in range(size):
+            value = (value << 1) | (row[x] > row[x + 1])
+    return f'{value:0{size * size // 4}x}'
+
+
+def gps_distance_m(lat1, lon1, lat2, lon2):
+    """Distance approchée (équirectangulaire) entre deux points proches, en mètres"""
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return EARTH_RADIUS_M * math.hypot(x, y)
+
+
+def group_duplicates(photos):
+    """
+    Regroupe les photos en double
+
+    Args:
+        photos: Liste de dicts {latitude, longitude, sha1, dhash} (sha1 et
+                dhash à None s'ils ne sont pas encore calculés)
+
+    Returns:
+        Liste de groupes (listes d'indices dans photos), un par prise distincte
+    """
+    parent = list(range(len(photos)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    # Contenu identique
+    by_digest = {}
+    for i, photo in enumerate(photos):
+        if photo.get('sha1'):
+            union(i, by_digest.setdefault(photo['sha1'], i))
+
+    # Prise proche : seules les photos de cellules voisines sont comparées
+    grid = {}
+    hashes = {}
+    for i, photo in enumerate(photos):
+        if photo.get('dhash'):
+            hashes[i] = int(photo['dhash'], 16)
+            cell = (math.floor(photo['latitude'] / GRID_STEP), math.floor(photo['longitude'] / GRID_STEP))
+            grid.setdefault(cell, []).append(i)
+
+    for (row, col), members in grid.items():
+        neighbours = [j for d_row in (-1, 0, 1) for d_col in (-1, 0, 1)
+                      for j in grid.get((row + d_row, col + d_col), ())]
+        for i in members:
+            for j in neighbours:
+                if j <= i or find(i) == find(j):
+                    continue
+                if bin(hashes[i] ^ hashes[j]).count('1') > DHASH_DISTANCE:
+                    continue
+                if gps_distance_m(photos[i]['latitude'], photos[i]['longitude'],
+                                  photos[j]['latitude'], photos[j]['longitude']) <= GPS_DISTANCE_M:
+                    union(i, j)
+
+    groups = {}
+    for i in range(len(photos)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
@@ -0,0 +1,190 @@
+"""
+Déclinaisons des photos en plusieurs largeurs et formats
+
+Une photo de 12 Mpx pèse plusieurs Mo alors qu'un téléphone en affiche
+quelques centaines de pixels de large. Chaque photo est déclinée en WIDTHS
+pixels de large, en JPEG progressif et en WebP/AVIF si Pillow sait les écrire.
+Le client (static/js/app.js) construit un srcset par format et le navigateur
+télécharge la plus petite déclinaison suffisante pour son écran.
+
+Les déclinaisons sont produites à la première demande puis gardées sur
+disque, sous une clé dérivée du chemin de l'original, avec la date de
+modification de l'original : une photo modifiée est redéclinée et sa
+nouvelle déclinaison remplace l'ancienne. Elles ne contiennent pas les
+métadonnées EXIF de l'original, coordonnées GPS comprises.
+"""
+import functools
+import hashlib
+import os
+import threading
+import time
+
+import metrics
+
+# Largeurs proposées (pixels) ; une photo plus étroite n'est pas agrandie
+WIDTHS = (480, 960, 1920)
+
+# Formats, du préféré au moins bon : {nom: (format Pillow, options d'enregistrement)}
+# Le type MIME est image/<nom>
+FORMATS = {
+    'avif': ('AVIF', {'quality': 60, 'speed': 8}),
+    'webp': ('WEBP', {'quality': 80, 'method': 2}),  # method 4 : 3× plus lent pour ~5 % de gain
+    'jpeg': ('JPEG', {'quality': 82, 'progressive': True, 'optimize': True}),
+}
+
+EXTENSIONS = {'avif': '.avif', 'webp': '.webp', 'jpeg': '.jpg'}
+
+# Orientations EXIF qui échangent largeur et hauteur à l'affichage
+ORIENTATION_TAG = 0x0112
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+# Verrous répartis par déclinaison : deux demandes simultanées de la même
+# déclinaison (joueurs d'une même salle) ne la produisent qu'une fois
+LOCK_STRIPES = 64
+
+
+@functools.lru_cache(maxsize=1)
+def available_formats():
+    """
+    Formats que Pillow sait écrire ici (JPEG toujours, WebP et AVIF selon la compilation)
+
+    Returns:
+        Tuple de noms de FORMATS, du préféré au moins bon
+    """
+    from PIL import Image
+
+    try:
+        import pillow_avif  # noqa: F401  (AVIF pour Pillow < 11.2)
+    except ImportError:
+        pass
+    Image.init()
+    return tuple(name for name, (pil_format, _) in FORMATS.items() if pil_format in Image.SAVE)
+
+
+def display_size(image):
+    """
+    Dimensions d'affichage d'une image Pillow ouverte (orientation EXIF appliquée)
+
+    Args:
+        image: Image Pillow ouverte (seul l'en-tête est lu)
+
+    Returns:
+        Tuple (largeur, hauteur)
+    """
+    width, height = image.size
+    if image.getexif().get(ORIENTATION_TAG) in ROTATED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def variants(photo):
+    """
+    Déclinaisons proposées pour une photo (champ 'variants' des manches)
+
+    Les largeurs s'arrêtent à la première qui atteint celle de l'original :
+    cette dernière déclinaison a la taille de l'original, sans EXIF.
+
+    Args:
+        photo: Dict de photo (clés 'width' et 'height' renseignées au scan)
+
+    Returns:
+        Dict {widths, width, height, formats}, ou None si les dimensions sont inconnues
+    """
+    width = photo.get('width')
+    if not width:
+        return None
+    smaller = [w for w in WIDTHS if w < width]
+    larger = [w for w in WIDTHS if w >= width]
+    return {
+        'widths': smaller + larger[:1],
+        'width': width,
+        'height': photo.get('height'),
+        'formats': list(available_formats())
+    }
+
+
+class DerivativeStore:
+    """Produit et conserve sur disque les déclinaisons des photos"""
+
+    def __init__(self, folder):
+        """
+        Args:
+            folder: Dossier des déclinaisons (data/derivatives)
+        """
+        self.folder = os.path.abspath(folder)  # send_file résout les chemins relatifs depuis l'app
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def get(self, source, width, fmt):
+        """
+        Chemin d'une déclinaison, produite si elle n'existe pas encore
+
+        Args:
+            source: Chemin de la photo originale
+            width: Largeur (une de WIDTHS)
+            fmt: Format (un de available_formats())
+
+        Returns:
+            Tuple (chemin du fichier, type MIME)
+        """
+        source_mtime = os.stat(source).st_mtime_ns
+        key = hashlib.sha1(os.path.realpath(source).encode()).hexdigest()[:20]
+        target = os.path.join(self.folder, key[:2], f'{key}-{width}{EXTENSIONS[fmt]}')
+        mimetype = f'image/{fmt}'
+
+        if self._is_fresh(target, source_mtime):
+            metrics.CACHE_REQUESTS.labels('photo_derivative', 'hit').inc()
+            return target, mimetype
+
+        with self._locks[int(key[:4], 16) % LOCK_STRIPES]:
+            # Produite pendant l'attente du verrou par une autre requête
+            if self._is_fresh(target, source_mtime):
+                metrics.CACHE_REQUESTS.labels('photo_derivative', 'hit').inc()
+                return target, mimetype
+            metrics.CACHE_REQUESTS.labels('photo_derivative', 'miss').inc()
+            start = time.perf_counter()
+            self._render(source, target, width, fmt, source_mtime)
+            metrics.DERIVATIVE_SECONDS.labels(fmt).observe(time.perf_counter() - start)
+        return target, mimetype
+
+    @staticmethod
+    def _is_fresh(target, source_mtime):
+        """Indique si la déclinaison existe et porte la date de l'original actuel"""
+        try:
+            return os.stat(target).st_mtime_ns == source_mtime
+        except OSError:
+            return False
+
+    @staticmethod
+    def _render(source, target, width, fmt, source_mtime):
+        """
+        Réduit l'original à la largeur demandée et l'enregistre (écriture
+        atomique, datée comme l'original pour reconnaître une déclinaison périmée)
+        """
+        from PIL import Image, ImageOps
+
+        pil_format, options = FORMATS[fmt]
+        with Image.open(source) as image:
+            # La largeur d'affichage est la hauteur stockée pour une photo tournée
+            rotated = image.getexif().get(ORIENTATION_TAG) in ROTATED_ORIENTATIONS
+            # JPEG : décodage directement réduit (1/2, 1/4, 1/8) sans passer sous la largeur visée
+            image.draft('RGB', (1, width) if rotated else (width, 1))
+            resized = image.convert('RGB')
+
+            # Réduire avant de tourner : la rotation porte sur la petite image
+            stored_width, stored_height = resized.size
+            display_width = stored_height if rotated else stored_width
+            if display_width > width:
+                scale = width / display_width
+                resized = resized.resize((max(1, round(stored_width * scale)),
+                                          max(1, round(stored_height * scale))), Image.BICUBIC)
+            resized = ImageOps.exif_transpose(resized)
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            resized.save(temp_path, pil_format, **options)
+            os.utime(temp_path, ns=(source_mtime, source_mtime))
+            os.replace(temp_path, target)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
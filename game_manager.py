@@ -2,12 +2,25 @@
 Module de gestion du jeu et du scoring
 """
 import json
+import math
 import os
-import uuid
 import time
 import threading
+import colorsys
+import heapq
+import bisect
+import statistics
 from datetime import datetime
-from geopy.distance import geodesic
+from functools import lru_cache
+from operator import itemgetter
+from cluster import new_owned_id, file_lock
+import serializer
+import metrics
+import derivatives
+from replays import ReplayStore
+from photo_stats import PhotoStatsStore
+from task_monitor import TaskMonitor
+from models import Guess, Session, AsyncPlayerState, AsyncRoom, PlayerState, SyncRoom
 
 # Phases de jeu pour le mode synchronisé
 GAME_PHASES = {
@@ -20,21 +33,184 @@ GAME_PHASES = {
     'finished': 'finished'      # Partie terminée
 }
 
+# Capacité des salles synchronisées
+DEFAULT_MAX_PLAYERS = 6
+MAX_ROOM_PLAYERS = 500
+
+# Diffusion des résultats de manche : 'full' (liste complète à tous),
+# 'top' (top N + statistiques, entrée personnelle en privé) ou 'auto'
+RESULTS_MODES = ('auto', 'full', 'top')
+RESULTS_FULL_MAX_PLAYERS = 50
+DEFAULT_RESULTS_TOP_N = 10
+
+# Bornes (km) de l'histogramme des distances diffusé en mode 'top'
+DISTANCE_HISTOGRAM_BINS = [1, 10, 50, 100, 250, 500, 1000, 2000]
+
+# Durées de conservation en mémoire (secondes) : parties terminées, parties
+# inactives, et intervalle entre deux passages du nettoyage
+FINISHED_TTL = 3600
+IDLE_TTL = 24 * 3600
+REAPER_INTERVAL = 60
+
+# Fenêtre (secondes) de regroupement des changements de salle en un seul delta
+ROOM_DELTA_WINDOW = 0.05
+
+# Préfixe des rooms Socket.IO des salles asynchrones (distinctes des salles synchronisées)
+ASYNC_CHANNEL_PREFIX = 'async:'
+
+# Couleurs des six premiers joueurs, les suivantes sont générées
+PLAYER_COLORS = ['#ff4444', '#4444ff', '#ffaa00', '#aa00ff', '#00ffaa', '#ff66cc']
+
+
+@lru_cache(maxsize=MAX_ROOM_PLAYERS)
+def player_color(index):
+    """
+    Couleur du joueur à l'emplacement donné
+
+    Au-delà de la palette fixe, les teintes sont réparties par l'angle d'or
+    pour rester distinctes quelle que soit la taille de la salle.
+
+    Args:
+        index: Emplacement du joueur dans la salle (0 = hôte)
+
+    Returns:
+        Couleur hexadécimale (#rrggbb)
+    """
+    if index < len(PLAYER_COLORS):
+        return PLAYER_COLORS[index]
+
+    hue = (index * 0.618033988749895) % 1.0
+    lightness = 0.45 + 0.1 * (index % 3)
+    r, g, b = colorsys.hls_to_rgb(hue, lightness, 0.85)
+    return '#{:02x}{:02x}{:02x}'.format(round(r * 255), round(g * 255), round(b * 255))
+
+
+def async_room_channel(room_id):
+    """
+    Room Socket.IO où sont poussés les deltas d'une salle asynchrone
+
+    Args:
+        room_id: ID de la salle
+
+    Returns:
+        Nom de la room Socket.IO
+    """
+    return ASYNC_CHANNEL_PREFIX + room_id
+
+
+_geodesic = None
+
+
+def geodesic_km(point_a, point_b):
+    """
+    Distance géodésique entre deux points. geopy n'est importé qu'au premier
+    calcul : les processus qui ne notent aucune réponse ne le chargent pas.
+
+    Args:
+        point_a: Tuple (latitude, longitude)
+        point_b: Tuple (latitude, longitude)
+
+    Returns:
+        Distance en kilomètres
+    """
+    global _geodesic
+    if _geodesic is None:
+        from geopy.distance import geodesic
+        _geodesic = geodesic
+    return _geodesic(point_a, point_b).kilometers
+
+
+def normalize_coordinates(latitude, longitude):
+    """
+    Valide les coordonnées d'une réponse reçue d'un client
+
+    Args:
+        latitude: Latitude (nombre ou chaîne numérique)
+        longitude: Longitude (nombre ou chaîne numérique, éventuellement hors
+                   ±180 si la carte a fait plusieurs tours du monde)
+
+    Returns:
+        Tuple (latitude, longitude) en flottants, longitude ramenée dans
+        [-180, 180[, ou None si les coordonnées sont invalides
+    """
+    try:
+        latitude = float(latitude)
+        longitude = float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (math.isfinite(latitude) and math.isfinite(longitude)) or abs(latitude) > 90:
+        return None
+    return latitude, (longitude + 180) % 360 - 180
+
+
+def elapsed_ms(since):
+    """
+    Args:
+        since: Timestamp Unix de départ (None si inconnu)
+
+    Returns:
+        Millisecondes écoulées depuis since, ou None
+    """
+    if since is None:
+        return None
+    return max(0, int((time.time() - since) * 1000))
+
+
+def server_time_ms():
+    """
+    Horloge serveur utilisée comme référence par les clients
+
+    Returns:
+        Timestamp Unix en millisecondes
+    """
+    return int(time.time() * 1000)
+
 
 class GameManager:
-    def __init__(self, data_folder='data', socketio=None):
+    def __init__(self, data_folder='data', socketio=None, max_room_players=MAX_ROOM_PLAYERS,
+                 worker_index=0, workers=1, finished_ttl=FINISHED_TTL, idle_ttl=IDLE_TTL,
+                 delta_window=ROOM_DELTA_WINDOW, task_monitor=None):
         """
         Initialise le gestionnaire de jeu
 
         Args:
             data_folder: Dossier où stocker les fichiers JSON
             socketio: Instance SocketIO pour communications temps réel
+            max_room_players: Capacité maximale autorisée pour une salle synchronisée
+            worker_index: Index de ce processus en déploiement multi-processus
+            workers: Nombre total de processus (voir cluster.py)
+            finished_ttl: Conservation d'une partie terminée (secondes)
+            idle_ttl: Conservation d'une partie sans activité (secondes)
+            delta_window: Fenêtre de regroupement des deltas de salle (secondes, 0 = immédiat)
+            task_monitor: Suivi des tâches de fond (TaskMonitor par défaut)
         """
         self.data_folder = data_folder
-        self.sessions_file = os.path.join(data_folder, 'sessions.json')
+        self.worker_index = worker_index
+        self.workers = workers
+
+        # Chaque worker possède ses sessions ; l'historique reste partagé
+        if workers > 1:
+            self.sessions_file = os.path.join(data_folder, f'sessions-w{worker_index}.json')
+        else:
+            self.sessions_file = os.path.join(data_folder, 'sessions.json')
         self.games_file = os.path.join(data_folder, 'games.json')
         self.config_file = os.path.join(data_folder, 'config.json')
         self.socketio = socketio
+        self.max_room_players = max_room_players
+        self.finished_ttl = finished_ttl
+        self.idle_ttl = idle_ttl
+        self.delta_window = delta_window
+        self.task_monitor = task_monitor or TaskMonitor()
+        self.replays = ReplayStore(os.path.join(data_folder, 'replays'))
+        # Statistiques par photo : un fichier par worker, ceux des autres fusionnés à la lecture
+        if workers > 1:
+            self.photo_stats = PhotoStatsStore(
+                os.path.join(data_folder, f'photo_stats-w{worker_index}.json'),
+                [os.path.join(data_folder, f'photo_stats-w{index}.json')
+                 for index in range(workers) if index != worker_index])
+        else:
+            self.photo_stats = PhotoStatsStore(os.path.join(data_folder, 'photo_stats.json'))
+        self._reaper_started = False
 
         # Sessions actives en mémoire (mode solo)
         self.active_sessions = {}
@@ -45,26 +221,60 @@ class GameManager:
         # Salles multijoueurs synchronisées (nouveau système temps réel)
         self.synchronized_rooms = {}
 
-        # Threads de timer actifs
-        self.active_timers = {}
+        # Verrou protégeant les transitions de phase (threads socket + timers)
+        self._phase_lock = threading.Lock()
 
         # Charger les données existantes
         self._load_sessions()
 
     def _load_sessions(self):
-        """Charge les sessions depuis le fichier JSON"""
+        """Charge les sessions depuis le fichier JSON (sessions expirées exclues)"""
         if os.path.exists(self.sessions_file):
             try:
-                with open(self.sessions_file, 'r', encoding='utf-8') as f:
-                    self.active_sessions = json.load(f)
+                sessions = serializer.load_file(self.sessions_file)
             except:
-                self.active_sessions = {}
+                sessions = {}
+
+            now = time.time()
+            self.active_sessions = {}
+            for session_id, data in sessions.items():
+                session = Session.from_dict(data)
+                if not self._is_expired(session, session.finished, now):
+                    self.active_sessions[session_id] = session
+
+            # Réécrire le fichier pour que le prochain démarrage reste rapide
+            if len(self.active_sessions) != len(sessions):
+                self._save_sessions()
 
     def _save_sessions(self):
         """Sauvegarde les sessions dans le fichier JSON"""
         os.makedirs(self.data_folder, exist_ok=True)
-        with open(self.sessions_file, 'w', encoding='utf-8') as f:
-            json.dump(self.active_sessions, f, indent=2, ensure_ascii=False)
+        with metrics.PERSIST_SECONDS.labels('sessions').time():
+            serializer.dump_file({session_id: session.to_dict()
+                                  for session_id, session in self.active_sessions.items()},
+                                 self.sessions_file)
+
+    def _record_guesses(self, kind, game, photo, guesses):
+        """
+        Ajoute au replay et aux statistiques de la photo des réponses déjà
+        appliquées à la partie ; une erreur est seulement journalisée, la
+        réponse reste acquise
+
+        Args:
+            kind: Type de partie ('solo', 'multiplayer', 'synchronized')
+            game: Session ou salle
+            photo: Photo de la manche
+            guesses: Liste de (nom du joueur, Guess)
+        """
+        try:
+            self.replays.record(kind, game, guesses)
+        except Exception as e:
+            print(f"Erreur lors de l'enregistrement des réponses de {game.id} : {e}")
+        try:
+            for _, guess in guesses:
+                self.photo_stats.add(photo, guess)
+        except Exception as e:
+            print(f"Erreur lors de la mise à jour des statistiques de {game.id} : {e}")
 
     def create_game(self, player_name, photos, num_rounds=5):
         """
@@ -78,23 +288,18 @@ class GameManager:
         Returns:
             ID de la session de jeu
         """
-        session_id = str(uuid.uuid4())
+        session_id = new_owned_id(self.worker_index, self.workers)
 
         # Limiter le nombre de photos au nombre de rounds
         game_photos = photos[:num_rounds]
 
-        session = {
-            'id': session_id,
-            'player_name': player_name,
-            'created_at': datetime.now().isoformat(),
-            'num_rounds': num_rounds,
-            'current_round': 0,
-            'photos': game_photos,
-            'guesses': [],
-            'scores': [],
-            'total_score': 0,
-            'finished': False
-        }
+        session = Session(
+            id=session_id,
+            player_name=player_name,
+            created_at=datetime.now().isoformat(),
+            num_rounds=num_rounds,
+            photos=game_photos
+        )
 
         self.active_sessions[session_id] = session
         self._save_sessions()
@@ -112,22 +317,30 @@ class GameManager:
             Dict avec les infos de la photo (sans les coordonnées GPS)
         """
         session = self.active_sessions.get(session_id)
-        if not session or session['finished']:
+        if not session or session.finished:
             return None
 
-        current_round = session['current_round']
-        if current_round >= len(session['photos']):
+        current_round = session.current_round
+        if current_round >= len(session.photos):
             return None
 
-        photo = session['photos'][current_round]
+        photo = session.photos[current_round]
+
+        # Départ du temps de réponse : premier affichage de la photo de la manche
+        if session.round_shown_at is None:
+            session.round_shown_at = time.time()
 
-        # Retourner les infos sans les coordonnées GPS (pour ne pas tricher)
+        # Retourner les infos sans les coordonnées GPS (pour ne pas tricher) ;
+        # l'aperçu flou s'affiche pendant le chargement de la déclinaison adaptée à l'écran
         return {
             'path': photo['path'],
+            'placeholder': photo.get('placeholder'),
+            'variants': derivatives.variants(photo),
             'round': current_round + 1,
-            'total_rounds': session['num_rounds']
+            'total_rounds': session.num_rounds
         }
 
+    @metrics.timed(metrics.GUESS_SECONDS.labels('solo'))
     def submit_guess(self, session_id, guess_lat, guess_lon):
         """
         Enregistre une supposition et calcule le score
@@ -141,22 +354,22 @@ class GameManager:
             Dict avec les résultats (score, distance, vraies coordonnées)
         """
         session = self.active_sessions.get(session_id)
-        if not session or session['finished']:
+        if not session or session.finished:
             return None
 
-        current_round = session['current_round']
-        if current_round >= len(session['photos']):
+        current_round = session.current_round
+        if current_round >= len(session.photos):
             return None
 
         # Récupérer les vraies coordonnées
-        photo = session['photos'][current_round]
+        photo = session.photos[current_round]
         true_lat = photo['latitude']
         true_lon = photo['longitude']
 
         # Calculer la distance
         true_coords = (true_lat, true_lon)
         guess_coords = (guess_lat, guess_lon)
-        distance_km = geodesic(true_coords, guess_coords).kilometers
+        distance_km = geodesic_km(true_coords, guess_coords)
 
         # Calculer le score (système inspiré de GeoGuessr)
         # Score maximum de 5000 points si distance = 0
@@ -164,31 +377,31 @@ class GameManager:
         score = self._calculate_score(distance_km)
 
         # Enregistrer la supposition
-        guess_data = {
-            'round': current_round + 1,
-            'guess_lat': guess_lat,
-            'guess_lon': guess_lon,
-            'true_lat': true_lat,
-            'true_lon': true_lon,
-            'distance_km': round(distance_km, 2),
-            'score': score
-        }
+        guess = Guess(current_round + 1, guess_lat, guess_lon, true_lat, true_lon,
+                      distance_km, score, elapsed_ms(session.round_shown_at))
 
-        session['guesses'].append(guess_data)
-        session['scores'].append(score)
-        session['total_score'] += score
+        session.guesses.append(guess)
+        session.scores.append(score)
+        session.total_score += score
+        session.last_activity = time.time()
+        session.round_shown_at = None
 
         # Passer à la manche suivante
-        session['current_round'] += 1
+        session.current_round += 1
 
         # Vérifier si la partie est terminée
-        if session['current_round'] >= session['num_rounds']:
-            session['finished'] = True
+        if session.current_round >= session.num_rounds:
+            session.finished = True
             self._save_game_history(session)
 
         self._save_sessions()
 
-        return guess_data
+        # Replay et statistiques écrits une fois la réponse appliquée et sauvegardée
+        self._record_guesses('solo', session, photo, [(session.player_name, guess)])
+        if session.finished:
+            self.replays.forget(session_id)
+
+        return guess.to_dict()
 
     def _calculate_score(self, distance_km):
         """
@@ -227,12 +440,12 @@ class GameManager:
             return None
 
         return {
-            'player_name': session['player_name'],
-            'total_score': session['total_score'],
-            'num_rounds': session['num_rounds'],
-            'current_round': session['current_round'],
-            'finished': session['finished'],
-            'guesses': session['guesses']
+            'player_name': session.player_name,
+            'total_score': session.total_score,
+            'num_rounds': session.num_rounds,
+            'current_round': session.current_round,
+            'finished': session.finished,
+            'guesses': [guess.to_dict() for guess in session.guesses]
         }
 
     def _save_game_history(self, session):
@@ -242,29 +455,46 @@ class GameManager:
         Args:
             session: Données de la session
         """
-        # Charger l'historique existant
-        games = []
-        if os.path.exists(self.games_file):
-            try:
-                with open(self.games_file, 'r', encoding='utf-8') as f:
-                    games = json.load(f)
-            except:
-                games = []
-
         # Ajouter la nouvelle partie
         game_record = {
-            'player_name': session['player_name'],
-            'date': session['created_at'],
-            'total_score': session['total_score'],
-            'num_rounds': session['num_rounds'],
-            'average_score': round(session['total_score'] / session['num_rounds'], 2)
+            'player_name': session.player_name,
+            'date': session.created_at,
+            'total_score': session.total_score,
+            'num_rounds': session.num_rounds,
+            'average_score': round(session.total_score / session.num_rounds, 2)
         }
 
-        games.append(game_record)
+        self._append_game_records([game_record])
+
+    def _append_game_records(self, records):
+        """
+        Ajoute des parties à l'historique partagé (verrouillé entre processus)
+
+        Args:
+            records: Liste d'enregistrements de parties
+        """
+        os.makedirs(self.data_folder, exist_ok=True)
 
-        # Sauvegarder
-        with open(self.games_file, 'w', encoding='utf-8') as f:
-            json.dump(games, f, indent=2, ensure_ascii=False)
+        # Lecture, ajout et réécriture (attente du verrou incluse)
+        try:
+            with metrics.PERSIST_SECONDS.labels('games').time(), file_lock(self.games_file):
+                # Charger l'historique existant
+                games = []
+                if os.path.exists(self.games_file):
+                    try:
+                        games = serializer.load_file(self.games_file)
+                    except Exception as e:
+                        # Historique illisible : conservé à part plutôt qu'écrasé
+                        damaged = f'{self.games_file}.{int(time.time())}.damaged'
+                        os.replace(self.games_file, damaged)
+                        print(f"Historique illisible ({e}), déplacé vers {damaged}")
+
+                games.extend(records)
+
+                # Sauvegarder (fichier machine : compact)
+                serializer.dump_file(games, self.games_file)
+        except TimeoutError as e:
+            print(f"Historique non mis à jour : {e}")
 
     def get_leaderboard(self, limit=10):
         """
@@ -280,8 +510,7 @@ class GameManager:
             return []
 
         try:
-            with open(self.games_file, 'r', encoding='utf-8') as f:
-                games = json.load(f)
+            games = serializer.load_file(self.games_file)
 
             # Trier par score total décroissant
             games.sort(key=lambda x: x['total_score'], reverse=True)
@@ -292,13 +521,14 @@ class GameManager:
 
     def save_config(self, config):
         """
-        Sauvegarde la configuration
+        Sauvegarde la configuration (indentée : fichier modifiable à la main)
 
         Args:
             config: Dict de configuration
         """
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        with metrics.PERSIST_SECONDS.labels('config').time():
+            with open(self.config_file, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2, ensure_ascii=False)
 
     def load_config(self):
         """
@@ -330,31 +560,22 @@ class GameManager:
         Returns:
             ID de la salle
         """
-        room_id = str(uuid.uuid4())[:8]  # ID court pour faciliter le partage
+        room_id = new_owned_id(self.worker_index, self.workers, 8)  # ID court pour faciliter le partage
 
         # Limiter le nombre de photos au nombre de rounds
         game_photos = photos[:num_rounds]
 
-        room = {
-            'id': room_id,
-            'name': room_name,
-            'host': host_name,
-            'created_at': datetime.now().isoformat(),
-            'num_rounds': num_rounds,
-            'photos': game_photos,
-            'players': {},  # {player_name: {current_round, guesses, scores, total_score}}
-            'started': False,
-            'finished': False
-        }
+        room = AsyncRoom(
+            id=room_id,
+            name=room_name,
+            host=host_name,
+            created_at=datetime.now().isoformat(),
+            num_rounds=num_rounds,
+            photos=game_photos
+        )
 
         # Ajouter l'hôte comme premier joueur
-        room['players'][host_name] = {
-            'current_round': 0,
-            'guesses': [],
-            'scores': [],
-            'total_score': 0,
-            'finished': False
-        }
+        self._add_multiplayer_player(room, host_name)
 
         self.multiplayer_rooms[room_id] = room
         return room_id
@@ -375,21 +596,23 @@ class GameManager:
             return False
 
         # Ne pas permettre de rejoindre une partie déjà terminée
-        if room['finished']:
+        if room.finished:
             return False
 
-        # Vérifier si le joueur existe déjà
-        if player_name in room['players']:
-            return True  # Déjà dans la salle
-
-        # Ajouter le joueur
-        room['players'][player_name] = {
-            'current_round': 0,
-            'guesses': [],
-            'scores': [],
-            'total_score': 0,
-            'finished': False
-        }
+        with self._phase_lock:
+            # Vérifier si le joueur existe déjà
+            if player_name in room.players:
+                return True  # Déjà dans la salle
+
+            # Ajouter le joueur
+            rank = self._add_multiplayer_player(room, player_name)
+        room.last_activity = time.time()
+
+        self._publish_multiplayer_changes(room, [{
+            'type': 'player_joined',
+            'player': room.players[player_name].to_progress_dict(player_name),
+            'rank': rank
+        }])
 
         return True
 
@@ -404,10 +627,12 @@ class GameManager:
             True si succès, False sinon
         """
         room = self.multiplayer_rooms.get(room_id)
-        if not room or room['started']:
+        if not room or room.started:
             return False
 
-        room['started'] = True
+        room.started = True
+        room.last_activity = time.time()
+        self._publish_multiplayer_changes(room, [{'type': 'started'}])
         return True
 
     def get_multiplayer_room_info(self, room_id):
@@ -426,20 +651,20 @@ class GameManager:
 
         # Retourner les infos sans les coordonnées GPS
         return {
-            'id': room['id'],
-            'name': room['name'],
-            'host': room['host'],
-            'num_rounds': room['num_rounds'],
-            'started': room['started'],
-            'finished': room['finished'],
+            'id': room.id,
+            'name': room.name,
+            'host': room.host,
+            'num_rounds': room.num_rounds,
+            'started': room.started,
+            'finished': room.finished,
             'players': [
                 {
                     'name': name,
-                    'total_score': player['total_score'],
-                    'current_round': player['current_round'],
-                    'finished': player['finished']
+                    'total_score': player.total_score,
+                    'current_round': player.current_round,
+                    'finished': player.finished
                 }
-                for name, player in room['players'].items()
+                for name, player in room.players.items()
             ]
         }
 
@@ -455,25 +680,31 @@ class GameManager:
             Dict avec les infos de la photo
         """
         room = self.multiplayer_rooms.get(room_id)
-        if not room or not room['started']:
+        if not room or not room.started:
             return None
 
-        player = room['players'].get(player_name)
-        if not player or player['finished']:
+        player = room.players.get(player_name)
+        if not player or player.finished:
             return None
 
-        current_round = player['current_round']
-        if current_round >= len(room['photos']):
+        current_round = player.current_round
+        if current_round >= len(room.photos):
             return None
 
-        photo = room['photos'][current_round]
+        photo = room.photos[current_round]
+
+        if player.round_shown_at is None:
+            player.round_shown_at = time.time()
 
         return {
             'path': photo['path'],
+            'placeholder': photo.get('placeholder'),
+            'variants': derivatives.variants(photo),
             'round': current_round + 1,
-            'total_rounds': room['num_rounds']
+            'total_rounds': room.num_rounds
         }
 
+    @metrics.timed(metrics.GUESS_SECONDS.labels('multiplayer'))
     def submit_multiplayer_guess(self, room_id, player_name, guess_lat, guess_lon):
         """
         Soumettre une supposition dans une partie multijoueur
@@ -488,55 +719,72 @@ class GameManager:
             Dict avec les résultats
         """
         room = self.multiplayer_rooms.get(room_id)
-        if not room or not room['started']:
+        if not room or not room.started:
             return None
 
-        player = room['players'].get(player_name)
-        if not player or player['finished']:
+        player = room.players.get(player_name)
+        if not player or player.finished:
             return None
 
-        current_round = player['current_round']
-        if current_round >= len(room['photos']):
+        current_round = player.current_round
+        if current_round >= len(room.photos):
             return None
 
         # Récupérer les vraies coordonnées
-        photo = room['photos'][current_round]
+        photo = room.photos[current_round]
         true_lat = photo['latitude']
         true_lon = photo['longitude']
 
         # Calculer la distance et le score
         true_coords = (true_lat, true_lon)
         guess_coords = (guess_lat, guess_lon)
-        distance_km = geodesic(true_coords, guess_coords).kilometers
+        distance_km = geodesic_km(true_coords, guess_coords)
         score = self._calculate_score(distance_km)
 
         # Enregistrer la supposition
-        guess_data = {
-            'round': current_round + 1,
-            'guess_lat': guess_lat,
-            'guess_lon': guess_lon,
-            'true_lat': true_lat,
-            'true_lon': true_lon,
-            'distance_km': round(distance_km, 2),
-            'score': score
-        }
-
-        player['guesses'].append(guess_data)
-        player['scores'].append(score)
-        player['total_score'] += score
-        player['current_round'] += 1
-
-        # Vérifier si ce joueur a terminé
-        if player['current_round'] >= room['num_rounds']:
-            player['finished'] = True
-
-        # Vérifier si tous les joueurs ont terminé
-        all_finished = all(p['finished'] for p in room['players'].values())
+        guess = Guess(current_round + 1, guess_lat, guess_lon, true_lat, true_lon,
+                      distance_km, score, elapsed_ms(player.round_shown_at))
+
+        with self._phase_lock:
+            # Retirer l'ancienne position du classement trié
+            del room.ranking[bisect.bisect_left(room.ranking, player.rank_key(player_name))]
+
+            player.guesses.append(guess)
+            player.scores.append(score)
+            player.total_score += score
+            player.current_round += 1
+            player.round_shown_at = None
+
+            # Vérifier si ce joueur a terminé
+            if player.current_round >= room.num_rounds:
+                player.finished = True
+
+            key = player.rank_key(player_name)
+            rank = bisect.bisect_left(room.ranking, key)
+            room.ranking.insert(rank, key)
+
+            # Vérifier si tous les joueurs ont terminé
+            all_finished = all(p.finished for p in room.players.values())
+            if all_finished:
+                room.finished = True
+        room.last_activity = time.time()
+
+        changes = [{
+            'type': 'progress',
+            'player': player.to_progress_dict(player_name),
+            'rank': rank
+        }]
         if all_finished:
-            room['finished'] = True
             self._save_multiplayer_game_history(room)
+            changes.append({'type': 'finished'})
+        self._publish_multiplayer_changes(room, changes)
+
+        # Replay et statistiques écrits une fois la réponse appliquée et diffusée
+        self._record_guesses('multiplayer', room, photo, [(player_name, guess)])
+        if all_finished:
+            self.replays.forget(room_id)
 
-        return guess_data
+        return guess.to_dict()
 
     def get_multiplayer_leaderboard(self, room_id):
         """
@@ -552,57 +800,107 @@ class GameManager:
         if not room:
             return []
 
-        # Créer le classement
-        leaderboard = []
-        for name, player in room['players'].items():
-            leaderboard.append({
-                'player_name': name,
-                'total_score': player['total_score'],
-                'current_round': player['current_round'],
-                'finished': player['finished']
-            })
+        # Le classement est maintenu trié à chaque supposition
+        players = room.players
+        return [players[name].to_progress_dict(name) for _, _, name in room.ranking]
 
-        # Trier par score décroissant
-        leaderboard.sort(key=lambda x: x['total_score'], reverse=True)
+    def get_multiplayer_room_snapshot(self, room_id):
+        """
+        Instantané versionné d'une salle asynchrone, envoyé à l'abonnement
+        Socket.IO. Les deltas suivants portent une version supérieure.
 
-        return leaderboard
+        Args:
+            room_id: ID de la salle
 
-    def _save_multiplayer_game_history(self, room):
+        Returns:
+            Dict avec les infos, le classement et la version, ou None
+        """
+        room = self.multiplayer_rooms.get(room_id)
+        if not room:
+            return None
+
+        with self._phase_lock:
+            return {
+                'room_id': room_id,
+                'version': room.version,
+                'info': self.get_multiplayer_room_info(room_id),
+                'leaderboard': self.get_multiplayer_leaderboard(room_id)
+            }
+
+    def _add_multiplayer_player(self, room, player_name):
+        """
+        Ajoute un joueur à une salle asynchrone et au classement trié
+
+        Args:
+            room: AsyncRoom
+            player_name: Nom du joueur
+
+        Returns:
+            Rang du joueur dans le classement (0 = premier)
+        """
+        player = AsyncPlayerState(join_index=len(room.players))
+        room.players[player_name] = player
+
+        key = player.rank_key(player_name)
+        rank = bisect.bisect_left(room.ranking, key)
+        room.ranking.insert(rank, key)
+        return rank
+
+    def _publish_multiplayer_changes(self, room, changes):
+        """
+        Pousse la progression d'une salle asynchrone aux clients abonnés
+        (événement async_room_delta), qui n'ont plus à interroger /leaderboard.
+        Chaque changement porte le rang du joueur : le client déplace une
+        seule ligne de son classement.
+
+        Args:
+            room: AsyncRoom
+            changes: Liste de changements (player_joined, progress, started, finished)
+        """
+        with self._phase_lock:
+            room.version += 1
+            version = room.version
+
+        if not self.socketio:
+            return
+
+        self.socketio.emit('async_room_delta', {
+            'room_id': room.id,
+            'version': version,
+            'changes': changes
+        }, room=async_room_channel(room.id))
+
+    def _save_multiplayer_game_history(self, room, finished_only=False):
         """
         Sauvegarde l'historique d'une partie multijoueur terminée
 
         Args:
             room: Données de la salle
+            finished_only: N'archiver que les joueurs ayant fini toutes les manches
         """
-        # Charger l'historique existant
-        games = []
-        if os.path.exists(self.games_file):
-            try:
-                with open(self.games_file, 'r', encoding='utf-8') as f:
-                    games = json.load(f)
-            except:
-                games = []
-
         # Ajouter chaque joueur à l'historique
-        for player_name, player_data in room['players'].items():
+        games = []
+        for player_name, player_data in room.players.items():
+            if finished_only and not player_data.finished:
+                continue
             game_record = {
                 'player_name': player_name,
-                'date': room['created_at'],
-                'total_score': player_data['total_score'],
-                'num_rounds': room['num_rounds'],
-                'average_score': round(player_data['total_score'] / room['num_rounds'], 2),
+                'date': room.created_at,
+                'total_score': player_data.total_score,
+                'num_rounds': room.num_rounds,
+                'average_score': round(player_data.total_score / room.num_rounds, 2),
                 'multiplayer': True,
-                'room_name': room['name']
+                'room_name': room.name
             }
             games.append(game_record)
 
-        # Sauvegarder
-        with open(self.games_file, 'w', encoding='utf-8') as f:
-            json.dump(games, f, indent=2, ensure_ascii=False)
+        self._append_game_records(games)
 
     # ===== MÉTHODES MULTIJOUEUR SYNCHRONISÉ (TEMPS RÉEL) =====
 
-    def create_synchronized_room(self, room_name, host_name, photos, num_rounds=5):
+    def create_synchronized_room(self, room_name, host_name, photos, num_rounds=5,
+                                 max_players=DEFAULT_MAX_PLAYERS, results_mode='auto',
+                                 results_top_n=DEFAULT_RESULTS_TOP_N):
         """
         Crée une salle multijoueur synchronisée (temps réel)
 
@@ -611,55 +909,45 @@ class GameManager:
             host_name: Nom de l'hôte
             photos: Liste des photos pour cette partie
             num_rounds: Nombre de manches
+            max_players: Nombre maximum de joueurs (borné par max_room_players)
+            results_mode: Diffusion des résultats ('auto', 'full' ou 'top')
+            results_top_n: Nombre de joueurs diffusés à tous en mode 'top'
 
         Returns:
             ID de la salle
         """
-        room_id = str(uuid.uuid4())[:8]  # ID court
+        room_id = new_owned_id(self.worker_index, self.workers, 8)  # ID court
 
         # Limiter au nombre de rounds
         game_photos = photos[:num_rounds]
 
-        room = {
-            'id': room_id,
-            'name': room_name,
-            'host': host_name,
-            'created_at': datetime.now().isoformat(),
-            'num_rounds': num_rounds,
-            'current_round': 0,  # Partagé entre tous les joueurs
-            'phase': GAME_PHASES['lobby'],
-            'photos': game_photos,
-            'timer_duration': 60,  # 60 secondes par manche
-            'round_start_time': None,
-            'players': {},  # {player_name: {color, ready, connected, guess, submitted, scores, total_score}}
-            'max_players': 6,
-            'player_colors': ['#ff4444', '#4444ff', '#ffaa00', '#aa00ff', '#00ffaa', '#ff66cc'],
-            'disconnect_pause_duration': 30,  # 30 secondes de pause
-            'pause_end_time': None
-        }
+        room = SyncRoom(
+            id=room_id,
+            name=room_name,
+            host=host_name,
+            created_at=datetime.now().isoformat(),
+            num_rounds=num_rounds,
+            photos=game_photos,
+            max_players=max(2, min(int(max_players), self.max_room_players)),
+            results_mode=results_mode if results_mode in RESULTS_MODES else 'auto',
+            results_top_n=max(1, int(results_top_n)),
+            phase=GAME_PHASES['lobby']
+        )
 
         # Ajouter l'hôte comme premier joueur avec première couleur
-        room['players'][host_name] = {
-            'color': room['player_colors'][0],
-            'ready': False,
-            'connected': True,
-            'guess': None,
-            'submitted': False,
-            'scores': [],
-            'total_score': 0,
-            'is_host': True
-        }
+        room.players[host_name] = PlayerState(host_name, player_color(0), is_host=True)
 
         self.synchronized_rooms[room_id] = room
         return room_id
 
-    def join_synchronized_room(self, room_id, player_name):
+    def join_synchronized_room(self, room_id, player_name, sid=None):
         """
         Rejoindre une salle synchronisée
 
         Args:
             room_id: ID de la salle
             player_name: Nom du joueur
+            sid: ID de session WebSocket (pour les messages privés)
 
         Returns:
             Dict avec status et color, ou None si erreur
@@ -668,41 +956,66 @@ class GameManager:
         if not room:
             return None
 
-        # Vérifier limite de joueurs
-        if len(room['players']) >= room['max_players']:
-            return {'error': 'Salle pleine'}
-
-        # Vérifier si déjà dans la salle (reconnexion)
-        if player_name in room['players']:
-            room['players'][player_name]['connected'] = True
+        # Vérifier si déjà dans la salle (reconnexion, possible même salle pleine)
+        if player_name in room.players:
+            player = room.players[player_name]
+            player.sid = sid
+            with self._phase_lock:
+                was_connected = player.connected
+                player.connected = True
+                if not was_connected and self._is_round_open(room) and not player.submitted:
+                    room.pending_submissions += 1
+
+            if not was_connected:
+                self._publish_room_changes(room_id, [
+                    {'type': 'connection', 'name': player_name, 'connected': True}
+                ])
+
+            # Reprendre immédiatement si la pause attendait ce joueur
+            if (not was_connected and room.phase == GAME_PHASES['paused']
+                    and room.paused_player == player_name):
+                self._resume_game(room_id)
             return {
                 'success': True,
-                'color': room['players'][player_name]['color'],
+                'color': room.players[player_name].color,
                 'reconnected': True
             }
 
-        # Assigner couleur
-        used_colors = [p['color'] for p in room['players'].values()]
-        available_colors = [c for c in room['player_colors'] if c not in used_colors]
-
-        if not available_colors:
-            return {'error': 'Pas de couleur disponible'}
-
-        # Ajouter le joueur
-        room['players'][player_name] = {
-            'color': available_colors[0],
-            'ready': False,
-            'connected': True,
-            'guess': None,
-            'submitted': False,
-            'scores': [],
-            'total_score': 0,
-            'is_host': False
-        }
+        # Limite, ajout et compteur de réponses attendues en une section : une
+        # réponse ou une arrivée concurrente ne peut pas s'intercaler
+        with self._phase_lock:
+            if player_name in room.players:
+                rejoined = True
+            else:
+                rejoined = False
+
+                # Vérifier limite de joueurs
+                if len(room.players) >= room.max_players:
+                    return {'error': 'Salle pleine'}
+
+                # Assigner couleur (les joueurs gardent leur emplacement, pas de réutilisation)
+                color = player_color(room.next_color_index)
+                room.next_color_index += 1
+
+                # Ajouter le joueur
+                room.players[player_name] = PlayerState(player_name, color, sid=sid)
+
+                # Un joueur arrivant en cours de manche doit aussi répondre
+                if self._is_round_open(room):
+                    room.pending_submissions += 1
+
+        if rejoined:
+            # Même nom ajouté entre-temps par une autre connexion : reconnexion
+            return self.join_synchronized_room(room_id, player_name, sid)
+
+        self._publish_room_changes(room_id, [{
+            'type': 'player_joined',
+            'player': room.players[player_name].to_public_dict()
+        }])
 
         return {
             'success': True,
-            'color': available_colors[0],
+            'color': color,
             'reconnected': False
         }
 
@@ -719,10 +1032,15 @@ class GameManager:
             True si succès
         """
         room = self.synchronized_rooms.get(room_id)
-        if not room or player_name not in room['players']:
+        if not room or player_name not in room.players:
             return False
 
-        room['players'][player_name]['ready'] = ready
+        player = room.players[player_name]
+        if player.ready != ready:
+            player.ready = ready
+            self._publish_room_changes(room_id, [
+                {'type': 'ready', 'name': player_name, 'ready': ready}
+            ])
         return True
 
     def can_start_game(self, room_id):
@@ -739,7 +1057,7 @@ class GameManager:
         if not room:
             return False
 
-        ready_count = sum(1 for p in room['players'].values() if p['ready'] and p['connected'])
+        ready_count = sum(1 for p in room.players.values() if p.ready and p.connected)
         return ready_count >= 2
 
     def start_synchronized_game(self, room_id):
@@ -756,12 +1074,12 @@ class GameManager:
         if not room or not self.can_start_game(room_id):
             return False
 
-        room['phase'] = GAME_PHASES['countdown']
-        room['current_round'] = 0
+        room.phase = GAME_PHASES['countdown']
+        room.current_round = 0
 
         # Démarrer la première manche après un court délai
         if self.socketio:
-            self.socketio.start_background_task(self._start_round_after_countdown, room_id, 3)
+            self._start_background_task(self._start_round_after_countdown, room_id, 3)
 
         return True
 
@@ -777,11 +1095,16 @@ class GameManager:
         if not room:
             return
 
-        # Compte à rebours
-        for i in range(countdown_seconds, 0, -1):
-            if self.socketio:
-                self.socketio.emit('countdown_tick', {'seconds': i}, room=room_id)
-            time.sleep(1)
+        # Un seul événement : les clients affichent le décompte localement
+        deadline = time.time() + countdown_seconds
+        if self.socketio:
+            self._broadcast(room_id, 'countdown_started', {
+                'seconds': countdown_seconds,
+                'deadline': int(deadline * 1000),
+                'server_time': server_time_ms()
+            })
+
+        self._sleep_until(deadline)
 
         # Démarrer la manche
         self.start_round(room_id)
@@ -797,59 +1120,118 @@ class GameManager:
         if not room:
             return
 
-        room['phase'] = GAME_PHASES['guessing']
-        room['round_start_time'] = time.time()
+        room.phase = GAME_PHASES['guessing']
+        room.round_start_time = time.time()
+        room.last_activity = room.round_start_time
+        room.round_deadline = room.round_start_time + room.timer_duration
+        room.timer_token += 1
 
         # Réinitialiser les soumissions
-        for player in room['players'].values():
-            player['guess'] = None
-            player['submitted'] = False
+        pending = 0
+        for player in room.players.values():
+            player.guess = None
+            player.submitted = False
+            if player.connected:
+                pending += 1
+        room.pending_submissions = pending
 
         # Broadcaster début de manche
         if self.socketio:
-            current_photo = room['photos'][room['current_round']]
-            self.socketio.emit('round_started', {
-                'round': room['current_round'] + 1,
-                'total_rounds': room['num_rounds'],
+            current_photo = room.photos[room.current_round]
+            self._broadcast(room_id, 'round_started', {
+                'round': room.current_round + 1,
+                'total_rounds': room.num_rounds,
                 'photo_path': current_photo['path'],
-                'timer_duration': room['timer_duration']
-            }, room=room_id)
+                'placeholder': current_photo.get('placeholder'),
+                'variants': derivatives.variants(current_photo),
+                'timer_duration': room.timer_duration,
+                'deadline': int(room.round_deadline * 1000),
+                'server_time': server_time_ms()
+            })
 
             # Démarrer le timer en background
-            self.socketio.start_background_task(self._countdown_task, room_id)
+            self._start_background_task(
+                self._countdown_task,
+                room_id,
+                room.timer_token
+            )
+
+    def _start_background_task(self, target, *args):
+        """
+        Lance une tâche de fond suivie par task_monitor (durée, erreurs, retards)
+
+        Args:
+            target: Méthode à exécuter
+            args: Arguments de la méthode
+        """
+        self.socketio.start_background_task(self.task_monitor.run, target.__name__.lstrip('_'),
+                                            target, *args)
+
+    def _sleep(self, seconds):
+        """
+        Attente dans une tâche de fond, compatible avec le mode asynchrone
+        de SocketIO (eventlet/gevent : ne bloque que la tâche courante)
 
-    def _countdown_task(self, room_id):
+        Args:
+            seconds: Durée d'attente en secondes
+        """
+        if self.socketio:
+            self.socketio.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    def _sleep_until(self, deadline):
+        """
+        Attend une échéance puis mesure le retard du réveil (timers de salle)
+
+        Args:
+            deadline: Échéance (timestamp time.time())
+        """
+        self._sleep(max(0, deadline - time.time()))
+        self.task_monitor.record_wake(deadline)
+
+    def _countdown_task(self, room_id, token):
         """
         Tâche de countdown (60 secondes)
 
         Args:
             room_id: ID de la salle
+            token: Jeton du timer (la tâche s'arrête s'il change)
+        """
+        self._run_countdown(room_id, token)
+
+    def _run_countdown(self, room_id, token):
+        """
+        Attend l'échéance de la manche puis force le passage aux résultats.
+        Les clients affichent le décompte à partir de round_deadline ; la fin
+        anticipée est déclenchée par submit_synchronized_guess.
+
+        Args:
+            room_id: ID de la salle
+            token: Jeton du timer
         """
         room = self.synchronized_rooms.get(room_id)
         if not room:
             return
 
-        duration = room['timer_duration']
+        self._sleep_until(room.round_deadline)
 
-        for remaining in range(duration, -1, -1):
-            # Vérifier si la salle existe toujours
-            room = self.synchronized_rooms.get(room_id)
-            if not room or room['phase'] != GAME_PHASES['guessing']:
-                return
-
-            # Broadcaster le temps restant
-            if self.socketio:
-                self.socketio.emit('timer_update', {'seconds': remaining}, room=room_id)
+        # Timer expiré - forcer passage aux résultats (si ce timer est encore actif)
+        room = self.synchronized_rooms.get(room_id)
+        if room and room.timer_token == token:
+            self.advance_to_results(room_id)
 
-            time.sleep(1)
+    def _is_round_open(self, room):
+        """
+        Indique si la manche en cours accepte encore des réponses
 
-            # Vérifier si tous ont soumis (fin anticipée)
-            if self.check_all_submitted(room_id):
-                self.advance_to_results(room_id)
-                return
+        Args:
+            room: Données de la salle
 
-        # Timer expiré - forcer passage aux résultats
-        self.advance_to_results(room_id)
+        Returns:
+            True en phase de jeu ou de pause
+        """
+        return room.phase in (GAME_PHASES['guessing'], GAME_PHASES['paused'])
 
     def check_all_submitted(self, room_id):
         """
@@ -862,15 +1244,12 @@ class GameManager:
             True si tous ont soumis
         """
         room = self.synchronized_rooms.get(room_id)
-        if not room:
-            return False
-
-        connected_players = [p for p in room['players'].values() if p['connected']]
-        if not connected_players:
+        if not room or room.pending_submissions > 0:
             return False
 
-        return all(p['submitted'] for p in connected_players)
+        return any(p.connected for p in room.players.values())
 
+    @metrics.timed(metrics.GUESS_SECONDS.labels('synchronized'))
     def submit_synchronized_guess(self, room_id, player_name, guess_lat, guess_lon):
         """
         Soumet une réponse dans le mode synchronisé
@@ -885,29 +1264,47 @@ class GameManager:
             Dict avec status ou None
         """
         room = self.synchronized_rooms.get(room_id)
-        if not room or player_name not in room['players']:
+        if not room or player_name not in room.players:
             return None
 
-        if room['phase'] != GAME_PHASES['guessing']:
-            return {'error': 'Pas en phase de jeu'}
+        player = room.players[player_name]
 
-        player = room['players'][player_name]
-        if player['submitted']:
-            return {'error': 'Déjà soumis'}
+        if room.phase != GAME_PHASES['guessing']:
+            return {'error': 'Pas en phase de jeu'}
 
-        # Enregistrer la réponse
-        player['guess'] = {
-            'lat': guess_lat,
-            'lon': guess_lon,
-            'timestamp': time.time()
-        }
-        player['submitted'] = True
+        # Calculer distance dès la soumission : les résultats ne font
+        # plus qu'agréger, même pour des centaines de joueurs
+        current_photo = room.photos[room.current_round]
+        distance_km = geodesic_km(
+            (current_photo['latitude'], current_photo['longitude']),
+            (guess_lat, guess_lon)
+        )
+
+        with self._phase_lock:
+            if room.phase != GAME_PHASES['guessing']:
+                return {'error': 'Pas en phase de jeu'}
+
+            if player.submitted:
+                return {'error': 'Déjà soumis'}
+
+            # Enregistrer la réponse
+            player.guess = Guess(room.current_round + 1, guess_lat, guess_lon,
+                                 current_photo['latitude'], current_photo['longitude'],
+                                 distance_km, elapsed_ms=elapsed_ms(room.round_start_time))
+            player.submitted = True
+            room.pending_submissions -= 1
+            room.last_activity = time.time()
+            all_submitted = room.pending_submissions <= 0
 
         # Broadcaster que ce joueur a soumis
         if self.socketio:
-            self.socketio.emit('player_submitted', {
+            self._broadcast(room_id, 'player_submitted', {
                 'player_name': player_name
-            }, room=room_id)
+            })
+
+        # Fin anticipée dès que le dernier joueur connecté a répondu
+        if all_submitted:
+            self.advance_to_results(room_id)
 
         return {'success': True}
 
@@ -922,66 +1319,167 @@ class GameManager:
         if not room:
             return
 
-        room['phase'] = GAME_PHASES['results']
+        # Une seule transition par manche (timer et dernière réponse peuvent se croiser)
+        with self._phase_lock:
+            if room.phase != GAME_PHASES['guessing']:
+                return
+            room.phase = GAME_PHASES['results']
 
         # Récupérer photo actuelle
-        current_photo = room['photos'][room['current_round']]
+        current_photo = room.photos[room.current_round]
         true_lat = current_photo['latitude']
         true_lon = current_photo['longitude']
 
-        # Calculer scores pour tous les joueurs
+        # Calculer scores pour tous les joueurs (distances calculées à la soumission)
         results = []
-        for player_name, player in room['players'].items():
-            if player['submitted'] and player['guess']:
-                guess_lat = player['guess']['lat']
-                guess_lon = player['guess']['lon']
-
-                # Calculer distance
-                distance_km = geodesic(
-                    (true_lat, true_lon),
-                    (guess_lat, guess_lon)
-                ).kilometers
+        answered = []
+        for player_name, player in room.players.items():
+            if player.submitted and player.guess:
+                guess = player.guess
+                distance_km = guess.distance_km
 
                 # Calculer score
                 score = self._calculate_score(distance_km)
+                guess.score = score
+                answered.append((player_name, guess))
 
-                player['scores'].append(score)
-                player['total_score'] += score
+                player.scores.append(score)
+                player.total_score += score
 
+                # Coordonnées arrondies au mètre près pour alléger le paquet
                 results.append({
                     'player_name': player_name,
-                    'color': player['color'],
-                    'guess_lat': guess_lat,
-                    'guess_lon': guess_lon,
+                    'color': player.color,
+                    'guess_lat': round(guess.guess_lat, 5),
+                    'guess_lon': round(guess.guess_lon, 5),
                     'distance_km': round(distance_km, 2),
                     'score': score,
-                    'total_score': player['total_score']
+                    'total_score': player.total_score
                 })
             else:
                 # Joueur n'a pas soumis - 0 points
-                player['scores'].append(0)
+                player.scores.append(0)
                 results.append({
                     'player_name': player_name,
-                    'color': player['color'],
+                    'color': player.color,
                     'guess_lat': None,
                     'guess_lon': None,
                     'distance_km': None,
                     'score': 0,
-                    'total_score': player['total_score']
+                    'total_score': player.total_score
                 })
 
-        # Trier par score de cette manche (décroissant)
-        results.sort(key=lambda x: x['score'] if x['score'] is not None else -1, reverse=True)
+        self._send_round_results(room_id, room, true_lat, true_lon, results)
 
-        # Broadcaster les résultats
-        if self.socketio:
-            self.socketio.emit('round_results', {
-                'results': results,
-                'true_lat': true_lat,
-                'true_lon': true_lon,
-                'current_round': room['current_round'] + 1,
-                'total_rounds': room['num_rounds']
-            }, room=room_id)
+        # Réponses de la manche ajoutées au replay (en une écriture) et aux
+        # statistiques de la photo, une fois les résultats diffusés
+        self._record_guesses('synchronized', room, current_photo, answered)
+
+    def _send_round_results(self, room_id, room, true_lat, true_lon, results):
+        """
+        Diffuse les résultats de la manche (liste complète ou top N)
+
+        Args:
+            room_id: ID de la salle
+            room: Données de la salle
+            true_lat: Latitude de la photo
+            true_lon: Longitude de la photo
+            results: Résultats de tous les joueurs
+        """
+        if not self.socketio:
+            return
+
+        payload = {
+            'true_lat': true_lat,
+            'true_lon': true_lon,
+            'current_round': room.current_round + 1,
+            'total_rounds': room.num_rounds
+        }
+
+        if not self._use_top_results(room):
+            # Trier par score de cette manche (décroissant)
+            results.sort(key=itemgetter('score'), reverse=True)
+            payload['mode'] = 'full'
+            payload['results'] = results
+            self._broadcast(room_id, 'round_results', payload)
+            return
+
+        # Top N par sélection partielle + statistiques agrégées pour tous
+        payload['mode'] = 'top'
+        payload['results'] = heapq.nlargest(room.results_top_n, results,
+                                            key=itemgetter('score'))
+        payload['stats'] = self._round_statistics(results)
+        self._broadcast(room_id, 'round_results', payload)
+
+        # Chaque joueur reçoit sa propre ligne avec son rang, en privé
+        ranks = self._rank_by_score(results)
+        players = room.players
+        for entry in results:
+            player = players[entry['player_name']]
+            if player.connected and player.sid:
+                self.socketio.emit('round_result_self',
+                                   dict(entry, rank=ranks[entry['score']]),
+                                   to=player.sid)
+
+    def _use_top_results(self, room):
+        """
+        Indique si les résultats doivent être diffusés en mode 'top'
+
+        Args:
+            room: Données de la salle
+
+        Returns:
+            True pour le mode compact
+        """
+        if room.results_mode == 'auto':
+            return len(room.players) > RESULTS_FULL_MAX_PLAYERS
+        return room.results_mode == 'top'
+
+    def _rank_by_score(self, results):
+        """
+        Calcule le rang associé à chaque score (ex-aequo au même rang)
+        sans trier la liste des joueurs
+
+        Args:
+            results: Entrées de résultats de la manche
+
+        Returns:
+            Dict {score: rang}
+        """
+        counts = {}
+        for entry in results:
+            counts[entry['score']] = counts.get(entry['score'], 0) + 1
+
+        ranks = {}
+        better = 0
+        for score in sorted(counts, reverse=True):
+            ranks[score] = better + 1
+            better += counts[score]
+        return ranks
+
+    def _round_statistics(self, results):
+        """
+        Statistiques agrégées d'une manche
+
+        Args:
+            results: Entrées de résultats de la manche
+
+        Returns:
+            Dict avec participation, distance médiane et histogramme
+        """
+        distances = [e['distance_km'] for e in results if e['distance_km'] is not None]
+
+        histogram = [0] * (len(DISTANCE_HISTOGRAM_BINS) + 1)
+        for distance in distances:
+            histogram[bisect.bisect_right(DISTANCE_HISTOGRAM_BINS, distance)] += 1
+
+        return {
+            'players': len(results),
+            'submitted': len(distances),
+            'median_distance_km': round(statistics.median(distances), 2) if distances else None,
+            'histogram_bins_km': DISTANCE_HISTOGRAM_BINS,
+            'histogram': histogram
+        }
 
     def advance_to_next_round(self, room_id):
         """
@@ -994,18 +1492,19 @@ class GameManager:
         if not room:
             return
 
-        room['current_round'] += 1
+        room.current_round += 1
+        room.last_activity = time.time()
 
-        if room['current_round'] >= room['num_rounds']:
+        if room.current_round >= room.num_rounds:
             # Partie terminée
-            room['phase'] = GAME_PHASES['finished']
+            room.phase = GAME_PHASES['finished']
             self._finalize_synchronized_game(room_id)
         else:
             # Prochaine manche
-            room['phase'] = GAME_PHASES['between']
+            room.phase = GAME_PHASES['between']
             # Démarrer la prochaine manche après un court délai
             if self.socketio:
-                self.socketio.start_background_task(self._start_round_after_countdown, room_id, 5)
+                self._start_background_task(self._start_round_after_countdown, room_id, 5)
 
     def _finalize_synchronized_game(self, room_id):
         """
@@ -1020,23 +1519,24 @@ class GameManager:
 
         # Créer classement final
         final_scores = []
-        for player_name, player in room['players'].items():
+        for player_name, player in room.players.items():
             final_scores.append({
                 'player_name': player_name,
-                'total_score': player['total_score'],
-                'scores': player['scores']
+                'total_score': player.total_score,
+                'scores': player.scores
             })
 
         final_scores.sort(key=lambda x: x['total_score'], reverse=True)
 
         # Broadcaster fin de partie
         if self.socketio:
-            self.socketio.emit('game_finished', {
+            self._broadcast(room_id, 'game_finished', {
                 'final_scores': final_scores
-            }, room=room_id)
+            })
 
         # Sauvegarder dans l'historique
         self._save_synchronized_game_history(room)
+        self.replays.forget(room_id)
 
     def _save_synchronized_game_history(self, room):
         """
@@ -1045,30 +1545,22 @@ class GameManager:
         Args:
             room: Données de la salle
         """
-        games = []
-        if os.path.exists(self.games_file):
-            try:
-                with open(self.games_file, 'r', encoding='utf-8') as f:
-                    games = json.load(f)
-            except:
-                games = []
-
         # Ajouter chaque joueur
-        for player_name, player_data in room['players'].items():
+        games = []
+        for player_name, player_data in room.players.items():
             game_record = {
                 'player_name': player_name,
-                'date': room['created_at'],
-                'total_score': player_data['total_score'],
-                'num_rounds': room['num_rounds'],
-                'average_score': round(player_data['total_score'] / room['num_rounds'], 2),
+                'date': room.created_at,
+                'total_score': player_data.total_score,
+                'num_rounds': room.num_rounds,
+                'average_score': round(player_data.total_score / room.num_rounds, 2),
                 'multiplayer': True,
                 'synchronized': True,
-                'room_name': room['name']
+                'room_name': room.name
             }
             games.append(game_record)
 
-        with open(self.games_file, 'w', encoding='utf-8') as f:
-            json.dump(games, f, indent=2, ensure_ascii=False)
+        self._append_game_records(games)
 
     def handle_player_disconnect(self, room_id, player_name):
         """
@@ -1079,65 +1571,66 @@ class GameManager:
             player_name: Nom du joueur
         """
         room = self.synchronized_rooms.get(room_id)
-        if not room or player_name not in room['players']:
+        if not room or player_name not in room.players:
             return
 
-        player = room['players'][player_name]
-        player['connected'] = False
-        player['disconnect_time'] = time.time()
-
-        # Mettre en pause si en phase de jeu
-        if room['phase'] == GAME_PHASES['guessing']:
-            room['phase'] = GAME_PHASES['paused']
-            room['pause_end_time'] = time.time() + room['disconnect_pause_duration']
-
+        player = room.players[player_name]
+        with self._phase_lock:
+            was_connected = player.connected
+            if was_connected and self._is_round_open(room) and not player.submitted:
+                room.pending_submissions -= 1
+            player.connected = False
+            player.disconnect_time = time.time()
+
+            # Mettre en pause si en phase de jeu
+            pause = room.phase == GAME_PHASES['guessing']
+            if pause:
+                room.phase = GAME_PHASES['paused']
+                room.pause_end_time = time.time() + room.disconnect_pause_duration
+                room.paused_player = player_name
+                room.timer_token += 1
+
+        if was_connected:
+            self._publish_room_changes(room_id, [
+                {'type': 'connection', 'name': player_name, 'connected': False}
+            ])
+
+        if pause:
             # Broadcaster pause
             if self.socketio:
-                self.socketio.emit('game_paused', {
+                self._broadcast(room_id, 'game_paused', {
                     'player_name': player_name,
-                    'pause_duration': room['disconnect_pause_duration']
-                }, room=room_id)
+                    'pause_duration': room.disconnect_pause_duration,
+                    'pause_deadline': int(room.pause_end_time * 1000),
+                    'server_time': server_time_ms()
+                })
 
                 # Démarrer timer de pause
-                self.socketio.start_background_task(
+                self._start_background_task(
                     self._pause_countdown,
                     room_id,
-                    player_name
+                    room.timer_token
                 )
 
-    def _pause_countdown(self, room_id, disconnected_player):
+    def _pause_countdown(self, room_id, token):
         """
-        Compte à rebours de pause (30 secondes)
+        Compte à rebours de pause (30 secondes). La reconnexion du joueur
+        attendu reprend la partie immédiatement (voir join_synchronized_room).
 
         Args:
             room_id: ID de la salle
-            disconnected_player: Nom du joueur déconnecté
+            token: Jeton du timer au moment de la pause
         """
         room = self.synchronized_rooms.get(room_id)
         if not room:
             return
 
-        duration = room['disconnect_pause_duration']
-
-        for remaining in range(duration, -1, -1):
-            room = self.synchronized_rooms.get(room_id)
-            if not room or room['phase'] != GAME_PHASES['paused']:
-                return
-
-            # Vérifier si le joueur s'est reconnecté
-            if room['players'][disconnected_player]['connected']:
-                # Reprendre le jeu
-                self._resume_game(room_id)
-                return
-
-            # Broadcaster temps restant de pause
-            if self.socketio:
-                self.socketio.emit('pause_countdown', {'seconds': remaining}, room=room_id)
-
-            time.sleep(1)
+        self._sleep_until(room.pause_end_time)
 
         # Pause expirée - continuer sans le joueur
-        self._resume_game(room_id)
+        room = self.synchronized_rooms.get(room_id)
+        if room and room.timer_token == token:
+            self._resume_game(room_id)
 
     def _resume_game(self, room_id):
         """
@@ -1150,53 +1643,135 @@ class GameManager:
         if not room:
             return
 
-        room['phase'] = GAME_PHASES['guessing']
+        with self._phase_lock:
+            if room.phase != GAME_PHASES['paused']:
+                return
+            room.phase = GAME_PHASES['guessing']
+            room.paused_player = None
+            room.timer_token += 1
 
-        # Broadcaster reprise
+        # Broadcaster reprise avec l'échéance inchangée de la manche
         if self.socketio:
-            self.socketio.emit('game_resumed', {}, room=room_id)
-
-            # Relancer le timer (temps restant)
-            elapsed = time.time() - room['round_start_time']
-            remaining = max(0, int(room['timer_duration'] - elapsed))
+            self._broadcast(room_id, 'game_resumed', {
+                'deadline': int(room.round_deadline * 1000),
+                'server_time': server_time_ms()
+            })
 
-            if remaining > 0:
-                self.socketio.start_background_task(
-                    self._countdown_task_with_offset,
+            if self.check_all_submitted(room_id) or time.time() >= room.round_deadline:
+                # Tous les joueurs restants ont répondu ou timer déjà expiré
+                self.advance_to_results(room_id)
+            else:
+                # Relancer le timer jusqu'à l'échéance
+                self._start_background_task(
+                    self._countdown_task,
                     room_id,
-                    remaining
+                    room.timer_token
                 )
-            else:
-                # Timer déjà expiré - passer aux résultats
-                self.advance_to_results(room_id)
 
-    def _countdown_task_with_offset(self, room_id, start_seconds):
+    def _broadcast(self, room_id, event, payload):
+        """
+        Diffuse un événement à toute la salle. Le paquet est construit une
+        fois par l'appelant et encodé une fois pour tous les destinataires ;
+        les deltas en attente partent avant pour conserver l'ordre.
+
+        Args:
+            room_id: ID de la salle
+            event: Nom de l'événement
+            payload: Données de l'événement
+        """
+        if not self.socketio:
+            return
+
+        if event != 'room_delta':
+            self._flush_room_changes(room_id)
+        self.socketio.emit(event, payload, room=room_id)
+
+    def _publish_room_changes(self, room_id, changes):
         """
-        Tâche de countdown avec offset (pour reprise après pause)
+        Publie des changements d'état de salle. Les changements arrivant
+        pendant delta_window (ex : rafale de player_ready) sont regroupés en
+        un seul delta versionné. Les clients appliquent les deltas dans
+        l'ordre et redemandent un instantané s'ils détectent un trou dans les
+        versions.
 
         Args:
             room_id: ID de la salle
-            start_seconds: Secondes restantes
+            changes: Liste de changements (player_joined, ready, connection)
         """
         room = self.synchronized_rooms.get(room_id)
         if not room:
             return
 
-        for remaining in range(start_seconds, -1, -1):
-            room = self.synchronized_rooms.get(room_id)
-            if not room or room['phase'] != GAME_PHASES['guessing']:
-                return
+        with self._phase_lock:
+            room.pending_changes.extend(changes)
+            room.last_activity = time.time()
+            schedule = not room.flush_scheduled
+            room.flush_scheduled = True
 
-            if self.socketio:
-                self.socketio.emit('timer_update', {'seconds': remaining}, room=room_id)
+        if not self.socketio or self.delta_window <= 0:
+            self._flush_room_changes(room_id)
+        elif schedule:
+            self._start_background_task(self._flush_room_changes_later, room_id)
 
-            time.sleep(1)
+    def _flush_room_changes_later(self, room_id):
+        """
+        Envoie les changements regroupés à la fin de la fenêtre
 
-            if self.check_all_submitted(room_id):
-                self.advance_to_results(room_id)
+        Args:
+            room_id: ID de la salle
+        """
+        self._sleep_until(time.time() + self.delta_window)
+        self._flush_room_changes(room_id)
+
+    def _flush_room_changes(self, room_id):
+        """
+        Diffuse les changements en attente en un seul delta versionné
+
+        Args:
+            room_id: ID de la salle
+        """
+        room = self.synchronized_rooms.get(room_id)
+        if not room:
+            return
+
+        with self._phase_lock:
+            changes = room.pending_changes
+            room.flush_scheduled = False
+            if not changes:
                 return
+            room.pending_changes = []
+            room.version += 1
+            version = room.version
+
+        self._broadcast(room_id, 'room_delta', {
+            'room_id': room_id,
+            'version': version,
+            'changes': changes
+        })
+
+    def get_synchronized_room_summary(self, room_id):
+        """
+        Récupère les informations générales d'une salle sans la liste des joueurs
+        (coût constant, même pour les grandes salles)
+
+        Args:
+            room_id: ID de la salle
+
+        Returns:
+            Dict avec le résumé de la salle ou None
+        """
+        room = self.synchronized_rooms.get(room_id)
+        if not room:
+            return None
 
-        self.advance_to_results(room_id)
+        return {
+            'id': room.id,
+            'name': room.name,
+            'phase': room.phase,
+            'num_rounds': room.num_rounds,
+            'player_count': len(room.players),
+            'max_players': room.max_players
+        }
 
     def get_synchronized_room_state(self, room_id):
         """
@@ -1206,32 +1781,192 @@ class GameManager:
             room_id: ID de la salle
 
         Returns:
-            Dict avec l'état de la salle
+            Dict avec l'état de la salle (à ne pas modifier : il est mis en cache)
+        """
+        snapshot = self._room_snapshot(room_id)
+        return snapshot[0] if snapshot else None
+
+    def get_synchronized_room_packet(self, room_id):
+        """
+        État complet d'une salle, pré-encodé pour les émissions Socket.IO
+
+        Args:
+            room_id: ID de la salle
+
+        Returns:
+            Objet à passer à emit() (voir serializer.raw), ou None
+        """
+        snapshot = self._room_snapshot(room_id)
+        return snapshot[1] if snapshot else None
+
+    def _room_snapshot(self, room_id):
+        """
+        Instantané de l'état d'une salle, reconstruit seulement quand la
+        version, la phase, la manche ou les soumissions changent. Les
+        changements publiés mais pas encore diffusés arrivent ensuite par
+        delta (leur application est idempotente côté client).
+
+        Args:
+            room_id: ID de la salle
+
+        Returns:
+            Tuple (dict, paquet pré-encodé) ou None
         """
         room = self.synchronized_rooms.get(room_id)
         if not room:
             return None
 
+        key = (room.version, room.phase, room.current_round, room.pending_submissions)
+        cache = room.state_cache
+        if cache and cache[0] == key:
+            metrics.CACHE_REQUESTS.labels('room_snapshot', 'hit').inc()
+            return cache[1], cache[2]
+        metrics.CACHE_REQUESTS.labels('room_snapshot', 'miss').inc()
+
         # Préparer liste des joueurs
-        players_list = []
-        for name, data in room['players'].items():
-            players_list.append({
-                'name': name,
-                'color': data['color'],
-                'ready': data['ready'],
-                'connected': data['connected'],
-                'submitted': data['submitted'],
-                'total_score': data['total_score'],
-                'is_host': data.get('is_host', False)
-            })
+        players_list = [player.to_public_dict() for player in room.players.values()]
+
+        state = {
+            'id': room.id,
+            'name': room.name,
+            'host': room.host,
+            'phase': room.phase,
+            'current_round': room.current_round,
+            'num_rounds': room.num_rounds,
+            'players': players_list,
+            'max_players': room.max_players,
+            'version': room.version
+        }
+        packet = serializer.raw(state)
+        room.state_cache = (key, state, packet)
+        return state, packet
+
+    # ===== NETTOYAGE DES PARTIES EXPIRÉES =====
 
+    def is_game_in_progress(self, game_id):
+        """
+        Indique si une partie (solo ou salle) est encore en cours dans ce
+        processus : son replay révélerait les positions des manches à venir
+
+        Args:
+            game_id: ID de session ou de salle
+
+        Returns:
+            True si la partie n'est pas terminée
+        """
+        session = self.active_sessions.get(game_id)
+        if session:
+            return not session.finished
+        room = self.multiplayer_rooms.get(game_id)
+        if room:
+            return not room.finished
+        sync_room = self.synchronized_rooms.get(game_id)
+        if sync_room:
+            return sync_room.phase != GAME_PHASES['finished']
+        return False
+
+    def count_active(self):
+        """
+        Returns:
+            Dict {(type,): nombre} des sessions et salles en mémoire (métriques)
+        """
         return {
-            'id': room['id'],
-            'name': room['name'],
-            'host': room['host'],
-            'phase': room['phase'],
-            'current_round': room['current_round'],
-            'num_rounds': room['num_rounds'],
-            'players': players_list,
-            'max_players': room['max_players']
+            ('solo',): len(self.active_sessions),
+            ('multiplayer',): len(self.multiplayer_rooms),
+            ('synchronized',): len(self.synchronized_rooms)
         }
+
+    def _is_expired(self, item, finished, now):
+        """
+        Indique si une session ou une salle peut être retirée de la mémoire
+
+        Args:
+            item: Session ou salle
+            finished: True si la partie est terminée
+            now: Timestamp Unix courant
+
+        Returns:
+            True si la durée de conservation est dépassée
+        """
+        ttl = self.finished_ttl if finished else self.idle_ttl
+        return now - item.last_activity > ttl
+
+    def reap_expired(self, now=None):
+        """
+        Retire les sessions et salles terminées ou inactives depuis trop
+        longtemps. L'historique des parties terminées est déjà archivé ; les
+        joueurs ayant fini une salle asynchrone abandonnée sont archivés ici.
+
+        Args:
+            now: Timestamp Unix courant (time.time() si None)
+
+        Returns:
+            Dict avec le nombre de sessions et de salles retirées
+        """
+        now = time.time() if now is None else now
+
+        expired_sessions = [
+            session_id for session_id, session in list(self.active_sessions.items())
+            if self._is_expired(session, session.finished, now)
+        ]
+        for session_id in expired_sessions:
+            self.active_sessions.pop(session_id, None)
+            self.replays.forget(session_id)
+        if expired_sessions:
+            self._save_sessions()
+
+        expired_rooms = [
+            room_id for room_id, room in list(self.multiplayer_rooms.items())
+            if self._is_expired(room, room.finished, now)
+        ]
+        for room_id in expired_rooms:
+            room = self.multiplayer_rooms.pop(room_id, None)
+            self.replays.forget(room_id)
+            if room and not room.finished:
+                self._save_multiplayer_game_history(room, finished_only=True)
+
+        expired_sync_rooms = []
+        with self._phase_lock:
+            for room_id, room in list(self.synchronized_rooms.items()):
+                finished = room.phase == GAME_PHASES['finished']
+                if self._is_expired(room, finished, now):
+                    # Les timers encore en attente s'arrêteront au réveil
+                    room.timer_token += 1
+                    del self.synchronized_rooms[room_id]
+                    expired_sync_rooms.append(room_id)
+        for room_id in expired_sync_rooms:
+            self.replays.forget(room_id)
+
+        return {
+            'sessions': len(expired_sessions),
+            'multiplayer_rooms': len(expired_rooms),
+            'synchronized_rooms': len(expired_sync_rooms)
+        }
+
+    def start_reaper(self, interval=REAPER_INTERVAL):
+        """
+        Démarre le nettoyage périodique en tâche de fond (une seule fois)
+
+        Args:
+            interval: Secondes entre deux passages
+        """
+        if not self.socketio or self._reaper_started:
+            return
+
+        self._reaper_started = True
+        self._start_background_task(self._reaper_task, interval)
+
+    def _reaper_task(self, interval):
+        """
+        Boucle du nettoyage périodique
+
+        Args:
+            interval: Secondes entre deux passages
+        """
+        while True:
+            self._sleep(interval)
+            try:
+                self.reap_expired()
+                self.photo_stats.save()
+            except Exception as e:
+                print(f"Erreur lors du nettoyage des parties : {e}")
@@ -0,0 +1,393 @@
+"""
+Métriques internes au format texte Prometheus (endpoint /metrics)
+
+Compteurs, jauges et histogrammes sans dépendance externe. Une mise à jour
+coûte un verrou et une addition (histogramme : plus une recherche par
+dichotomie dans les seuils), soit moins d'une microseconde : assez peu pour
+instrumenter les chemins chauds. Les valeurs coûteuses à maintenir (nombre de
+salles, de sessions...) sont des jauges calculées au moment du scrape.
+
+Chaque processus a ses propres métriques : en multi-processus, scraper chaque
+worker sur son port.
+"""
+import bisect
+import functools
+import threading
+import time
+
+import serializer
+
+# Seuils des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Seuils des durées de scan du dossier de photos (secondes)
+SCAN_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Seuils des durées de tâches de fond, attentes des timers comprises (secondes)
+TASK_BUCKETS = (0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Métrique nommée, avec ou sans labels (un enfant par combinaison)"""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """
+        Args:
+            values: Valeurs des labels, dans l'ordre de labelnames
+
+        Returns:
+            Métrique enfant pour cette combinaison de labels
+        """
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        """Liste de (suffixe, noms de labels, valeurs de labels, valeur)"""
+        raise NotImplementedError
+
+    def render(self):
+        """
+        Returns:
+            Lignes au format d'exposition texte Prometheus
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, names, values, value in self._samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(names, values)} '
+                         f'{_format_value(value)}')
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Valeur qui ne fait qu'augmenter (événements, octets...)"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _samples(self):
+        return [('', self.labelnames, values, child.value)
+                for values, child in list(self._children.items())]
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        self.value = value
+
+
+class Gauge(_Metric):
+    """
+    Valeur instantanée. Avec callback, la valeur est lue au scrape :
+    callback() retourne un nombre, ou un dict {valeurs de labels: nombre}.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_callback(self, callback):
+        self.callback = callback
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def _samples(self):
+        if self.callback is None:
+            return [('', self.labelnames, values, child.value)
+                    for values, child in list(self._children.items())]
+
+        value = self.callback()
+        if isinstance(value, dict):
+            return [('', self.labelnames, values, sample) for values, sample in value.items()]
+        return [('', (), (), value)]
+
+
+class _HistogramChild:
+    __slots__ = ('buckets', 'counts', 'sum', '_lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Dernière case : au-delà du dernier seuil
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """
+        Returns:
+            Context manager observant la durée du bloc (secondes)
+        """
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ('child', 'start')
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Histogram(_Metric):
+    """Distribution de valeurs (latences, durées) par seuils cumulés"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _samples(self):
+        samples = []
+        bucket_names = self.labelnames + ('le',)
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append(('_bucket', bucket_names, values + (_format_value(bound),),
+                                cumulative))
+            samples.append(('_sum', self.labelnames, values, total))
+            samples.append(('_count', self.labelnames, values, cumulative))
+        return samples
+
+
+class Registry:
+    """Ensemble des métriques exposées par /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        Returns:
+            Texte au format d'exposition Prometheus 0.0.4
+        """
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f'# Erreur lors de la lecture de {metric.name} : {e}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=(), callback=None):
+    return REGISTRY.register(Gauge(name, documentation, labelnames, callback))
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ===== MÉTRIQUES DE GEOQUIZZ =====
+
+PHOTO_SCAN_SECONDS = histogram('geoquizz_photo_scan_seconds',
+                               'Durée d\'un scan du dossier de photos', buckets=SCAN_BUCKETS)
+PHOTO_SCAN_FILES = counter('geoquizz_photo_scan_files_total',
+                           'Fichiers image examinés par les scans')
+PHOTO_SCAN_RATE = gauge('geoquizz_photo_scan_files_per_second',
+                        'Débit du dernier scan (fichiers par seconde)')
+EXIF_PARSE_SECONDS = histogram('geoquizz_exif_parse_seconds',
+                               'Lecture des coordonnées GPS EXIF d\'une photo')
+PLACEHOLDER_SECONDS = histogram('geoquizz_photo_placeholder_seconds',
+                                'Calcul de l\'aperçu BlurHash d\'une photo (décodage réduit inclus)')
+DERIVATIVE_SECONDS = histogram('geoquizz_photo_derivative_seconds',
+                               'Production d\'une déclinaison de photo (largeur et format)', ('format',))
+PHOTO_DUPLICATES = gauge('geoquizz_photo_duplicates',
+                         'Photos écartées du tirage car en double (dernier scan)')
+PHOTO_STATS_UPDATES = counter('geoquizz_photo_stats_updates_total',
+                              'Réponses ajoutées aux statistiques par photo')
+PHOTO_BYTES_SERVED = counter('geoquizz_photo_bytes_served_total',
+                             'Octets de photos envoyés par /api/photo')
+CACHE_REQUESTS = counter('geoquizz_cache_requests_total',
+                         'Accès aux caches internes', ('cache', 'result'))
+GUESS_SECONDS = histogram('geoquizz_guess_scoring_seconds',
+                          'Traitement d\'une réponse (distance, score, classement)', ('mode',))
+PERSIST_SECONDS = histogram('geoquizz_persist_write_seconds',
+                            'Écriture d\'un fichier de données', ('file',))
+SOCKETIO_PACKETS = counter('geoquizz_socketio_packets_total',
+                           'Paquets Socket.IO encodés (une fois par émission, '
+                           'quel que soit le nombre de destinataires)', ('event',))
+SOCKETIO_BYTES = counter('geoquizz_socketio_packet_bytes_total',
+                         'Octets JSON des paquets Socket.IO encodés', ('event',))
+SOCKETS_CONNECTED = gauge('geoquizz_sockets_connected', 'Connexions Socket.IO ouvertes')
+BACKGROUND_TASKS = gauge('geoquizz_background_tasks', 'Tâches de fond en cours', ('task',))
+BACKGROUND_TASKS_STARTED = counter('geoquizz_background_tasks_started_total',
+                                   'Tâches de fond lancées', ('task',))
+BACKGROUND_TASK_SECONDS = histogram('geoquizz_background_task_seconds',
+                                    'Durée d\'une tâche de fond (attentes comprises)', ('task',),
+                                    buckets=TASK_BUCKETS)
+BACKGROUND_TASK_ERRORS = counter('geoquizz_background_task_errors_total',
+                                 'Tâches de fond terminées par une exception', ('task',))
+TIMER_LATENESS = histogram('geoquizz_timer_lateness_seconds',
+                           'Retard du réveil d\'un timer sur son échéance', ('task',))
+TIMERS_LATE = counter('geoquizz_timers_late_total',
+                      'Timers réveillés au-delà du seuil de retard', ('task',))
+EVENT_LOOP_LAG = histogram('geoquizz_event_loop_lag_seconds',
+                           'Retard du battement de la boucle d\'événements')
+EVENT_LOOP_STALLS = counter('geoquizz_event_loop_stalls_total',
+                            'Battements en retard au-delà du seuil (boucle bloquée)')
+ACTIVE_GAMES = gauge('geoquizz_active_games', 'Sessions solo et salles en mémoire', ('kind',))
+REQUEST_PROFILES = counter('geoquizz_request_profiles_total',
+                           'Requêtes profilées (written) ou non profilées car une autre '
+                           'l\'était déjà (skipped), voir profiling.py', ('result',))
+
+
+def timed(child):
+    """
+    Décorateur observant la durée de chaque appel dans un histogramme
+
+    Args:
+        child: Histogramme (ou enfant labellisé) recevant les durées
+
+    Returns:
+        Décorateur
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class SocketIOJSON:
+    """
+    Module JSON passé à SocketIO(json=...) : encode via serializer et compte
+    les paquets et octets par événement au passage (sans second encodage).
+    """
+
+    _children = {}  # {événement: (compteur de paquets, compteur d'octets)}
+
+    @classmethod
+    def dumps(cls, obj, **kwargs):
+        data = serializer.encode(obj)
+        # Paquet d'événement : [nom, données...] ; sinon accusé de réception ou handshake
+        if isinstance(obj, list):
+            event = obj[0] if obj and isinstance(obj[0], str) else 'ack'
+        else:
+            event = 'control'
+
+        children = cls._children.get(event)
+        if children is None:
+            children = cls._children[event] = (SOCKETIO_PACKETS.labels(event),
+                                               SOCKETIO_BYTES.labels(event))
+        children[0].inc()
+        children[1].inc(len(data))
+        return data.decode('utf-8')
+
+    @staticmethod
+    def loads(data, **kwargs):
+        return serializer.loads(data)
@@ -0,0 +1,230 @@
+"""
+Modèles de l'état de jeu en mémoire
+
+Classes à slots (pas de __dict__ par instance) pour les sessions solo, les
+salles et leurs joueurs. Les dicts ne sont construits qu'aux frontières :
+persistance JSON (to_dict/from_dict) et paquets émis aux clients.
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+
+def _timestamp_from_iso(value):
+    """
+    Convertit une date ISO en timestamp Unix (anciennes sessions sans last_activity)
+
+    Args:
+        value: Date au format ISO
+
+    Returns:
+        Timestamp Unix, ou 0 si la date est illisible
+    """
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass(slots=True)
+class Guess:
+    """Réponse d'un joueur pour une manche"""
+    round: int
+    guess_lat: float
+    guess_lon: float
+    true_lat: float
+    true_lon: float
+    distance_km: float
+    score: int = 0
+    elapsed_ms: int = None  # Temps de réponse (replays), hors format historique
+
+    def to_dict(self):
+        """
+        Returns:
+            Dict au format historique (distance arrondie au mètre)
+        """
+        return {
+            'round': self.round,
+            'guess_lat': self.guess_lat,
+            'guess_lon': self.guess_lon,
+            'true_lat': self.true_lat,
+            'true_lon': self.true_lon,
+            'distance_km': round(self.distance_km, 2),
+            'score': self.score
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['round'], data['guess_lat'], data['guess_lon'],
+                   data['true_lat'], data['true_lon'], data['distance_km'],
+                   data.get('score', 0))
+
+
+@dataclass(slots=True)
+class Session:
+    """Partie solo"""
+    id: str
+    player_name: str
+    created_at: str
+    num_rounds: int
+    photos: list
+    current_round: int = 0
+    guesses: list = field(default_factory=list)  # [Guess]
+    scores: list = field(default_factory=list)
+    total_score: int = 0
+    finished: bool = False
+    last_activity: float = field(default_factory=time.time)
+    round_shown_at: float = None  # Affichage de la photo de la manche (temps de réponse)
+
+    def to_dict(self):
+        """
+        Returns:
+            Dict sérialisable en JSON (format de sessions.json)
+        """
+        return {
+            'id': self.id,
+            'player_name': self.player_name,
+            'created_at': self.created_at,
+            'num_rounds': self.num_rounds,
+            'current_round': self.current_round,
+            'photos': self.photos,
+            'guesses': [guess.to_dict() for guess in self.guesses],
+            'scores': self.scores,
+            'total_score': self.total_score,
+            'finished': self.finished,
+            'last_activity': self.last_activity,
+            'round_shown_at': self.round_shown_at
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            id=data['id'],
+            player_name=data['player_name'],
+            created_at=data['created_at'],
+            num_rounds=data['num_rounds'],
+            photos=data['photos'],
+            current_round=data['current_round'],
+            guesses=[Guess.from_dict(guess) for guess in data['guesses']],
+            scores=data['scores'],
+            total_score=data['total_score'],
+            finished=data['finished'],
+            last_activity=data.get('last_activity') or _timestamp_from_iso(data['created_at']),
+            round_shown_at=data.get('round_shown_at')
+        )
+
+
+@dataclass(slots=True)
+class AsyncPlayerState:
+    """Joueur d'une salle asynchrone (chacun avance à son rythme)"""
+    current_round: int = 0
+    guesses: list = field(default_factory=list)  # [Guess]
+    scores: list = field(default_factory=list)
+    total_score: int = 0
+    finished: bool = False
+    join_index: int = 0  # Départage les égalités au classement (ordre d'arrivée)
+    round_shown_at: float = None  # Affichage de la photo de la manche (temps de réponse)
+
+    def rank_key(self, name):
+        """
+        Args:
+            name: Nom du joueur
+
+        Returns:
+            Clé de tri du classement (score décroissant, puis ordre d'arrivée)
+        """
+        return (-self.total_score, self.join_index, name)
+
+    def to_progress_dict(self, name):
+        """
+        Args:
+            name: Nom du joueur
+
+        Returns:
+            Dict de progression (format du classement de salle)
+        """
+        return {
+            'player_name': name,
+            'total_score': self.total_score,
+            'current_round': self.current_round,
+            'finished': self.finished
+        }
+
+
+@dataclass(slots=True)
+class AsyncRoom:
+    """Salle multijoueur asynchrone"""
+    id: str
+    name: str
+    host: str
+    created_at: str
+    num_rounds: int
+    photos: list
+    players: dict = field(default_factory=dict)  # {nom: AsyncPlayerState}
+    ranking: list = field(default_factory=list)  # Clés rank_key triées (bisect)
+    started: bool = False
+    finished: bool = False
+    version: int = 0  # Incrémentée à chaque delta de progression diffusé
+    last_activity: float = field(default_factory=time.time)
+
+
+@dataclass(slots=True)
+class PlayerState:
+    """Joueur d'une salle synchronisée"""
+    name: str
+    color: str
+    is_host: bool = False
+    sid: str = None
+    ready: bool = False
+    connected: bool = True
+    guess: Guess = None
+    submitted: bool = False
+    scores: list = field(default_factory=list)
+    total_score: int = 0
+    disconnect_time: float = None
+
+    def to_public_dict(self):
+        """
+        Returns:
+            Dict diffusable aux clients (sans la réponse en cours)
+        """
+        return {
+            'name': self.name,
+            'color': self.color,
+            'ready': self.ready,
+            'connected': self.connected,
+            'submitted': self.submitted,
+            'total_score': self.total_score,
+            'is_host': self.is_host
+        }
+
+
+@dataclass(slots=True)
+class SyncRoom:
+    """Salle multijoueur synchronisée (temps réel)"""
+    id: str
+    name: str
+    host: str
+    created_at: str
+    num_rounds: int
+    photos: list
+    max_players: int
+    results_mode: str
+    results_top_n: int
+    phase: str = 'lobby'
+    current_round: int = 0  # Partagé entre tous les joueurs
+    timer_duration: int = 60  # Secondes par manche
+    round_start_time: float = None
+    round_deadline: float = None  # Fin de manche (timestamp Unix)
+    players: dict = field(default_factory=dict)  # {nom: PlayerState}
+    next_color_index: int = 1  # Prochain emplacement de couleur (0 = hôte)
+    disconnect_pause_duration: int = 30
+    pause_end_time: float = None
+    paused_player: str = None
+    pending_submissions: int = 0  # Joueurs connectés n'ayant pas encore soumis
+    timer_token: int = 0  # Invalide les timers des manches précédentes
+    version: int = 0  # Incrémentée à chaque delta d'état diffusé
+    pending_changes: list = field(default_factory=list)  # Changements pas encore diffusés
+    flush_scheduled: bool = False
+    state_cache: tuple = None  # (clé, état, paquet pré-encodé), voir _room_snapshot
+    last_activity: float = field(default_factory=time.time)
@@ -1,59 +1,326 @@
 """
 Module de gestion des photos et extraction des métadonnées EXIF
+
+Avec un index persistant (index_path), chaque fichier est analysé une seule
+fois : coordonnées GPS, dimensions d'affichage et aperçu BlurHash sont
+conservés avec sa date de modification et sa taille, et un nouveau scan ne
+relit que les fichiers ajoutés ou modifiés.
+
+Le scan ne lit que l'EXIF (rapide) ; les aperçus et empreintes perceptuelles,
+qui demandent de décoder l'image, sont calculés ensuite par fill_placeholders
+(tâche de fond). Les photos en double (voir dedup.py) ne comptent qu'une fois
+dans le tirage des manches.
 """
+import collections
+import hashlib
 import os
 import random
+import time
 from pathlib import Path
-from PIL import Image
-from PIL.ExifTags import TAGS, GPSTAGS
+
+import blurhash
+import dedup
+import derivatives
+import metrics
+import serializer
+from cluster import file_lock
+
+# Version du format de l'index (un index d'une autre version est reconstruit)
+INDEX_VERSION = 2
+
+# Aperçus calculés entre deux écritures de l'index par fill_placeholders
+PLACEHOLDER_SAVE_EVERY = 200
+
+
+def photo_id(key):
+    """
+    Identifiant stable d'une photo (replays, statistiques par photo)
+
+    Args:
+        key: Chemin relatif au dossier racine (clé de l'index)
+
+    Returns:
+        12 caractères hexadécimaux
+    """
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
 
 
 class PhotoManager:
-    def __init__(self, root_folder):
+    def __init__(self, root_folder, index_path=None):
         """
         Initialise le gestionnaire de photos
 
         Args:
             root_folder: Chemin du dossier racine contenant les photos
+            index_path: Fichier de l'index persistant (None : tout analyser à chaque scan)
         """
         self.root_folder = Path(root_folder)
-        self.photos_with_gps = []
+        self.index_path = index_path
+        self.photos_with_gps = []  # Tirage des manches : une photo par groupe de doublons
+        self.num_duplicates = 0
+        self._index = {}
+        self._candidates = []  # [(entrée d'index, photo)] : photos jouables, doublons compris
+        self._pending_placeholders = []  # [(chemin, entrée d'index, photo)]
+        self._strata = None  # (difficultés, tirage, photos notées triées, non notées)
 
     def scan_photos(self):
         """
         Parcourt récursivement le dossier racine pour trouver toutes les photos
         avec des coordonnées GPS dans leurs métadonnées EXIF
+
+        Returns:
+            Nombre de photos jouables, doublons écartés
         """
         self.photos_with_gps = []
+        scan_start = time.perf_counter()
+        num_files = 0
 
         # Extensions d'images supportées
         image_extensions = {'.jpg', '.jpeg', '.png', '.tiff', '.bmp'}
 
+        previous = self._load_index()
+        index = {}
+        candidates = []
+        pending = []
+        analysed = 0
+
         # Parcourir tous les fichiers
         for file_path in self.root_folder.rglob('*'):
             if file_path.suffix.lower() in image_extensions:
-                coords = self._extract_gps_coordinates(file_path)
-                if coords:
-                    self.photos_with_gps.append({
+                num_files += 1
+                try:
+                    stat = file_path.stat()
+                except OSError:
+                    continue
+
+                key = file_path.relative_to(self.root_folder).as_posix()
+                entry = previous.get(key)
+                if entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                    entry = self._analyse(file_path, stat)
+                    analysed += 1
+                index[key] = entry
+
+                if entry['gps']:
+                    photo = {
+                        'id': photo_id(key),
                         'path': str(file_path),
-                        'latitude': coords['latitude'],
-                        'longitude': coords['longitude']
-                    })
+                        'latitude': entry['gps'][0],
+                        'longitude': entry['gps'][1],
+                        'width': entry['dimensions'][0],
+                        'height': entry['dimensions'][1],
+                        'placeholder': entry['placeholder'] or None
+                    }
+                    candidates.append((entry, photo))
+                    if entry['placeholder'] is None or entry.get('dhash') is None:
+                        pending.append((file_path, entry, photo))
+
+        self._index = index
+        self._candidates = candidates
+        self._pending_placeholders = pending
+        hashed = self._hash_same_size(candidates)
+        self._deduplicate()
+        if self.index_path:
+            metrics.CACHE_REQUESTS.labels('photo_index', 'hit').inc(num_files - analysed)
+            metrics.CACHE_REQUESTS.labels('photo_index', 'miss').inc(analysed)
+            if analysed or hashed or len(index) != len(previous):
+                self._save_index(index)
+
+        duration = time.perf_counter() - scan_start
+        metrics.PHOTO_SCAN_SECONDS.observe(duration)
+        metrics.PHOTO_SCAN_FILES.inc(num_files)
+        if duration > 0:
+            metrics.PHOTO_SCAN_RATE.set(round(num_files / duration, 1))
 
         return len(self.photos_with_gps)
 
-    def _extract_gps_coordinates(self, image_path):
+    def _load_index(self):
+        """
+        Lit l'index persistant s'il correspond à ce dossier
+
+        Returns:
+            Dict {chemin relatif: entrée}, vide sans index utilisable
+        """
+        if not self.index_path or not os.path.exists(self.index_path):
+            return {}
+        try:
+            data = serializer.load_file(self.index_path)
+        except Exception:
+            return {}
+        if data.get('version') != INDEX_VERSION or data.get('root') != str(self.root_folder):
+            return {}
+        return data.get('photos', {})
+
+    def _save_index(self, index):
+        """
+        Écrit l'index persistant (sous verrou : les workers de cluster.py
+        scannent le même dossier)
+
+        Args:
+            index: Dict {chemin relatif: entrée}
+        """
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        try:
+            with metrics.PERSIST_SECONDS.labels('photo_index').time(), file_lock(self.index_path):
+                serializer.dump_file({
+                    'version': INDEX_VERSION,
+                    'root': str(self.root_folder),
+                    'photos': index
+                }, self.index_path)
+        except TimeoutError as e:
+            # L'index n'est qu'un cache : il sera réécrit au prochain passage
+            print(f"Index des photos non écrit : {e}")
+
+    def _analyse(self, file_path, stat):
+        """
+        Analyse un fichier : coordonnées GPS (l'aperçu est calculé plus tard)
+
+        Args:
+            file_path: Chemin de l'image
+            stat: Résultat de os.stat (date de modification et taille indexées)
+
+        Returns:
+            Entrée d'index {mtime, size, gps, dimensions, placeholder} (sha1 et
+            dhash s'ajoutent ensuite)
+        """
+        # PIL n'est chargé qu'au premier scan (hors du try : une absence de PIL
+        # doit rester visible)
+        from PIL import Image
+
+        entry = {'mtime': stat.st_mtime, 'size': stat.st_size, 'gps': None,
+                 'dimensions': None, 'placeholder': None}
+        parse_start = time.perf_counter()
+        try:
+            with Image.open(file_path) as image:
+                coords = self._extract_gps_coordinates(image)
+                if coords:
+                    # Lu dans l'en-tête : largeurs proposées aux clients (derivatives.py)
+                    entry['dimensions'] = list(derivatives.display_size(image))
+        except Exception:
+            coords = None
+        metrics.EXIF_PARSE_SECONDS.observe(time.perf_counter() - parse_start)
+
+        if coords:
+            entry['gps'] = [coords['latitude'], coords['longitude']]
+        return entry
+
+    @staticmethod
+    def _hash_same_size(candidates):
+        """
+        Calcule le SHA-1 des photos jouables de même taille (seules à pouvoir
+        être des copies exactes), s'il n'est pas déjà dans l'index
+
+        Args:
+            candidates: Liste de (entrée d'index, photo)
+
+        Returns:
+            Nombre d'empreintes calculées
+        """
+        by_size = collections.defaultdict(list)
+        for entry, photo in candidates:
+            by_size[entry['size']].append((entry, photo))
+
+        computed = 0
+        for group in by_size.values():
+            if len(group) < 2:
+                continue
+            for entry, photo in group:
+                if entry.get('sha1'):
+                    continue
+                try:
+                    entry['sha1'] = dedup.file_digest(photo['path'])
+                except OSError:
+                    continue
+                computed += 1
+        return computed
+
+    def _deduplicate(self):
+        """
+        Recompose le tirage : une photo par groupe de doublons, la plus grande
+        (l'original plutôt qu'une copie réduite)
+        """
+        candidates = self._candidates
+        groups = dedup.group_duplicates([
+            {'latitude': photo['latitude'], 'longitude': photo['longitude'],
+             'sha1': entry.get('sha1'), 'dhash': entry.get('dhash') or None}
+            for entry, photo in candidates
+        ])
+
+        def rank(i):
+            entry, photo = candidates[i]
+            return (photo['width'] or 0) * (photo['height'] or 0), entry['size']
+
+        kept = sorted(max(group, key=rank) for group in groups)
+        self.photos_with_gps = [candidates[i][1] for i in kept]
+        self.num_duplicates = len(candidates) - len(kept)
+        metrics.PHOTO_DUPLICATES.set(self.num_duplicates)
+
+    @property
+    def pending_placeholders(self):
+        """Nombre de photos jouables dont l'aperçu ou l'empreinte perceptuelle reste à calculer"""
+        return len(self._pending_placeholders)
+
+    def fill_placeholders(self, pause=None):
+        """
+        Calcule les aperçus BlurHash et empreintes perceptuelles manquants
+        (tâche de fond après un scan)
+
+        Les dicts de photos sont complétés sur place : les parties déjà créées
+        en profitent dès la manche suivante. L'index est écrit régulièrement
+        pour qu'un redémarrage ne reparte pas de zéro ; les copies proches
+        sont retirées du tirage à la fin.
+
+        Args:
+            pause: Fonction appelée entre deux photos (ex : socketio.sleep(0)
+                   pour laisser tourner les autres green threads)
+
+        Returns:
+            Nombre d'aperçus calculés
+        """
+        from PIL import Image
+
+        pending, self._pending_placeholders = self._pending_placeholders, []
+        computed = 0
+        for file_path, entry, photo in pending:
+            try:
+                with metrics.PLACEHOLDER_SECONDS.time(), Image.open(file_path) as image:
+                    # L'aperçu décode l'image réduite, réutilisée par le dHash
+                    if entry['placeholder'] is None:
+                        entry['placeholder'] = blurhash.placeholder(image)
+                    if entry.get('dhash') is None:
+                        entry['dhash'] = dedup.dhash(image)
+            except Exception:
+                # Illisible : ne pas réessayer à chaque scan
+                entry['placeholder'] = entry['placeholder'] or False
+                entry['dhash'] = entry.get('dhash') or False
+                continue
+            photo['placeholder'] = entry['placeholder']
+            computed += 1
+
+            if self.index_path and computed % PLACEHOLDER_SAVE_EVERY == 0:
+                self._save_index(self._index)
+            if pause:
+                pause()
+
+        if pending:
+            # Une fois à la fin : ~0,1 s pour 8 000 photos, ~1,3 s pour 80 000
+            self._deduplicate()
+            if self.index_path:
+                self._save_index(self._index)
+        return computed
+
+    def _extract_gps_coordinates(self, image):
         """
         Extrait les coordonnées GPS des métadonnées EXIF d'une image
 
         Args:
-            image_path: Chemin vers l'image
+            image: Image Pillow ouverte
 
         Returns:
             Dict avec latitude et longitude, ou None si pas de GPS
         """
+        from PIL.ExifTags import TAGS, GPSTAGS
+
         try:
-            image = Image.open(image_path)
             exif_data = image._getexif()
 
             if not exif_data:
@@ -119,6 +386,20 @@ class PhotoManager:
         except:
             return None
 
+    def contains(self, path):
+        """
+        Indique si un fichier se trouve dans le dossier racine (liens
+        symboliques et '..' résolus)
+
+        Args:
+            path: Chemin du fichier
+
+        Returns:
+            True si le fichier est sous le dossier racine
+        """
+        root = os.path.realpath(self.root_folder)
+        return os.path.commonpath([root, os.path.realpath(path)]) == root
+
     def get_random_photo(self):
         """
         Retourne une photo aléatoire parmi celles ayant des coordonnées GPS
@@ -131,12 +412,14 @@ class PhotoManager:
 
         return random.choice(self.photos_with_gps)
 
-    def get_random_photos(self, count):
+    def get_random_photos(self, count, difficulties=None):
         """
         Retourne plusieurs photos aléatoires
 
         Args:
             count: Nombre de photos à retourner
+            difficulties: Dict {id de photo: difficulté} pour un tirage
+                          équilibré (voir photo_stats.py), None pour un tirage uniforme
 
         Returns:
             Liste de photos
@@ -150,4 +433,52 @@ class PhotoManager:
             random.shuffle(photos)
             return photos
 
+        if difficulties:
+            return self._balanced_sample(count, difficulties)
         return random.sample(self.photos_with_gps, count)
+
+    def _balanced_sample(self, count, difficulties):
+        """
+        Tirage stratifié par difficulté : les photos notées sont triées par
+        difficulté et découpées en tranches égales, une photo tirée par tranche.
+        Les photos pas encore notées gardent leur part du tirage (tirées au
+        hasard) pour continuer à recevoir des réponses.
+
+        Args:
+            count: Nombre de photos (inférieur au nombre de photos jouables)
+            difficulties: Dict {id de photo: difficulté}
+
+        Returns:
+            Liste de photos dans un ordre aléatoire
+        """
+        # Partition réutilisée tant que les difficultés et le tirage ne changent pas
+        cached = self._strata
+        if cached and cached[0] is difficulties and cached[1] is self.photos_with_gps:
+            rated, unrated = cached[2], cached[3]
+        else:
+            rated = []
+            unrated = []
+            for photo in self.photos_with_gps:
+                difficulty = difficulties.get(photo.get('id'))
+                if difficulty is None:
+                    unrated.append(photo)
+                else:
+                    rated.append((difficulty, photo))
+            rated.sort(key=lambda item: item[0])
+            self._strata = (difficulties, self.photos_with_gps, rated, unrated)
+
+        # Part des photos non notées tirée comme dans un tirage uniforme
+        num_unrated = sum(random.random() < len(unrated) / len(self.photos_with_gps)
+                          for _ in range(count))
+        # Part manquante d'un côté reprise par l'autre (count < nombre de photos jouables)
+        num_unrated = min(num_unrated, len(unrated))
+        num_rated = min(count - num_unrated, len(rated))
+        num_unrated = count - num_rated
+
+        photos = random.sample(unrated, num_unrated)
+        for stratum in range(num_rated):
+            start = stratum * len(rated) // num_rated
+            end = (stratum + 1) * len(rated) // num_rated
+            photos.append(rated[random.randrange(start, end)][1])
+        random.shuffle(photos)
+        return photos
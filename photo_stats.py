@@ -0,0 +1,419 @@
+"""
+Statistiques de difficulté par photo, mises à jour à chaque réponse
+
+Pour chaque photo (id stable, voir photo_manager.photo_id) :
+- nombre de réponses, distance moyenne et écart-type (algorithme de Welford),
+  score moyen et temps de réponse moyen ;
+- distance médiane estimée en flux par l'algorithme P² (Jain et Chlamtac) :
+  cinq marqueurs, mémoire constante, sans conserver les réponses ;
+- carte de chaleur des réponses, comptées par cellule geohash.
+
+Chaque réponse coûte quelques microsecondes et la lecture ne parcourt aucune
+réponse. Les statistiques sont écrites périodiquement (tâche de nettoyage) ;
+en multi-processus, chaque worker écrit son fichier et la lecture fusionne
+ceux des autres (comptes, moyennes et cartes exacts, médiane approchée par
+la moyenne des médianes pondérée par le nombre de réponses).
+"""
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import metrics
+import serializer
+
+# Précision des cellules de la carte de chaleur (4 caractères : ~39 × 20 km)
+GEOHASH_PRECISION = 4
+
+# Cellules conservées par photo ; au-delà, les réponses sont comptées dans OTHER_CELL
+MAX_HEATMAP_CELLS = 512
+OTHER_CELL = '*'
+
+# Réponses nécessaires avant d'estimer la difficulté d'une photo
+MIN_GUESSES = 5
+
+# Score maximal d'une manche (voir GameManager._calculate_score)
+MAX_SCORE = 5000
+
+# Délai minimal entre deux relectures des fichiers des autres workers (secondes)
+PEER_REFRESH = 5
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """
+    Geohash d'un point
+
+    Args:
+        latitude: Latitude en degrés
+        longitude: Longitude en degrés
+        precision: Nombre de caractères
+
+    Returns:
+        Chaîne geohash
+    """
+    # Longitude renvoyée par une carte ayant fait plusieurs tours du monde
+    longitude = (longitude + 180) % 360 - 180
+    latitude = min(max(latitude, -90.0), 90.0)
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+class P2Median:
+    """Médiane estimée en flux (algorithme P², mémoire constante)"""
+
+    __slots__ = ('heights', 'positions', 'desired')
+
+    INCREMENTS = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+    def __init__(self, heights=None, positions=None, desired=None):
+        self.heights = heights or []  # Les 5 premières valeurs, puis les 5 marqueurs
+        self.positions = positions or [1, 2, 3, 4, 5]
+        self.desired = desired or [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    def add(self, x):
+        """
+        Args:
+            x: Nouvelle observation
+        """
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        # Cellule de x, en élargissant les extrêmes si besoin
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+
+        positions = self.positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.INCREMENTS[i]
+
+        # Ajuster les marqueurs intermédiaires (interpolation parabolique, sinon linéaire)
+        for i in (1, 2, 3):
+            d = self.desired[i] - positions[i]
+            if ((d >= 1 and positions[i + 1] - positions[i] > 1)
+                    or (d <= -1 and positions[i - 1] - positions[i] < -1)):
+                step = 1 if d > 0 else -1
+                candidate = self._parabolic(i, step)
+                if not heights[i - 1] < candidate < heights[i + 1]:
+                    candidate = heights[i] + step * (heights[i + step] - heights[i]) / (
+                        positions[i + step] - positions[i])
+                heights[i] = candidate
+                positions[i] += step
+
+    def _parabolic(self, i, step):
+        q, n = self.heights, self.positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    @property
+    def value(self):
+        """Médiane estimée (exacte jusqu'à 5 observations), None sans observation"""
+        heights = self.heights
+        if not heights:
+            return None
+        if len(heights) < 5:
+            middle = len(heights) // 2
+            if len(heights) % 2:
+                return heights[middle]
+            return (heights[middle - 1] + heights[middle]) / 2
+        return heights[2]
+
+    def to_list(self):
+        return [self.heights, self.positions, self.desired]
+
+    @classmethod
+    def from_list(cls, data):
+        return cls(*data)
+
+
+@dataclass(slots=True)
+class PhotoStats:
+    """Statistiques d'une photo"""
+    count: int = 0
+    mean_distance: float = 0.0
+    m2_distance: float = 0.0  # Somme des carrés des écarts (Welford)
+    median: P2Median = field(default_factory=P2Median)
+    median_estimate: float = None  # Médiane fusionnée (statistiques des autres workers)
+    score_sum: int = 0
+    timed_count: int = 0
+    time_sum_ms: int = 0
+    heatmap: dict = field(default_factory=dict)  # {geohash: nombre de réponses}
+
+    def add(self, distance_km, score, latitude, longitude, elapsed_ms=None):
+        """
+        Ajoute une réponse
+
+        Args:
+            distance_km: Distance à la position de la photo
+            score: Score obtenu
+            latitude: Latitude devinée
+            longitude: Longitude devinée
+            elapsed_ms: Temps de réponse (None si inconnu)
+        """
+        self.count += 1
+        delta = distance_km - self.mean_distance
+        self.mean_distance += delta / self.count
+        self.m2_distance += delta * (distance_km - self.mean_distance)
+        self.median.add(distance_km)
+        self.score_sum += score
+        if elapsed_ms is not None:
+            self.timed_count += 1
+            self.time_sum_ms += elapsed_ms
+
+        cell = geohash(latitude, longitude)
+        if cell not in self.heatmap and len(self.heatmap) >= MAX_HEATMAP_CELLS:
+            cell = OTHER_CELL
+        self.heatmap[cell] = self.heatmap.get(cell, 0) + 1
+
+    @property
+    def median_distance(self):
+        if self.median_estimate is not None:
+            return self.median_estimate
+        return self.median.value
+
+    @property
+    def difficulty(self):
+        """Difficulté entre 0 (toujours trouvée) et 1 (jamais), None si trop peu de réponses"""
+        if self.count < MIN_GUESSES:
+            return None
+        return 1 - self.score_sum / (self.count * MAX_SCORE)
+
+    def merge(self, other):
+        """
+        Fusionne les statistiques d'un autre worker (formule parallèle de Welford)
+
+        Returns:
+            Nouvelles statistiques (self et other inchangés)
+        """
+        count = self.count + other.count
+        if not count:
+            return PhotoStats()
+        delta = other.mean_distance - self.mean_distance
+        medians = [(stats.median_distance, stats.count) for stats in (self, other)
+                   if stats.median_distance is not None]
+        heatmap = dict(self.heatmap)
+        for cell, value in other.heatmap.items():
+            heatmap[cell] = heatmap.get(cell, 0) + value
+        return PhotoStats(
+            count=count,
+            mean_distance=self.mean_distance + delta * other.count / count,
+            m2_distance=self.m2_distance + other.m2_distance
+            + delta * delta * self.count * other.count / count,
+            median_estimate=sum(m * n for m, n in medians) / sum(n for _, n in medians),
+            score_sum=self.score_sum + other.score_sum,
+            timed_count=self.timed_count + other.timed_count,
+            time_sum_ms=self.time_sum_ms + other.time_sum_ms,
+            heatmap=heatmap
+        )
+
+    def to_public_dict(self, photo_id):
+        """
+        Args:
+            photo_id: ID de la photo
+
+        Returns:
+            Dict de /api/photo/<id>/stats (distances arrondies au mètre)
+        """
+        count = self.count
+        median = self.median_distance
+        return {
+            'photo_id': photo_id,
+            'guesses': count,
+            'mean_distance_km': round(self.mean_distance, 3) if count else None,
+            'median_distance_km': round(median, 3) if median is not None else None,
+            'stddev_distance_km': round(math.sqrt(self.m2_distance / count), 3) if count else None,
+            'mean_score': round(self.score_sum / count, 1) if count else None,
+            'mean_time_ms': round(self.time_sum_ms / self.timed_count) if self.timed_count else None,
+            'difficulty': round(self.difficulty, 3) if self.difficulty is not None else None,
+            'heatmap': {'precision': GEOHASH_PRECISION, 'cells': self.heatmap}
+        }
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_distance': self.mean_distance,
+            'm2_distance': self.m2_distance,
+            'median': self.median.to_list(),
+            'score_sum': self.score_sum,
+            'timed_count': self.timed_count,
+            'time_sum_ms': self.time_sum_ms,
+            'heatmap': self.heatmap
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            count=data['count'],
+            mean_distance=data['mean_distance'],
+            m2_distance=data['m2_distance'],
+            median=P2Median.from_list(data['median']),
+            score_sum=data['score_sum'],
+            timed_count=data['timed_count'],
+            time_sum_ms=data['time_sum_ms'],
+            heatmap=data['heatmap']
+        )
+
+
+class PhotoStatsStore:
+    """Statistiques de toutes les photos, persistées par worker"""
+
+    def __init__(self, path, peer_paths=()):
+        """
+        Args:
+            path: Fichier de ce worker (data/photo_stats.json)
+            peer_paths: Fichiers des autres workers (fusionnés à la lecture)
+        """
+        self.path = path
+        self.peer_paths = list(peer_paths)
+        self.stats = {}  # {id de photo: PhotoStats}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._peers = {}  # {chemin: (mtime, {id de photo: PhotoStats})}
+        self._peers_checked = 0
+        self._difficulties = None
+        self._difficulties_at = 0
+        self._load()
+
+    def _load(self):
+        self.stats = self._read(self.path)
+
+    @staticmethod
+    def _read(path):
+        if not os.path.exists(path):
+            return {}
+        try:
+            data = serializer.load_file(path)
+        except Exception:
+            return {}
+        return {photo_id: PhotoStats.from_dict(stats) for photo_id, stats in data.items()}
+
+    def add(self, photo, guess):
+        """
+        Ajoute une réponse aux statistiques de sa photo
+
+        Args:
+            photo: Dict de photo (sans 'id' : partie antérieure aux ids, ignorée)
+            guess: Guess notée (score calculé)
+        """
+        photo_id = photo.get('id')
+        if not photo_id:
+            return
+        with self._lock:
+            stats = self.stats.get(photo_id)
+            if stats is None:
+                stats = self.stats[photo_id] = PhotoStats()
+            stats.add(guess.distance_km, guess.score, guess.guess_lat, guess.guess_lon,
+                      guess.elapsed_ms)
+            self._dirty = True
+        metrics.PHOTO_STATS_UPDATES.inc()
+
+    def get(self, photo_id):
+        """
+        Statistiques d'une photo, fusionnées avec celles des autres workers
+
+        Args:
+            photo_id: ID de la photo
+
+        Returns:
+            PhotoStats, ou None si la photo n'a aucune réponse
+        """
+        with self._lock:
+            stats = self.stats.get(photo_id)
+        for peer in self._peer_stats():
+            other = peer.get(photo_id)
+            if other:
+                stats = stats.merge(other) if stats else other
+        return stats
+
+    def difficulties(self):
+        """
+        Difficulté des photos ayant assez de réponses (tirage équilibré)
+
+        Recalculée au plus toutes les PEER_REFRESH secondes : seuls les
+        comptes et les scores sont additionnés entre workers.
+
+        Returns:
+            Dict {id de photo: difficulté entre 0 et 1}
+        """
+        now = time.time()
+        if self._difficulties is not None and now - self._difficulties_at < PEER_REFRESH:
+            return self._difficulties
+
+        totals = {}
+        with self._lock:
+            for photo_id, stats in self.stats.items():
+                totals[photo_id] = [stats.count, stats.score_sum]
+        for peer in self._peer_stats():
+            for photo_id, stats in peer.items():
+                total = totals.setdefault(photo_id, [0, 0])
+                total[0] += stats.count
+                total[1] += stats.score_sum
+
+        self._difficulties = {photo_id: 1 - score_sum / (count * MAX_SCORE)
+                              for photo_id, (count, score_sum) in totals.items()
+                              if count >= MIN_GUESSES}
+        self._difficulties_at = now
+        return self._difficulties
+
+    def _peer_stats(self):
+        """Statistiques des autres workers, relues quand leur fichier change"""
+        if not self.peer_paths:
+            return []
+        now = time.time()
+        if now - self._peers_checked >= PEER_REFRESH:
+            self._peers_checked = now
+            for path in self.peer_paths:
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                cached = self._peers.get(path)
+                if cached is None or cached[0] != mtime:
+                    self._peers[path] = (mtime, self._read(path))
+        return [stats for _, stats in self._peers.values()]
+
+    def save(self):
+        """Écrit les statistiques si elles ont changé depuis la dernière écriture"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {photo_id: stats.to_dict() for photo_id, stats in self.stats.items()}
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with metrics.PERSIST_SECONDS.labels('photo_stats').time():
+            serializer.dump_file(data, self.path)
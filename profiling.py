@@ -0,0 +1,188 @@
+"""
+Profilage à la demande des requêtes HTTP (désactivé par défaut)
+
+GEOQUIZZ_PROFILE choisit les requêtes profilées :
+- off (défaut) : aucune ;
+- header : seulement celles qui portent l'en-tête X-GeoQuizz-Profile: 1 ;
+- all : toutes ;
+- un ratio (ex : 0.05) : un échantillon aléatoire.
+
+Chaque profil est écrit dans data/profiles/ : <endpoint>-<horodatage>-<pid>-<n>.prof
+(cProfile, lisible avec pstats ou snakeviz) ou .html avec pyinstrument
+(GEOQUIZZ_PROFILER=pyinstrument, si installé). Le nom du fichier est renvoyé
+dans l'en-tête X-GeoQuizz-Profile-File.
+
+cProfile ne suit qu'un profileur à la fois : une requête arrivant pendant
+qu'une autre est profilée n'est pas profilée (comptée comme ignorée). Avec
+eventlet/gevent, le profil inclut aussi le travail des green threads qui
+s'exécutent pendant les attentes de la requête.
+"""
+import collections
+import itertools
+import os
+import random
+import re
+import threading
+import time
+
+from flask import g, request
+
+import metrics
+
+PROFILE_HEADER = 'X-GeoQuizz-Profile'
+PROFILE_FILE_HEADER = 'X-GeoQuizz-Profile-File'
+
+# Nombre de profils conservés par processus (les plus anciens sont supprimés)
+PROFILE_MAX_FILES = 500
+
+
+class _CProfileSession:
+    extension = 'prof'
+
+    def __init__(self):
+        import cProfile
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def write(self, path):
+        self.profiler.dump_stats(path)
+
+
+class _PyinstrumentSession:
+    extension = 'html'
+
+    def __init__(self):
+        from pyinstrument import Profiler
+        self.profiler = Profiler(async_mode='disabled')
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.profiler.output_html())
+
+
+PROFILERS = {'cprofile': _CProfileSession, 'pyinstrument': _PyinstrumentSession}
+
+
+def parse_mode(value):
+    """
+    Args:
+        value: Valeur de GEOQUIZZ_PROFILE
+
+    Returns:
+        'off', 'header', 'all' ou un ratio (float entre 0 et 1)
+    """
+    value = (value or 'off').strip().lower()
+    if value in ('', '0', 'off'):
+        return 'off'
+    if value in ('1', 'all'):
+        return 'all'
+    if value == 'header':
+        return value
+    try:
+        ratio = float(value)
+    except ValueError:
+        raise ValueError(f'GEOQUIZZ_PROFILE invalide : {value}')
+    return 'all' if ratio >= 1 else ratio if ratio > 0 else 'off'
+
+
+class RequestProfiler:
+    """Profile les requêtes Flask sélectionnées et écrit un fichier par requête"""
+
+    def __init__(self, folder, mode='off', profiler='cprofile', max_files=PROFILE_MAX_FILES):
+        """
+        Args:
+            folder: Dossier des profils (créé au premier profil)
+            mode: Voir parse_mode
+            profiler: 'cprofile' ou 'pyinstrument'
+            max_files: Profils conservés avant de supprimer les plus anciens
+        """
+        if profiler not in PROFILERS:
+            raise ValueError(f'Profileur inconnu : {profiler}')
+        self.folder = folder
+        self.mode = parse_mode(mode) if isinstance(mode, str) else mode
+        self.session_class = PROFILERS[profiler]
+        self.max_files = max_files
+        self._busy = threading.Lock()
+        self._written = collections.deque()
+        self._sequence = itertools.count()
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    def init_app(self, app):
+        """Branche le profilage sur les requêtes de l'application (sans effet si off)"""
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _selected(self):
+        if self.mode == 'all':
+            return True
+        if self.mode == 'header':
+            return request.headers.get(PROFILE_HEADER) == '1'
+        return random.random() < self.mode
+
+    def _before_request(self):
+        if not self._selected():
+            return
+        if not self._busy.acquire(blocking=False):
+            metrics.REQUEST_PROFILES.labels('skipped').inc()
+            return
+        try:
+            session = self.session_class()
+            session.start()
+        except Exception:
+            self._busy.release()
+            raise
+        g.profile_session = session
+
+    def _after_request(self, response):
+        session = g.pop('profile_session', None)
+        if session is not None:
+            session.stop()
+            self._busy.release()
+            response.headers[PROFILE_FILE_HEADER] = self._write(session)
+        return response
+
+    def _teardown_request(self, exc):
+        # Requête interrompue par une exception : after_request n'a pas été appelé
+        session = g.pop('profile_session', None)
+        if session is not None:
+            session.stop()
+            self._busy.release()
+
+    def _write(self, session):
+        """
+        Écrit un profil et supprime les plus anciens au-delà de max_files
+
+        Returns:
+            Nom du fichier écrit
+        """
+        endpoint = re.sub(r'[^A-Za-z0-9_.]', '_', request.endpoint or 'unknown')
+        name = (f'{endpoint}-{int(time.time() * 1000)}-{os.getpid()}-{next(self._sequence)}'
+                f'.{session.extension}')
+        os.makedirs(self.folder, exist_ok=True)
+        session.write(os.path.join(self.folder, name))
+        metrics.REQUEST_PROFILES.labels('written').inc()
+
+        self._written.append(name)
+        while len(self._written) > self.max_files:
+            try:
+                os.remove(os.path.join(self.folder, self._written.popleft()))
+            except OSError:
+                pass
+        return name
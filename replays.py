@@ -0,0 +1,231 @@
+"""
+Enregistrement compact des réponses de chaque manche (replays, heatmaps)
+
+Un fichier binaire par partie (data/replays/<id>.bin), écrit en ajout seul au
+fil des manches : une réponse y occupe 18 octets (type compris), contre ~150
+octets pour un dict de réponse dans sessions.json.
+
+Le fichier est une suite de blocs, chacun préfixé par un octet de type :
+- b'H' + longueur (uint32) + JSON : en-tête de la partie (type, nom, date,
+  nombre de manches, photos [{id, latitude, longitude}]) ;
+- b'P' + index (uint16) + longueur (uint8) + nom UTF-8 : joueur ;
+- b'G' + réponse (RECORD) : index de la photo dans l'en-tête (uint8), joueur
+  (uint16), latitude et longitude devinées (int32, microdegrés), score
+  (uint16), temps de réponse (uint32, millisecondes ; UNKNOWN_TIME si inconnu).
+Entiers petit-boutistes. Un bloc incomplet en fin de fichier (écriture
+interrompue) est ignoré à la lecture et retiré avant le prochain ajout.
+"""
+import os
+import re
+import struct
+import threading
+
+import metrics
+import serializer
+
+RECORD = struct.Struct('<BHiiHI')
+HEADER_LENGTH = struct.Struct('<I')
+PLAYER = struct.Struct('<HB')
+
+UNKNOWN_TIME = 0xFFFFFFFF
+
+# IDs de partie acceptés (noms de fichiers : pas de séparateur de chemin)
+GAME_ID = re.compile(r'^[A-Za-z0-9-]{1,64}$')
+
+# Nom de joueur tronqué à la longueur codable sur un octet
+MAX_NAME_BYTES = 255
+
+
+def _encode_guess(photo_index, player_index, guess):
+    elapsed = guess.elapsed_ms if guess.elapsed_ms is not None else UNKNOWN_TIME
+    return b'G' + RECORD.pack(photo_index, player_index,
+                              round(guess.guess_lat * 1e6), round(guess.guess_lon * 1e6),
+                              guess.score, min(elapsed, UNKNOWN_TIME))
+
+
+class ReplayStore:
+    """Écrit et relit les fichiers de replay des parties"""
+
+    def __init__(self, folder):
+        """
+        Args:
+            folder: Dossier des replays (data/replays)
+        """
+        self.folder = folder
+        self._players = {}  # {id de partie: {nom: index}} des parties en cours d'écriture
+        self._lock = threading.Lock()
+
+    def path(self, game_id):
+        """
+        Args:
+            game_id: ID de la partie
+
+        Returns:
+            Chemin du fichier de replay, ou None si l'ID est invalide
+        """
+        if not GAME_ID.match(game_id):
+            return None
+        return os.path.join(self.folder, f'{game_id}.bin')
+
+    def record(self, kind, game, guesses):
+        """
+        Ajoute les réponses d'une manche au replay (créé à la première réponse)
+
+        Args:
+            kind: Type de partie ('solo', 'multiplayer', 'synchronized')
+            game: Session ou salle (id, created_at, num_rounds, photos)
+            guesses: Liste de (nom du joueur, Guess) ; Guess.round désigne la photo
+        """
+        path = self.path(game.id)
+        if path is None or not guesses:
+            return
+
+        try:
+            with metrics.PERSIST_SECONDS.labels('replays').time(), self._lock:
+                players = self._players.get(game.id)
+                chunks = []
+                if players is None:
+                    players = self._reopen(path) if os.path.exists(path) else {}
+                    if not os.path.exists(path) or os.path.getsize(path) == 0:
+                        chunks.append(self._header(kind, game))
+                    self._players[game.id] = players
+
+                for player_name, guess in guesses:
+                    index = players.get(player_name)
+                    if index is None:
+                        index = players[player_name] = len(players)
+                        name = player_name.encode('utf-8')[:MAX_NAME_BYTES]
+                        chunks.append(b'P' + PLAYER.pack(index, len(name)) + name)
+                    chunks.append(_encode_guess(guess.round - 1, index, guess))
+
+                os.makedirs(self.folder, exist_ok=True)
+                # Une seule écriture en mode ajout : pas de bloc entrelacé
+                with open(path, 'ab') as f:
+                    f.write(b''.join(chunks))
+        except (OSError, struct.error, ValueError, TypeError) as e:
+            # Le replay est accessoire : une réponse déjà notée n'est jamais refusée
+            print(f"Erreur lors de l'écriture du replay {game.id} : {e}")
+
+    def forget(self, game_id):
+        """
+        Libère l'index des joueurs d'une partie terminée ou retirée de la mémoire
+
+        Args:
+            game_id: ID de la partie
+        """
+        with self._lock:
+            self._players.pop(game_id, None)
+
+    @staticmethod
+    def _reopen(path):
+        """
+        Reprend l'écriture d'un replay existant (partie reprise après redémarrage)
+
+        Returns:
+            Dict {nom: index} des joueurs déjà enregistrés
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        players = {}
+        end = 0
+        for event, end in _parse(data):
+            if event['type'] == 'player':
+                players[event['name']] = event['index']
+        if end < len(data):
+            # Bloc incomplet : les ajouts suivants seraient décalés
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+        return players
+
+    @staticmethod
+    def _header(kind, game):
+        header = {
+            'id': game.id,
+            'kind': kind,
+            'name': getattr(game, 'name', None),
+            'created_at': game.created_at,
+            'num_rounds': game.num_rounds,
+            'photos': [{'id': photo.get('id'), 'latitude': photo['latitude'],
+                        'longitude': photo['longitude']} for photo in game.photos]
+        }
+        data = serializer.encode(header)
+        return b'H' + HEADER_LENGTH.pack(len(data)) + data
+
+    def read(self, game_id):
+        """
+        Relit un replay bloc par bloc
+
+        Args:
+            game_id: ID de la partie
+
+        Yields:
+            Dicts {type: 'game'|'player'|'guess', ...} dans l'ordre d'écriture
+        """
+        path = self.path(game_id)
+        if path is None or not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        for event, _ in _parse(data):
+            yield event
+
+    def exists(self, game_id):
+        """Indique si une partie a un replay"""
+        path = self.path(game_id)
+        return path is not None and os.path.exists(path)
+
+
+def _parse(data):
+    """
+    Décode les blocs d'un replay
+
+    Args:
+        data: Contenu du fichier
+
+    Yields:
+        Tuples (événement, position de fin du bloc) ; s'arrête au premier
+        bloc incomplet ou inconnu
+    """
+    photos = []
+    offset = 0
+    while offset < len(data):
+        tag = data[offset:offset + 1]
+        start = offset + 1
+        if tag == b'G':
+            if start + RECORD.size > len(data):
+                return
+            photo_index, player, lat, lon, score, elapsed = RECORD.unpack_from(data, start)
+            offset = start + RECORD.size
+            yield {
+                'type': 'guess',
+                'round': photo_index + 1,
+                'photo_id': photos[photo_index].get('id') if photo_index < len(photos) else None,
+                'player': player,
+                'lat': lat / 1e6,
+                'lon': lon / 1e6,
+                'score': score,
+                'time_ms': None if elapsed == UNKNOWN_TIME else elapsed
+            }, offset
+        elif tag == b'P':
+            if start + PLAYER.size > len(data):
+                return
+            index, length = PLAYER.unpack_from(data, start)
+            name_start = start + PLAYER.size
+            if name_start + length > len(data):
+                return
+            offset = name_start + length
+            yield {'type': 'player', 'index': index,
+                   'name': data[name_start:offset].decode('utf-8', 'replace')}, offset
+        elif tag == b'H':
+            if start + HEADER_LENGTH.size > len(data):
+                return
+            (length,) = HEADER_LENGTH.unpack_from(data, start)
+            header_start = start + HEADER_LENGTH.size
+            if header_start + length > len(data):
+                return
+            offset = header_start + length
+            header = serializer.loads(data[header_start:offset])
+            photos = header.get('photos', [])
+            yield dict(header, type='game'), offset
+        else:
+            return
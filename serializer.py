@@ -0,0 +1,172 @@
+"""
+Sérialisation JSON rapide pour le stockage et les paquets Socket.IO
+
+Utilise msgspec ou orjson s'ils sont installés, sinon le module json de la
+bibliothèque standard (sans indentation ni échappement ASCII). Le module
+expose dumps/loads avec la signature de json : il est passé tel quel à
+SocketIO(json=...) pour encoder chaque paquet émis.
+
+GEOQUIZZ_JSON_BACKEND force un encodeur : msgspec, orjson ou json.
+"""
+import json
+import os
+import threading
+
+# Par ordre de préférence (msgspec est le plus rapide sur nos paquets)
+BACKENDS = ('msgspec', 'orjson', 'json')
+
+
+def _orjson_backend():
+    import orjson
+    option = orjson.OPT_NON_STR_KEYS
+
+    def encode(obj):
+        return orjson.dumps(obj, option=option)
+
+    # orjson.Fragment insère du JSON déjà encodé (orjson >= 3.9.14)
+    fragment = getattr(orjson, 'Fragment', None)
+    return encode, orjson.loads, fragment
+
+
+def _msgspec_backend():
+    import msgspec
+    return msgspec.json.Encoder().encode, msgspec.json.Decoder().decode, msgspec.Raw
+
+
+def _stdlib_backend():
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def encode(obj):
+        return encoder.encode(obj).encode('utf-8')
+
+    return encode, json.loads, None
+
+
+_FACTORIES = {
+    'orjson': _orjson_backend,
+    'msgspec': _msgspec_backend,
+    'json': _stdlib_backend
+}
+
+
+def load_backend(requested=None):
+    """
+    Charge l'encodeur JSON demandé, ou le plus rapide disponible
+
+    Args:
+        requested: 'auto', 'msgspec', 'orjson' ou 'json'
+                   (lu depuis GEOQUIZZ_JSON_BACKEND si None)
+
+    Returns:
+        Tuple (nom, fonction objet -> bytes, fonction bytes/str -> objet,
+        type enveloppant du JSON pré-encodé ou None)
+    """
+    requested = (requested or os.environ.get('GEOQUIZZ_JSON_BACKEND') or 'auto').lower()
+
+    if requested == 'auto':
+        for name in BACKENDS:
+            try:
+                return (name,) + _FACTORIES[name]()
+            except ImportError:
+                continue
+
+    if requested not in _FACTORIES:
+        raise ValueError(f"Encodeur JSON inconnu : {requested}")
+    return (requested,) + _FACTORIES[requested]()
+
+
+BACKEND, _encode, _decode, _raw_type = load_backend()
+
+
+def encode(obj):
+    """
+    Encode un objet en JSON compact
+
+    Args:
+        obj: Objet à encoder
+
+    Returns:
+        Bytes UTF-8
+    """
+    return _encode(obj)
+
+
+def dumps(obj, **kwargs):
+    """
+    Encode un objet en texte JSON compact
+
+    Args:
+        obj: Objet à encoder
+        kwargs: Options de json.dumps, ignorées (sortie toujours compacte)
+
+    Returns:
+        Chaîne JSON
+    """
+    return _encode(obj).decode('utf-8')
+
+
+def loads(data, **kwargs):
+    """
+    Décode un texte JSON
+
+    Args:
+        data: Chaîne ou bytes JSON
+        kwargs: Options de json.loads, ignorées
+
+    Returns:
+        Objet décodé
+    """
+    return _decode(data)
+
+
+def raw(obj):
+    """
+    Pré-encode un paquet émis plusieurs fois (ex : état de salle en cache).
+    Sans msgspec ni orjson récent, l'objet est renvoyé tel quel.
+
+    Args:
+        obj: Objet à encoder
+
+    Returns:
+        JSON pré-encodé inséré tel quel par dumps(), ou obj
+    """
+    if _raw_type is None:
+        return obj
+    return _raw_type(_encode(obj))
+
+
+def dump_file(obj, path):
+    """
+    Écrit un objet dans un fichier JSON compact
+
+    L'écriture passe par un fichier temporaire renommé ensuite : un lecteur
+    (autre worker, redémarrage) voit l'ancien contenu ou le nouveau, jamais
+    un fichier à moitié écrit.
+
+    Args:
+        obj: Objet à écrire
+        path: Chemin du fichier
+    """
+    data = _encode(obj)
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_file(path):
+    """
+    Lit un fichier JSON
+
+    Args:
+        path: Chemin du fichier
+
+    Returns:
+        Objet décodé
+    """
+    with open(path, 'rb') as f:
+        return _decode(f.read())
@@ -0,0 +1,124 @@
+"""
+Point d'entrée de production de GeoQuizz
+
+Lance l'application avec un serveur asynchrone (eventlet ou gevent) au lieu du
+serveur de développement Werkzeug : chaque connexion WebSocket et chaque timer
+de salle est une green thread, sans rechargement automatique ni débogueur.
+
+Le mode est choisi par GEOQUIZZ_ASYNC_MODE :
+    auto       eventlet, sinon gevent, sinon threading (défaut)
+    eventlet   pip install eventlet
+    gevent     pip install gevent gevent-websocket
+    threading  serveur Werkzeug, un thread par connexion (développement)
+
+GEOQUIZZ_MAX_CONNECTIONS plafonne les connexions simultanées (défaut 1024).
+
+Usage:
+    python serve.py
+    GEOQUIZZ_ASYNC_MODE=gevent GEOQUIZZ_PORT=8000 python serve.py
+"""
+import importlib.util
+import os
+import sys
+
+ASYNC_MODES = ('eventlet', 'gevent', 'threading')
+
+# Connexions simultanées par processus (HTTP + WebSocket) en eventlet/gevent
+DEFAULT_MAX_CONNECTIONS = 1024
+
+
+def select_async_mode(requested=None):
+    """
+    Détermine le mode asynchrone à utiliser
+
+    Args:
+        requested: Mode demandé (lu depuis GEOQUIZZ_ASYNC_MODE si None)
+
+    Returns:
+        'eventlet', 'gevent' ou 'threading'
+    """
+    requested = (requested or os.environ.get('GEOQUIZZ_ASYNC_MODE') or 'auto').lower()
+
+    if requested == 'auto':
+        for mode in ASYNC_MODES[:-1]:
+            if importlib.util.find_spec(mode) is not None:
+                return mode
+        return 'threading'
+
+    if requested not in ASYNC_MODES:
+        sys.exit(f"GEOQUIZZ_ASYNC_MODE invalide : {requested} (auto, {', '.join(ASYNC_MODES)})")
+
+    if requested != 'threading' and importlib.util.find_spec(requested) is None:
+        sys.exit(f"Le mode {requested} n'est pas installé (pip install {requested})")
+
+    return requested
+
+
+def patch_stdlib(mode):
+    """
+    Rend la bibliothèque standard coopérative (sockets, sleep, verrous)
+
+    Doit être appelé avant l'import de l'application.
+
+    Args:
+        mode: Mode asynchrone retenu
+    """
+    if mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+
+
+def server_options(mode):
+    """
+    Options du serveur WSGI : plafond de connexions simultanées
+
+    Args:
+        mode: Mode asynchrone retenu
+
+    Returns:
+        Dict de paramètres passés à socketio.run()
+    """
+    max_connections = int(os.environ.get('GEOQUIZZ_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS))
+
+    if mode == 'eventlet':
+        return {'max_size': max_connections}
+    if mode == 'gevent':
+        from gevent.pool import Pool
+        return {'spawn': Pool(max_connections)}
+    return {}
+
+
+def main():
+    mode = select_async_mode()
+    patch_stdlib(mode)
+
+    # app.py lit ce mode à l'initialisation de SocketIO
+    os.environ['GEOQUIZZ_ASYNC_MODE'] = mode
+    from app import app, socketio, cluster
+
+    os.makedirs('data', exist_ok=True)
+
+    host = os.environ.get('GEOQUIZZ_HOST', '0.0.0.0')
+    port = int(os.environ.get('GEOQUIZZ_PORT', 5000))
+
+    print("=" * 50)
+    print(f"GeoQuizz - Serveur de production ({mode})")
+    print("=" * 50)
+    if cluster['workers'] > 1:
+        print(f"Worker {cluster['worker_index'] + 1}/{cluster['workers']} sur le port {port}")
+    else:
+        print(f"Écoute sur http://{host}:{port}")
+    if mode == 'threading':
+        print("Attention : serveur Werkzeug (threading), déconseillé en production")
+    print("=" * 50)
+
+    socketio.run(app, host=host, port=port, debug=False, use_reloader=False,
+                 log_output=False, allow_unsafe_werkzeug=mode == 'threading',
+                 **server_options(mode))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Liens de partage des salles : IP locale et QR codes
+
+L'IP locale est résolue une fois puis rafraîchie après LOCAL_IP_TTL secondes
+ou quand la liste des interfaces réseau change (vérifiée toutes les
+INTERFACE_CHECK_INTERVAL secondes). Les QR codes PNG sont mis en cache par
+(salle, hôte, port) dans un LRU borné, avec un ETag pour les requêtes
+conditionnelles. qrcode n'est importé qu'à la première image générée.
+"""
+import hashlib
+import socket
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+import metrics
+
+# Durée de validité de l'IP locale résolue (secondes)
+LOCAL_IP_TTL = 300
+
+# Intervalle de vérification de la liste des interfaces réseau (secondes)
+INTERFACE_CHECK_INTERVAL = 5
+
+# Nombre maximal de QR codes PNG gardés en mémoire (~1 Ko chacun)
+QR_CACHE_SIZE = 256
+
+
+def resolve_local_ip():
+    """
+    Obtenir l'adresse IP locale du serveur (non-localhost)
+
+    Returns:
+        str: Adresse IP locale (ex: 192.168.1.66) ou localhost si non trouvée
+    """
+    try:
+        # Méthode 1: Connexion UDP pour trouver l'IP locale
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # On se connecte à un serveur externe (pas besoin que la connexion aboutisse)
+        s.connect(("8.8.8.8", 80))
+        local_ip = s.getsockname()[0]
+        s.close()
+        return local_ip
+    except Exception:
+        try:
+            # Méthode 2: Via le hostname
+            hostname = socket.gethostname()
+            local_ip = socket.gethostbyname(hostname)
+            # Ne pas retourner 127.0.0.1
+            if local_ip != '127.0.0.1':
+                return local_ip
+        except Exception:
+            pass
+
+    # Fallback à localhost si aucune méthode ne fonctionne
+    return 'localhost'
+
+
+def _interfaces():
+    """
+    Liste des interfaces réseau (détecte un changement de réseau)
+
+    Returns:
+        Tuple des noms d'interface, ou None si non supporté par le système
+    """
+    try:
+        return tuple(name for _, name in socket.if_nameindex())
+    except (AttributeError, OSError):
+        return None
+
+
+class LocalIPResolver:
+    """IP locale mise en cache, rafraîchie sur délai ou changement d'interface"""
+
+    def __init__(self, ttl=LOCAL_IP_TTL):
+        """
+        Args:
+            ttl: Durée de validité de l'IP résolue (secondes, 0 = jamais en cache)
+        """
+        self.ttl = ttl
+        self._ip = None
+        self._interfaces = None
+        self._expires = 0
+        self._next_check = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Returns:
+            str: Adresse IP locale (voir resolve_local_ip)
+        """
+        now = time.monotonic()
+        with self._lock:
+            stale = self._ip is None or now >= self._expires
+            if not stale and now >= self._next_check:
+                # Interface ajoutée ou retirée (Wi-Fi, VPN...) : résoudre à nouveau
+                stale = _interfaces() != self._interfaces
+                self._next_check = now + INTERFACE_CHECK_INTERVAL
+
+            if stale:
+                self._ip = resolve_local_ip()
+                self._interfaces = _interfaces()
+                self._expires = now + self.ttl
+                self._next_check = now + INTERFACE_CHECK_INTERVAL
+            return self._ip
+
+
+def join_url(host, port, room_id):
+    """
+    URL pour rejoindre une salle depuis un autre appareil
+
+    Args:
+        host: IP ou nom du serveur
+        port: Port du serveur
+        room_id: ID de la salle
+
+    Returns:
+        URL de la page /join
+    """
+    return f"http://{host}:{port}/join/{room_id}"
+
+
+def render_qr_png(url):
+    """
+    Génère le QR code PNG d'une URL
+
+    Args:
+        url: URL à encoder
+
+    Returns:
+        Image PNG (bytes)
+    """
+    # qrcode (et PIL) ne sont chargés qu'à la première image générée
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    img_io = BytesIO()
+    img.save(img_io, 'PNG')
+    return img_io.getvalue()
+
+
+class QRCodeCache:
+    """Cache LRU borné des QR codes PNG, clé (room_id, hôte, port)"""
+
+    def __init__(self, maxsize=QR_CACHE_SIZE):
+        """
+        Args:
+            maxsize: Nombre maximal d'images gardées en mémoire
+        """
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # {(room_id, hôte, port): (png, etag)}
+        self._lock = threading.Lock()
+
+    def get(self, room_id, host, port):
+        """
+        QR code d'une salle, généré au premier appel
+
+        Args:
+            room_id: ID de la salle
+            host: IP ou nom du serveur encodé dans l'URL
+            port: Port du serveur
+
+        Returns:
+            Tuple (image PNG, ETag)
+        """
+        key = (room_id, host, port)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                metrics.CACHE_REQUESTS.labels('qrcode', 'hit').inc()
+                return entry
+        metrics.CACHE_REQUESTS.labels('qrcode', 'miss').inc()
+
+        # Génération hors verrou (quelques millisecondes)
+        png = render_qr_png(join_url(host, port, room_id))
+        entry = (png, hashlib.sha1(png).hexdigest()[:16])
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def __len__(self):
+        return len(self._entries)
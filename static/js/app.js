@@ -21,6 +21,18 @@ let currentRoomId = null;
 let playerColor = null;
 let isHost = false;
 let isReady = false;
+let roomState = null;  // Dernier état de salle connu (instantané + deltas)
+let clusterWorkers = 1;  // Nombre de processus serveur (voir cluster.py)
+let socketRoomId = null;  // Salle transmise au routeur à la connexion
+let lastRoundResults = null;  // Derniers résultats de manche reçus
+let myRoundResult = null;  // Ligne personnelle (mode 'top' des grandes salles)
+
+// Synchronisation d'horloge avec le serveur (les timers sont rendus localement)
+let serverClockOffset = null;  // Différence serveur - client en ms
+let serverClockRtt = Infinity;  // Meilleur aller-retour mesuré
+let roundTimerInterval = null;
+let countdownInterval = null;
+let pauseTimerInterval = null;
 
 /**
  * Obtenir les coordonnées et le zoom pour centrer la carte
@@ -42,6 +54,164 @@ function getMapView() {
     }
 }
 
+// ===== APERÇUS DES PHOTOS (BLURHASH) =====
+
+const BLURHASH_CHARS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~';
+
+function decode83(str) {
+    let value = 0;
+    for (const char of str) {
+        value = value * 83 + BLURHASH_CHARS.indexOf(char);
+    }
+    return value;
+}
+
+function srgbToLinear(value) {
+    const v = value / 255;
+    return v <= 0.04045 ? v / 12.92 : Math.pow((v + 0.055) / 1.055, 2.4);
+}
+
+function linearToSrgb(value) {
+    const v = Math.max(0, Math.min(1, value));
+    return v <= 0.0031308
+        ? Math.round(v * 12.92 * 255)
+        : Math.round((1.055 * Math.pow(v, 1 / 2.4) - 0.055) * 255);
+}
+
+function signPow(value, exponent) {
+    return Math.sign(value) * Math.pow(Math.abs(value), exponent);
+}
+
+/**
+ * Décoder un BlurHash en image floue (data URL) aux proportions de la photo
+ */
+function blurhashToDataURL(placeholder) {
+    const hash = placeholder.blurhash;
+    const sizeFlag = decode83(hash[0]);
+    const numX = (sizeFlag % 9) + 1;
+    const numY = Math.floor(sizeFlag / 9) + 1;
+    const maximum = (decode83(hash[1]) + 1) / 166;
+
+    const colors = [];
+    const dc = decode83(hash.substring(2, 6));
+    colors.push([srgbToLinear(dc >> 16), srgbToLinear((dc >> 8) & 255), srgbToLinear(dc & 255)]);
+    for (let i = 1; i < numX * numY; i++) {
+        const ac = decode83(hash.substring(4 + i * 2, 6 + i * 2));
+        colors.push([
+            signPow((Math.floor(ac / 361) - 9) / 9, 2) * maximum,
+            signPow((Math.floor(ac / 19) % 19 - 9) / 9, 2) * maximum,
+            signPow((ac % 19 - 9) / 9, 2) * maximum
+        ]);
+    }
+
+    // 32 pixels sur le grand côté : l'image est ensuite étirée (flou voulu)
+    const ratio = placeholder.width / placeholder.height;
+    const width = ratio >= 1 ? 32 : Math.max(1, Math.round(32 * ratio));
+    const height = ratio >= 1 ? Math.max(1, Math.round(32 / ratio)) : 32;
+
+    const canvas = document.createElement('canvas');
+    canvas.width = width;
+    canvas.height = height;
+    const context = canvas.getContext('2d');
+    const image = context.createImageData(width, height);
+    for (let y = 0; y < height; y++) {
+        for (let x = 0; x < width; x++) {
+            let r = 0, g = 0, b = 0;
+            for (let j = 0; j < numY; j++) {
+                for (let i = 0; i < numX; i++) {
+                    const basis = Math.cos(Math.PI * x * i / width) * Math.cos(Math.PI * y * j / height);
+                    const color = colors[i + j * numX];
+                    r += color[0] * basis;
+                    g += color[1] * basis;
+                    b += color[2] * basis;
+                }
+            }
+            const offset = 4 * (x + y * width);
+            image.data[offset] = linearToSrgb(r);
+            image.data[offset + 1] = linearToSrgb(g);
+            image.data[offset + 2] = linearToSrgb(b);
+            image.data[offset + 3] = 255;
+        }
+    }
+    context.putImageData(image, 0, 0);
+    return canvas.toDataURL();
+}
+
+// ===== DÉCLINAISONS DES PHOTOS (SRCSET) =====
+
+// Hauteur du cadre photo (voir .photo-container dans style.css)
+const PHOTO_FRAME_HEIGHT = 500;
+const PHOTO_FRAME_HEIGHT_NARROW = 400;
+
+/**
+ * srcset d'une photo dans un format : une URL par largeur déclinée
+ * (la dernière déclinaison n'excède pas la largeur de l'original)
+ */
+function photoSrcset(src, variants, format) {
+    return variants.widths
+        .map(width => `${src}?w=${width}&format=${format} ${Math.min(width, variants.width)}w`)
+        .join(', ');
+}
+
+/**
+ * Largeur affichée de la photo : la colonne (tout l'écran sous 968px), ou
+ * moins si la hauteur du cadre limite une photo en portrait
+ */
+function photoSizes(variants) {
+    const ratio = variants.height ? variants.width / variants.height : 4 / 3;
+    const wide = Math.round(PHOTO_FRAME_HEIGHT * ratio);
+    const narrow = Math.round(PHOTO_FRAME_HEIGHT_NARROW * ratio);
+    return `(max-width: 968px) min(100vw, ${narrow}px), min(50vw, ${wide}px)`;
+}
+
+/**
+ * Afficher une photo : l'aperçu flou est peint immédiatement, la photo
+ * le remplace une fois chargée. Avec des déclinaisons, le navigateur choisit
+ * le format (AVIF/WebP/JPEG) et la largeur adaptés à l'écran.
+ */
+function showPhoto(src, placeholder, variants) {
+    const container = document.querySelector('.photo-container');
+    const picture = document.getElementById('current-picture');
+    const img = document.getElementById('current-photo');
+
+    container.style.backgroundImage = '';
+    if (placeholder && placeholder.blurhash) {
+        try {
+            container.style.backgroundImage = `url(${blurhashToDataURL(placeholder)})`;
+        } catch (error) {
+            console.warn('Aperçu illisible', error);
+        }
+    }
+
+    // Masquer la photo précédente pendant le chargement de la nouvelle
+    img.classList.add('loading');
+    img.onload = () => {
+        img.classList.remove('loading');
+        container.style.backgroundImage = '';
+    };
+    img.onerror = () => img.classList.remove('loading');
+
+    // Sources à renseigner avant src : sinon l'original serait téléchargé
+    picture.querySelectorAll('source').forEach(source => source.remove());
+    if (variants && variants.widths.length) {
+        const sizes = photoSizes(variants);
+        // Formats préférés d'abord : le navigateur prend la première source qu'il sait décoder
+        variants.formats.filter(format => format !== 'jpeg').forEach(format => {
+            const source = document.createElement('source');
+            source.type = `image/${format}`;
+            source.srcset = photoSrcset(src, variants, format);
+            source.sizes = sizes;
+            picture.insertBefore(source, img);
+        });
+        img.sizes = sizes;
+        img.srcset = photoSrcset(src, variants, 'jpeg');
+    } else {
+        img.removeAttribute('srcset');
+        img.removeAttribute('sizes');
+    }
+    img.src = src;
+}
+
 /**
  * Charger la configuration sauvegardée
  */
@@ -70,7 +240,7 @@ async function loadConfig() {
 // Initialisation au chargement de la page
 document.addEventListener('DOMContentLoaded', function() {
     initConfigScreen();
-    initWebSocket();
+    initWebSocket(getJoinRoomIdFromUrl());
     loadStats();
     loadConfig();
     checkAutoJoinRoom();
@@ -152,6 +322,9 @@ async function scanPhotos() {
             const resultDiv = document.getElementById('scan-result');
             const successP = resultDiv.querySelector('.success');
             successP.textContent = `${data.num_photos} photo(s) avec coordonnées GPS trouvée(s) !`;
+            if (data.num_duplicates) {
+                successP.textContent += ` (${data.num_duplicates} doublon(s) écarté(s))`;
+            }
             resultDiv.classList.remove('hidden');
 
             document.getElementById('scan-error').classList.add('hidden');
@@ -276,7 +449,7 @@ async function loadCurrentPhoto() {
         if (response.ok) {
             // Afficher la photo
             const photoPath = data.path.replace(/\\/g, '/');
-            document.getElementById('current-photo').src = `/api/photo/${encodeURIComponent(photoPath)}`;
+            showPhoto(`/api/photo/${encodeURIComponent(photoPath)}`, data.placeholder, data.variants);
 
             // Mettre à jour l'affichage de la manche
             document.getElementById('round-display').textContent = `Manche ${data.round}/${data.total_rounds}`;
@@ -555,38 +728,139 @@ function showError(message) {
 
 /**
  * Initialiser WebSocket
+ * Avec plusieurs workers, la salle est passée en paramètre pour que le
+ * routeur dirige la connexion vers le processus qui la gère
  */
-function initWebSocket() {
-    socket = io();
+function initWebSocket(roomId = null) {
+    if (socket) {
+        socket.disconnect();
+    }
+
+    socketRoomId = roomId;
+    socket = roomId ? io({query: {room: roomId}}) : io();
 
     socket.on('connected', (data) => {
         console.log('WebSocket connecté:', data.message);
+        clusterWorkers = data.workers || 1;
     });
 
+    socket.on('connect', () => syncServerClock());
+
     socket.on('error', (data) => {
+        // Connexion arrivée sur un autre worker : se reconnecter au bon
+        if (data.code === 'wrong_worker' && currentRoomId && socketRoomId !== currentRoomId) {
+            initWebSocket(currentRoomId);
+            socket.emit('join_sync_room', {room_id: currentRoomId, player_name: playerName});
+            return;
+        }
+
         console.error('Erreur WebSocket:', data.message);
         showError(data.message);
     });
 
     socket.on('joined_room', handleJoinedRoom);
     socket.on('room_updated', handleRoomUpdated);
-    socket.on('countdown_tick', handleCountdownTick);
+    socket.on('room_delta', handleRoomDelta);
+    socket.on('countdown_started', handleCountdownStarted);
     socket.on('round_started', handleRoundStarted);
-    socket.on('timer_update', handleTimerUpdate);
     socket.on('player_submitted', handlePlayerSubmitted);
     socket.on('round_results', handleRoundResults);
+    socket.on('round_result_self', handleRoundResultSelf);
     socket.on('game_finished', handleGameFinished);
     socket.on('game_paused', handleGamePaused);
-    socket.on('pause_countdown', handlePauseCountdown);
     socket.on('game_resumed', handleGameResumed);
 }
 
+/**
+ * Se connecter au worker propriétaire de la salle avant de la rejoindre
+ */
+function ensureRoomSocket(roomId) {
+    if (clusterWorkers > 1 && socketRoomId !== roomId) {
+        initWebSocket(roomId);
+    }
+}
+
+/**
+ * Estimer le décalage d'horloge avec le serveur (ping/pong)
+ * On garde l'échantillon au plus petit aller-retour, le plus précis
+ */
+function syncServerClock(samples = 5) {
+    for (let i = 0; i < samples; i++) {
+        setTimeout(() => {
+            const sentAt = Date.now();
+            socket.emit('time_sync', {client_time: sentAt}, (data) => {
+                const receivedAt = Date.now();
+                const rtt = receivedAt - sentAt;
+                if (rtt <= serverClockRtt) {
+                    serverClockRtt = rtt;
+                    serverClockOffset = data.server_time - (sentAt + rtt / 2);
+                }
+            });
+        }, i * 200);
+    }
+}
+
+/**
+ * Heure serveur estimée (ms)
+ */
+function serverNow() {
+    return Date.now() + (serverClockOffset || 0);
+}
+
+/**
+ * Utiliser l'ancre serveur d'un événement si aucun ping n'a encore abouti
+ */
+function anchorServerClock(data) {
+    if (serverClockOffset === null && data.server_time) {
+        serverClockOffset = data.server_time - Date.now();
+    }
+}
+
+/**
+ * Secondes restantes avant une échéance serveur
+ */
+function secondsUntil(deadline) {
+    return Math.max(0, Math.ceil((deadline - serverNow()) / 1000));
+}
+
+/**
+ * Arrêter les décomptes locaux
+ */
+function stopLocalTimers() {
+    clearInterval(roundTimerInterval);
+    clearInterval(countdownInterval);
+    clearInterval(pauseTimerInterval);
+    roundTimerInterval = null;
+    countdownInterval = null;
+    pauseTimerInterval = null;
+}
+
+/**
+ * Afficher le timer de manche localement jusqu'à l'échéance
+ */
+function startRoundTimer(deadline) {
+    clearInterval(roundTimerInterval);
+
+    const tick = () => {
+        const seconds = secondsUntil(deadline);
+        renderTimer(seconds);
+        if (seconds <= 0) {
+            clearInterval(roundTimerInterval);
+            roundTimerInterval = null;
+        }
+    };
+
+    tick();
+    roundTimerInterval = setInterval(tick, 250);
+}
+
 /**
  * Créer une salle multijoueur
  */
 async function createMultiplayerRoom() {
     playerName = document.getElementById('player-name').value.trim() || 'Joueur 1';
     const numRounds = parseInt(document.getElementById('num-rounds').value);
+    const maxPlayers = parseInt(document.getElementById('max-players').value) || 6;
 
     try {
         const response = await fetch('/api/sync/room/create', {
@@ -595,7 +869,8 @@ async function createMultiplayerRoom() {
             body: JSON.stringify({
                 room_name: `Partie de ${playerName}`,
                 host_name: playerName,
-                num_rounds: numRounds
+                num_rounds: numRounds,
+                max_players: maxPlayers
             })
         });
 
@@ -607,6 +882,7 @@ async function createMultiplayerRoom() {
             isHost = true;
 
             // Rejoindre via WebSocket
+            ensureRoomSocket(currentRoomId);
             socket.emit('join_sync_room', {
                 room_id: currentRoomId,
                 player_name: playerName
@@ -638,6 +914,7 @@ function joinRoom(roomId) {
     isMultiplayerMode = true;
     isHost = false;
 
+    ensureRoomSocket(roomId);
     socket.emit('join_sync_room', {
         room_id: roomId,
         player_name: playerName
@@ -663,9 +940,56 @@ function handleJoinedRoom(data) {
 }
 
 /**
- * Gérer la mise à jour de la salle
+ * Gérer un instantané complet de la salle
  */
-function handleRoomUpdated(roomState) {
+function handleRoomUpdated(snapshot) {
+    roomState = snapshot;
+    renderLobbyPlayers();
+}
+
+/**
+ * Appliquer un delta d'état de salle
+ * Un trou dans les versions déclenche la demande d'un instantané complet
+ */
+function handleRoomDelta(delta) {
+    if (!roomState || delta.room_id !== roomState.id || delta.version <= roomState.version) {
+        return;
+    }
+
+    if (delta.version !== roomState.version + 1) {
+        socket.emit('request_room_state');
+        return;
+    }
+
+    delta.changes.forEach(change => {
+        if (change.type === 'player_joined') {
+            const index = roomState.players.findIndex(p => p.name === change.player.name);
+            if (index >= 0) {
+                roomState.players[index] = change.player;
+            } else {
+                roomState.players.push(change.player);
+            }
+            return;
+        }
+
+        const player = roomState.players.find(p => p.name === change.name);
+        if (!player) return;
+
+        if (change.type === 'ready') {
+            player.ready = change.ready;
+        } else if (change.type === 'connection') {
+            player.connected = change.connected;
+        }
+    });
+
+    roomState.version = delta.version;
+    renderLobbyPlayers();
+}
+
+/**
+ * Afficher les joueurs du lobby
+ */
+function renderLobbyPlayers() {
     // Mettre à jour la liste des joueurs
     const container = document.getElementById('lobby-players-container');
     container.innerHTML = '';
@@ -688,6 +1012,7 @@ function handleRoomUpdated(roomState) {
 
     // Mettre à jour le compteur
     document.getElementById('lobby-player-count').textContent = roomState.players.length;
+    document.getElementById('lobby-max-players').textContent = roomState.max_players;
 
     // Activer le bouton démarrer si hôte et conditions remplies
     if (isHost) {
@@ -725,6 +1050,7 @@ function leaveLobby() {
     currentRoomId = null;
     isHost = false;
     isReady = false;
+    roomState = null;
 
     hideAllScreens();
     document.getElementById('config-screen').classList.add('active');
@@ -744,32 +1070,51 @@ function copyRoomCode() {
 }
 
 /**
- * Gérer le compte à rebours avant manche
+ * Gérer le compte à rebours avant manche (rendu local jusqu'à l'échéance)
  */
-function handleCountdownTick(data) {
+function handleCountdownStarted(data) {
+    anchorServerClock(data);
+    stopLocalTimers();
     hideAllScreens();
-    const screen = document.createElement('div');
-    screen.id = 'countdown-screen';
-    screen.className = 'screen active';
-    screen.innerHTML = `
-        <div class="container">
-            <h1>La manche commence dans</h1>
-            <div class="countdown-number">${data.seconds}</div>
-        </div>
-    `;
-    document.body.appendChild(screen);
 
-    setTimeout(() => {
-        if (document.getElementById('countdown-screen')) {
-            document.getElementById('countdown-screen').remove();
+    let screen = document.getElementById('countdown-screen');
+    if (!screen) {
+        screen = document.createElement('div');
+        screen.id = 'countdown-screen';
+        screen.className = 'screen active';
+        screen.innerHTML = `
+            <div class="container">
+                <h1>La manche commence dans</h1>
+                <div class="countdown-number"></div>
+            </div>
+        `;
+        document.body.appendChild(screen);
+    }
+
+    const tick = () => {
+        const seconds = secondsUntil(data.deadline);
+        screen.querySelector('.countdown-number').textContent = seconds;
+        if (seconds <= 0) {
+            clearInterval(countdownInterval);
+            countdownInterval = null;
+            screen.remove();
         }
-    }, 1000);
+    };
+
+    tick();
+    countdownInterval = setInterval(tick, 250);
 }
 
 /**
  * Gérer le démarrage d'une manche
  */
 function handleRoundStarted(data) {
+    anchorServerClock(data);
+    stopLocalTimers();
+    const countdownScreen = document.getElementById('countdown-screen');
+    if (countdownScreen) {
+        countdownScreen.remove();
+    }
     hideAllScreens();
     document.getElementById('game-screen').classList.add('active');
 
@@ -786,7 +1131,7 @@ function handleRoundStarted(data) {
     }
 
     // Charger la photo
-    document.getElementById('current-photo').src = `/api/photo/${data.photo_path}`;
+    showPhoto(`/api/photo/${data.photo_path}`, data.placeholder, data.variants);
     document.getElementById('round-display').textContent = `Manche ${data.round}/${data.total_rounds}`;
 
     // Réinitialiser la carte
@@ -811,26 +1156,29 @@ function handleRoundStarted(data) {
     document.getElementById('btn-submit-guess').disabled = true;
     document.getElementById('btn-submit-guess').textContent = 'Valider ma réponse';
     document.getElementById('waiting-message').classList.add('hidden');
+
+    // Décompte local jusqu'à l'échéance serveur
+    startRoundTimer(data.deadline);
 }
 
 /**
- * Gérer la mise à jour du timer
+ * Afficher le temps restant de la manche
  */
-function handleTimerUpdate(data) {
-    const minutes = Math.floor(data.seconds / 60);
-    const secs = data.seconds % 60;
+function renderTimer(seconds) {
+    const minutes = Math.floor(seconds / 60);
+    const secs = seconds % 60;
     const timerDisplay = document.getElementById('timer-display');
     timerDisplay.textContent = `${minutes}:${String(secs).padStart(2, '0')}`;
 
     // Alerte visuelle si < 10s
-    if (data.seconds <= 10) {
+    if (seconds <= 10) {
         timerDisplay.classList.add('danger');
     } else {
         timerDisplay.classList.remove('danger');
     }
 
     // Désactiver soumission si timer à 0
-    if (data.seconds <= 0) {
+    if (seconds <= 0) {
         document.getElementById('btn-submit-guess').disabled = true;
         document.getElementById('btn-submit-guess').textContent = 'Temps écoulé';
     }
@@ -893,22 +1241,55 @@ async function submitGuess() {
  * Gérer les résultats de manche (multijoueur)
  */
 function handleRoundResults(data) {
+    stopLocalTimers();
     hideAllScreens();
     document.getElementById('multiplayer-result-screen').classList.add('active');
 
+    lastRoundResults = data;
+    myRoundResult = null;
+    renderRoundResults();
+}
+
+/**
+ * Gérer sa propre ligne de résultats (envoyée en privé en mode 'top')
+ */
+function handleRoundResultSelf(entry) {
+    myRoundResult = entry;
+    if (lastRoundResults && lastRoundResults.mode === 'top') {
+        renderRoundResults();
+    }
+}
+
+/**
+ * Afficher le tableau, les statistiques et la carte des résultats
+ */
+function renderRoundResults() {
+    const data = lastRoundResults;
+    const isTop = data.mode === 'top';
+
+    // Lignes affichées : classement complet, ou top N + sa propre ligne
+    const rows = data.results.map((result, index) => ({result, rank: index + 1}));
+    if (isTop && myRoundResult) {
+        const inTop = data.results.some(r => r.player_name === myRoundResult.player_name);
+        if (!inTop) {
+            rows.push({result: myRoundResult, rank: myRoundResult.rank});
+        }
+    }
+
     // Remplir le tableau
     const tbody = document.getElementById('multiplayer-results-tbody');
     tbody.innerHTML = '';
 
-    data.results.forEach((result, index) => {
+    rows.forEach(({result, rank}) => {
         const row = document.createElement('tr');
-        if (index === 0) row.classList.add('first-place');
+        if (rank === 1) row.classList.add('first-place');
+        if (result.player_name === playerName) row.classList.add('self-row');
 
         const distanceText = result.distance_km !== null ? `${result.distance_km} km` : 'Pas de réponse';
         const scoreText = result.score !== null ? result.score : 0;
 
         row.innerHTML = `
-            <td>${index + 1}</td>
+            <td>${rank}</td>
             <td><span class="color-dot" style="background: ${result.color}"></span> ${result.player_name}</td>
             <td>${distanceText}</td>
             <td>${scoreText}</td>
@@ -918,8 +1299,18 @@ function handleRoundResults(data) {
         tbody.appendChild(row);
     });
 
-    // Afficher la carte avec tous les marqueurs
-    displayMultiplayerResultMap(data.results, data.true_lat, data.true_lon);
+    // Statistiques agrégées (mode 'top')
+    const statsEl = document.getElementById('multiplayer-results-stats');
+    if (isTop && data.stats) {
+        const median = data.stats.median_distance_km !== null ? `${data.stats.median_distance_km} km` : '-';
+        statsEl.textContent = `${data.stats.submitted}/${data.stats.players} réponses · distance médiane : ${median}`;
+        statsEl.classList.remove('hidden');
+    } else {
+        statsEl.classList.add('hidden');
+    }
+
+    // Afficher la carte avec les marqueurs affichés
+    displayMultiplayerResultMap(rows.map(r => r.result), data.true_lat, data.true_lon);
 }
 
 /**
@@ -989,6 +1380,7 @@ function nextMultiplayerRound() {
  * Gérer la fin de partie
  */
 function handleGameFinished(data) {
+    stopLocalTimers();
     hideAllScreens();
     document.getElementById('end-screen').classList.add('active');
 
@@ -1027,6 +1419,9 @@ function handleGameFinished(data) {
  * Gérer la pause du jeu
  */
 function handleGamePaused(data) {
+    anchorServerClock(data);
+    stopLocalTimers();
+
     const statusDiv = document.createElement('div');
     statusDiv.id = 'pause-overlay';
     statusDiv.className = 'pause-overlay';
@@ -1038,26 +1433,34 @@ function handleGamePaused(data) {
         </div>
     `;
     document.body.appendChild(statusDiv);
-}
 
-/**
- * Gérer le compte à rebours de pause
- */
-function handlePauseCountdown(data) {
-    const timer = document.getElementById('pause-timer');
-    if (timer) {
-        timer.textContent = data.seconds;
-    }
+    // Décompte de pause rendu localement
+    pauseTimerInterval = setInterval(() => {
+        const timer = document.getElementById('pause-timer');
+        if (!timer) {
+            clearInterval(pauseTimerInterval);
+            pauseTimerInterval = null;
+            return;
+        }
+        timer.textContent = secondsUntil(data.pause_deadline);
+    }, 250);
 }
 
 /**
  * Gérer la reprise du jeu
  */
-function handleGameResumed() {
+function handleGameResumed(data) {
+    anchorServerClock(data);
+    clearInterval(pauseTimerInterval);
+    pauseTimerInterval = null;
+
     const overlay = document.getElementById('pause-overlay');
     if (overlay) {
         overlay.remove();
     }
+
+    // Reprendre le décompte jusqu'à l'échéance inchangée de la manche
+    startRoundTimer(data.deadline);
 }
 
 /**
@@ -1065,11 +1468,9 @@ function handleGameResumed() {
  */
 function checkAutoJoinRoom() {
     // Récupérer le room_id depuis l'URL
-    const path = window.location.pathname;
-    const match = path.match(/^\/join\/([a-zA-Z0-9]+)$/);
+    const roomId = getJoinRoomIdFromUrl();
 
-    if (match) {
-        const roomId = match[1];
+    if (roomId) {
         console.log('Auto-join room:', roomId);
 
         // Demander le nom du joueur
@@ -1085,6 +1486,14 @@ function checkAutoJoinRoom() {
     }
 }
 
+/**
+ * ID de salle présent dans l'URL (/join/<room_id>), ou null
+ */
+function getJoinRoomIdFromUrl() {
+    const match = window.location.pathname.match(/^\/join\/([a-zA-Z0-9]+)$/);
+    return match ? match[1] : null;
+}
+
 /**
  * Charger le QR code de la salle et l'URL de partage
  */
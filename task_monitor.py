@@ -0,0 +1,233 @@
+"""
+Suivi des tâches de fond et du retard d'ordonnancement
+
+Les timers des salles synchronisées (compte à rebours, fin de manche, pause,
+regroupement des deltas) et le nettoyage tournent dans des tâches de fond
+SocketIO, hors de toute requête. TaskMonitor les enveloppe :
+- durée, nombre en cours et erreurs par tâche (métriques geoquizz_background_*) ;
+- retard de réveil des timers sur leur échéance, signalé au-delà du seuil ;
+- battement régulier mesurant le retard de la boucle d'événements : un
+  calcul bloquant (eventlet/gevent) ou une contention du GIL (threading)
+  le fait dériver ;
+- échantillonnage de piles à la demande (threads et green threads), exposé
+  par /api/admin/tasks/stacks.
+"""
+import collections
+import gc
+import itertools
+import os
+import sys
+import threading
+import time
+
+import metrics
+
+# Retard au-delà duquel un timer ou la boucle d'événements est signalé (secondes)
+STALL_THRESHOLD = 0.1
+
+# Période du battement mesurant le retard de la boucle d'événements (secondes)
+HEARTBEAT_INTERVAL = 0.1
+
+# Nombre de retards signalés conservés pour /api/admin/tasks
+STALL_HISTORY = 50
+
+# Profondeur maximale d'une pile échantillonnée (cadres les plus internes)
+STACK_DEPTH = 40
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{os.path.basename(code.co_filename)}:{frame.f_lineno}({code.co_name})'
+
+
+def _collapse(frame):
+    """
+    Pile d'un cadre au format « replié » des flame graphs
+
+    Returns:
+        Cadres de la racine vers le plus interne, séparés par ';'
+    """
+    labels = []
+    while frame is not None and len(labels) < STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+def _green_threads():
+    """
+    Green threads suspendues (eventlet/gevent), sans importer greenlet
+
+    Returns:
+        Liste de (identifiant, greenlet)
+    """
+    greenlet = sys.modules.get('greenlet')
+    if greenlet is None:
+        return []
+    return [(id(obj), obj) for obj in gc.get_objects()
+            if isinstance(obj, greenlet.greenlet) and not obj.dead]
+
+
+class TaskMonitor:
+    """Instrumente les tâches de fond et mesure leur retard d'ordonnancement"""
+
+    def __init__(self, stall_threshold=STALL_THRESHOLD, history=STALL_HISTORY):
+        """
+        Args:
+            stall_threshold: Retard signalé (secondes)
+            history: Nombre de retards signalés conservés
+        """
+        self.stall_threshold = stall_threshold
+        self.stalls = collections.deque(maxlen=history)
+        self._active = {}  # {id de tâche: infos}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Tâche courante (par green thread sous eventlet/gevent)
+
+    def run(self, task, target, *args):
+        """
+        Exécute une tâche de fond en la mesurant (à passer à start_background_task)
+
+        Args:
+            task: Nom de la tâche (label des métriques)
+            target: Fonction à exécuter
+            args: Arguments de la fonction
+        """
+        task_id = next(self._ids)
+        info = {
+            'id': task_id,
+            'task': task,
+            'args': [repr(arg)[:60] for arg in args],
+            'started': time.time(),
+            'ident': threading.get_ident()
+        }
+        running = metrics.BACKGROUND_TASKS.labels(task)
+        metrics.BACKGROUND_TASKS_STARTED.labels(task).inc()
+        running.inc()
+        with self._lock:
+            self._active[task_id] = info
+        self._local.task = task
+
+        start = time.perf_counter()
+        try:
+            return target(*args)
+        except Exception:
+            metrics.BACKGROUND_TASK_ERRORS.labels(task).inc()
+            raise
+        finally:
+            metrics.BACKGROUND_TASK_SECONDS.labels(task).observe(time.perf_counter() - start)
+            running.dec()
+            with self._lock:
+                del self._active[task_id]
+            self._local.task = None
+
+    def record_wake(self, deadline):
+        """
+        Mesure le retard d'un timer à son réveil
+
+        Args:
+            deadline: Échéance visée (timestamp time.time())
+
+        Returns:
+            Retard en secondes
+        """
+        lateness = max(0.0, time.time() - deadline)
+        task = getattr(self._local, 'task', None) or 'unknown'
+        metrics.TIMER_LATENESS.labels(task).observe(lateness)
+        if lateness > self.stall_threshold:
+            metrics.TIMERS_LATE.labels(task).inc()
+            self._record_stall('timer', task, lateness)
+        return lateness
+
+    def heartbeat(self, sleep, interval=HEARTBEAT_INTERVAL):
+        """
+        Boucle mesurant le retard de la boucle d'événements (tâche de fond)
+
+        Args:
+            sleep: Fonction d'attente du mode asynchrone (socketio.sleep)
+            interval: Période du battement (secondes)
+        """
+        while True:
+            deadline = time.monotonic() + interval
+            sleep(interval)
+            lag = max(0.0, time.monotonic() - deadline)
+            metrics.EVENT_LOOP_LAG.observe(lag)
+            if lag > self.stall_threshold:
+                metrics.EVENT_LOOP_STALLS.inc()
+                self._record_stall('event_loop', None, lag)
+
+    def _record_stall(self, kind, task, lateness):
+        with self._lock:
+            active = len(self._active)
+        self.stalls.append({
+            'kind': kind,
+            'task': task,
+            'late_ms': round(lateness * 1000, 1),
+            'at': round(time.time(), 3),
+            'active_tasks': active
+        })
+
+    def snapshot(self):
+        """
+        État courant pour /api/admin/tasks
+
+        Returns:
+            Dict : tâches en cours (les plus anciennes d'abord), nombre par
+            tâche et derniers retards signalés
+        """
+        now = time.time()
+        with self._lock:
+            active = sorted(self._active.values(), key=lambda info: info['started'])
+        counts = collections.Counter(info['task'] for info in active)
+        return {
+            'stall_threshold_ms': round(self.stall_threshold * 1000, 1),
+            'running': dict(counts),
+            'active': [{'id': info['id'], 'task': info['task'], 'args': info['args'],
+                        'age_s': round(now - info['started'], 3)} for info in active],
+            'stalls': list(self.stalls)
+        }
+
+    def sample_stacks(self, samples=20, interval=0.01, sleep=time.sleep, limit=30):
+        """
+        Échantillonne les piles de tous les threads et green threads
+
+        Les green threads sont recensées une fois au début (parcours du tas) ;
+        celles créées pendant l'échantillonnage ne sont pas vues.
+
+        Args:
+            samples: Nombre d'échantillons
+            interval: Attente entre deux échantillons (secondes)
+            sleep: Fonction d'attente du mode asynchrone (socketio.sleep)
+            limit: Nombre de piles distinctes retournées
+
+        Returns:
+            Liste de dicts {task, count, stack}, les piles les plus vues d'abord
+        """
+        with self._lock:
+            tasks = {info['ident']: info['task'] for info in self._active.values()}
+        green_threads = _green_threads()
+        counts = collections.Counter()
+
+        for i in range(samples):
+            own_frame = sys._getframe()
+            frames = list(sys._current_frames().items())
+            frames.extend((ident, green.gr_frame) for ident, green in green_threads
+                          if green.gr_frame is not None)
+            for ident, frame in frames:
+                if self._contains(frame, own_frame):
+                    continue
+                counts[(tasks.get(ident), _collapse(frame))] += 1
+            if i + 1 < samples:
+                sleep(interval)
+
+        return [{'task': task, 'count': count, 'stack': stack}
+                for (task, stack), count in counts.most_common(limit)]
+
+    @staticmethod
+    def _contains(frame, target):
+        """Indique si target fait partie de la pile de frame (pile de l'échantillonneur)"""
+        while frame is not None:
+            if frame is target:
+                return True
+            frame = frame.f_back
+        return False